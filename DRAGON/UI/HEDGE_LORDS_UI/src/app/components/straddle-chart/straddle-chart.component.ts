@@ -51,10 +51,12 @@ export class StraddleChartComponent implements OnInit, OnDestroy {
     this.chartOptions = {
       series: [{ name: 'Payoff', data: [] }],
       chart: { type: 'line', height: 350 },
-      xaxis: { title: { text: 'Underlying Price' } },
+      // Payoff points are the kinks of the payoff, placed by price
+      xaxis: { type: 'numeric', title: { text: 'Underlying Price' } },
       yaxis: { title: { text: 'PnL' } },
       title: { text: 'Options Payoff Chart', align: 'left' },
-      stroke: { curve: 'smooth' },
+      // Straight between kinks, the payoff is linear there
+      stroke: { curve: 'straight' },
       dataLabels: { enabled: false },
       annotations: {
         yaxis: [
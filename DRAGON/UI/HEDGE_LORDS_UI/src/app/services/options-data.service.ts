@@ -11,6 +11,8 @@ export class OptionsDataService {
   private optionsData$ = new BehaviorSubject<any[]>([]);
   private futuresData$ = new BehaviorSubject<any>(null);
   private currentSymbol$ = new BehaviorSubject<string>('');
+  // Latest ticker of each symbol, built from the snapshot and the deltas
+  private chain = new Map<string, any>();
 
   constructor() {
     this.socket$ = webSocket('ws://localhost:8001/stream/options');
@@ -18,21 +20,15 @@ export class OptionsDataService {
     this.socket$.subscribe({
       next: (message: any) => {
         if (message.purpose === 'prices') {
-          const futures = message.options_chain.find(
-            (item: any) => item.contract_type === 'perpetual_futures'
-          );
-          
-          if (futures) {
-            this.futuresData$.next(futures);
-            this.currentSymbol$.next(futures.symbol);
-          }
-          
-          const optionsOnly = message.options_chain.filter(
-            (item: any) => item.contract_type !== 'perpetual_futures'
-          );
-          
-          const groupedOptions = this.groupAndSortOptions(optionsOnly);
-          this.optionsData$.next(groupedOptions);
+          // Full snapshot, sent when the connection opens
+          this.chain.clear();
+          this.mergeTickers(message.options_chain);
+          this.publishChain();
+        } else if (message.purpose === 'prices_delta') {
+          // Only the tickers that changed since the previous message
+          this.mergeTickers(message.options_chain);
+          (message.removed || []).forEach((symbol: string) => this.chain.delete(symbol));
+          this.publishChain();
         }
       },
       error: (err: any) => console.error('WebSocket error:', err),
@@ -66,6 +62,29 @@ export class OptionsDataService {
     );
   }
 
+  private mergeTickers(tickers: any[]): void {
+    tickers.forEach((ticker: any) => this.chain.set(ticker.symbol, ticker));
+  }
+
+  private publishChain(): void {
+    const tickers = Array.from(this.chain.values());
+    const futures = tickers.find(
+      (item: any) => item.contract_type === 'perpetual_futures'
+    );
+
+    if (futures) {
+      this.futuresData$.next(futures);
+      this.currentSymbol$.next(futures.symbol);
+    }
+
+    const optionsOnly = tickers.filter(
+      (item: any) => item.contract_type !== 'perpetual_futures'
+    );
+
+    const groupedOptions = this.groupAndSortOptions(optionsOnly);
+    this.optionsData$.next(groupedOptions);
+  }
+
   private groupAndSortOptions(options: any[]): any[] {
     const grouped = options.reduce((acc: any, option: any) => {
       const strike = option.strike_price;
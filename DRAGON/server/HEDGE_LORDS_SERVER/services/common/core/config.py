@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from pathlib import Path
 from dotenv import load_dotenv
@@ -24,6 +25,58 @@ DB_HOST = os.getenv("REMOTE_DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 
+# Simulation
+SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS", os.cpu_count() or 1))
+SIMULATION_CHUNK_SIZE = int(os.getenv("SIMULATION_CHUNK_SIZE", 2500))
+SIMULATION_CACHE_MAX_BYTES = int(
+    os.getenv("SIMULATION_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+)
+
+# Websocket streaming
+STREAM_MIN_INTERVAL = float(os.getenv("STREAM_MIN_INTERVAL", 0.25))
+
+# OHLCV backfill
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", 4))
+BACKFILL_REQUESTS_PER_SECOND = float(os.getenv("BACKFILL_REQUESTS_PER_SECOND", 5.0))
+BACKFILL_CHUNK_CANDLES = int(os.getenv("BACKFILL_CHUNK_CANDLES", 1000))
+
+# Tick history, days of raw ticks kept (bars are kept), partitions created
+# ahead and seconds between downsampling runs
+TICK_HISTORY_RETENTION_DAYS = int(os.getenv("TICK_HISTORY_RETENTION_DAYS", 7))
+TICK_HISTORY_PARTITIONS_AHEAD = int(os.getenv("TICK_HISTORY_PARTITIONS_AHEAD", 2))
+TICK_DOWNSAMPLE_INTERVAL = float(os.getenv("TICK_DOWNSAMPLE_INTERVAL", 60))
+
+# Delta Exchange options catalog, seconds before /v2/products is refetched
+CONTRACT_CATALOG_TTL = float(os.getenv("CONTRACT_CATALOG_TTL", 300))
+
+# Simulation pre-warming: symbols (comma separated, empty disables it) and
+# resolutions simulated for their nearest listed expiries, iterations of each
+# run, seconds between catalog scans and simulations run at once
+PREWARM_SYMBOLS = [
+    symbol for symbol in os.getenv("PREWARM_SYMBOLS", "BTCUSD").split(",") if symbol
+]
+PREWARM_RESOLUTIONS = os.getenv("PREWARM_RESOLUTIONS", "1h").split(",")
+PREWARM_MAX_EXPIRIES = int(os.getenv("PREWARM_MAX_EXPIRIES", 6))
+PREWARM_ITERATIONS = int(os.getenv("PREWARM_ITERATIONS", 10000))
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", 300))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", 1))
+
+# Live options chain shared by the producer with consumers on the same host,
+# memory-mapped file (empty disables it) and contracts it holds
+CHAIN_STATE_PATH = os.getenv(
+    "CHAIN_STATE_PATH",
+    os.path.join(
+        "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+        "hedge_lords_chain",
+    ),
+)
+CHAIN_STATE_CAPACITY = int(os.getenv("CHAIN_STATE_CAPACITY", 4096))
+
+# Strikes around spot combined by the strategy optimizer, and its widest
+# butterfly and condor wing in strike steps
+STRATEGY_MAX_STRIKES = int(os.getenv("STRATEGY_MAX_STRIKES", 24))
+STRATEGY_MAX_WING_STEPS = int(os.getenv("STRATEGY_MAX_WING_STEPS", 4))
+
 
 EXCHANGES = {
     "binance": {
@@ -0,0 +1,245 @@
+import io
+import asyncio
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.common.db.changes import RESYNC, ChangeBus, ChangeSubscription
+from services.common.db.database import get_db_session
+from services.common.db.ticks import driver_connection
+from services.common.types.enums import Resolution
+from services.common.core.logging import common_logger as logger
+
+# Postgres channel carrying the series written to market_data.historical_data
+CANDLES_CHANNEL = "candle_changes"
+
+# Close series kept in memory, least recently used ones are dropped beyond it
+MAX_CACHED_SERIES = 64
+
+# PGCOPY binary header: signature, flags and header extension length
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+COPY_HEADER_BYTES = len(COPY_SIGNATURE) + 8
+# Binary COPY tuple of (time, close::float8): field count, then the length and
+# big-endian value of each field
+CLOSE_TUPLE = np.dtype(
+    [
+        ("fields", ">i2"),
+        ("time_length", ">i4"),
+        ("time", ">i8"),
+        ("close_length", ">i4"),
+        ("close", ">f8"),
+    ]
+)
+# Postgres timestamps count microseconds from 2000-01-01 UTC
+POSTGRES_EPOCH = np.datetime64("2000-01-01T00:00:00", "us")
+
+SELECT_CLOSES = """
+    SELECT time, close::float8 FROM market_data.historical_data
+    WHERE symbol = $1 AND resolution = $2 AND close IS NOT NULL
+    """
+
+# In-process channel of CANDLES_CHANNEL changes, fed by a ChangeListener
+candle_bus = ChangeBus()
+
+
+def encode_candle_change(symbol: str, resolution: Resolution, since: datetime) -> str:
+    """Change of a series from its candle at since onwards, as a bus message"""
+    return f"{symbol}|{resolution.value}|{int(since.timestamp())}"
+
+
+def decode_candle_change(change: str) -> Optional[tuple[str, str, np.datetime64]]:
+    """(symbol, resolution value, since) of a change, None if malformed"""
+    try:
+        symbol, resolution, since = change.split("|")
+        return symbol, resolution, np.datetime64(int(since), "s").astype("M8[us]")
+    except ValueError:
+        return None
+
+
+def candle_changes(rows: Iterable[tuple]) -> list[str]:
+    """One change per series of HISTORY_COLUMNS rows, from its oldest candle"""
+    oldest: dict[tuple[str, str], datetime] = {}
+    for symbol, resolution, time, *_ in rows:
+        key = (symbol, resolution)
+        if key not in oldest or time < oldest[key]:
+            oldest[key] = time
+    return [
+        encode_candle_change(symbol, Resolution(resolution), time)
+        for (symbol, resolution), time in oldest.items()
+    ]
+
+
+def parse_binary_closes(data: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parse binary COPY output of (timestamptz, float8) rows into NumPy arrays.
+    Every tuple has the same width, so the whole body is read as one
+    structured array, with no per-row Python objects.
+
+    Returns times (datetime64[us], UTC) and closes (float64).
+    """
+    if not data.startswith(COPY_SIGNATURE):
+        raise ValueError("Not binary COPY output")
+    extension = int.from_bytes(data[COPY_HEADER_BYTES - 4 : COPY_HEADER_BYTES], "big")
+    # The body ends with a field count of -1
+    body = memoryview(data)[COPY_HEADER_BYTES + extension : len(data) - 2]
+    tuples = np.frombuffer(body, CLOSE_TUPLE)
+    if tuples.size and (
+        np.any(tuples["fields"] != 2)
+        or np.any(tuples["time_length"] != 8)
+        or np.any(tuples["close_length"] != 8)
+    ):
+        raise ValueError("Expected (timestamptz, float8) rows without NULLs")
+    times = POSTGRES_EPOCH + tuples["time"].astype("m8[us]")
+    return times, tuples["close"].astype(np.float64)
+
+
+async def fetch_closes(
+    db: AsyncSession,
+    symbol: str,
+    resolution: Resolution,
+    since: Optional[np.datetime64] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Candle open times and closes of a series, oldest first, optionally from
+    since onwards, streamed with binary COPY straight into NumPy arrays.
+    """
+    query = SELECT_CLOSES
+    args: list = [symbol, resolution.value]
+    if since is not None:
+        query += " AND time >= $3"
+        args.append(since.astype(datetime).replace(tzinfo=timezone.utc))
+    query += " ORDER BY time"
+
+    buffer = io.BytesIO()
+    connection = await driver_connection(db)
+    await connection.copy_from_query(query, *args, output=buffer, format="binary")
+    return parse_binary_closes(buffer.getvalue())
+
+
+def closes_series(times: np.ndarray, closes: np.ndarray) -> pd.Series:
+    """Close series indexed by UTC open time"""
+    return pd.Series(
+        closes,
+        index=pd.DatetimeIndex(times.astype("M8[ns]")).tz_localize(timezone.utc),
+        dtype=float,
+    )
+
+
+async def load_closes(symbol: str, resolution: Resolution) -> pd.Series:
+    """Historical closes of a series, oldest first, without caching"""
+    async with get_db_session() as db:
+        return closes_series(*await fetch_closes(db, symbol, resolution))
+
+
+class HistoricalCloseCache:
+    """
+    Close series per (symbol, resolution), read once and then served from
+    memory until the backfill writes candles of that series.
+
+    A change marks a series stale from its oldest written candle, and the next
+    get re-reads only the candles from there on, keeping the older ones.
+    RESYNC (listener reconnected, notifications may have been missed) marks
+    every series stale from the start.
+    """
+
+    def __init__(
+        self, bus: ChangeBus = candle_bus, max_series: int = MAX_CACHED_SERIES
+    ) -> None:
+        self.bus = bus
+        self.max_series = max_series
+        self.series: OrderedDict[tuple[str, str], tuple[np.ndarray, np.ndarray]] = (
+            OrderedDict()
+        )
+        # Stale series and where their changes start, None to re-read it all
+        self.stale: dict[tuple[str, str], Optional[np.datetime64]] = {}
+        self.locks: dict[tuple[str, str], asyncio.Lock] = {}
+        self.subscription = ChangeSubscription()
+        self.task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.bus.subscribe(self.subscription)
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self.bus.unsubscribe(self.subscription)
+
+    async def run(self) -> None:
+        while True:
+            self.invalidate(await self.subscription.get())
+
+    def invalidate(self, changes: Iterable[str]) -> None:
+        """Mark the cached series of the changes stale"""
+        for change in changes:
+            if change == RESYNC:
+                self.stale.update(dict.fromkeys(self.series))
+                continue
+            decoded = decode_candle_change(change)
+            if decoded is None:
+                logger.warning(f"Ignoring malformed candle change {change!r}")
+                continue
+            symbol, resolution, since = decoded
+            key = (symbol, resolution)
+            # Series being read for the first time are reloaded from since too
+            if key not in self.series and key not in self.locks:
+                continue
+            if key in self.stale:
+                previous = self.stale[key]
+                since = None if previous is None else min(previous, since)
+            self.stale[key] = since
+
+    async def fetch(
+        self,
+        symbol: str,
+        resolution: Resolution,
+        since: Optional[np.datetime64] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        async with get_db_session() as db:
+            return await fetch_closes(db, symbol, resolution, since)
+
+    async def get(self, symbol: str, resolution: Resolution) -> pd.Series:
+        """Historical closes of a series, oldest first, indexed by UTC time"""
+        return closes_series(*await self.arrays(symbol, resolution))
+
+    async def arrays(
+        self, symbol: str, resolution: Resolution
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Cached (times, closes) of a series, read-only"""
+        key = (symbol, resolution.value)
+        async with self.locks.setdefault(key, asyncio.Lock()):
+            cached = self.series.get(key)
+            if cached is not None and key not in self.stale:
+                self.series.move_to_end(key)
+                self.hits += 1
+                return cached
+
+            self.misses += 1
+            # Changes arriving during the read mark the series stale again
+            since = self.stale.pop(key, None)
+            if cached is None:
+                since = None
+            times, closes = await self.fetch(symbol, resolution, since)
+            if since is not None:
+                kept = cached[0] < since
+                times = np.concatenate([cached[0][kept], times])
+                closes = np.concatenate([cached[1][kept], closes])
+            times.flags.writeable = False
+            closes.flags.writeable = False
+
+            self.series[key] = (times, closes)
+            self.series.move_to_end(key)
+            while len(self.series) > self.max_series:
+                evicted, _ = self.series.popitem(last=False)
+                self.stale.pop(evicted, None)
+            return times, closes
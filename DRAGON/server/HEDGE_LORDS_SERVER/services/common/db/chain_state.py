@@ -0,0 +1,495 @@
+import os
+import mmap
+import time
+import numpy as np
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Iterable, Iterator, Optional
+from services.common.core.config import CHAIN_STATE_CAPACITY, CHAIN_STATE_PATH
+from services.common.core.logging import common_logger as logger
+from services.common.exchanges.catalog import parse_option_symbol
+
+# First bytes of a chain state file, replaced by RETIRED when the producer
+# stops using it
+MAGIC = b"HLCHAIN1"
+RETIRED = b"RETIRED\0"
+
+# Values kept per contract, as in market_data.options. Quotes and greeks keep
+# their previous value when a tick lacks them, like the options upsert
+PRICE_COLUMNS = ("spot_price", "mark_price")
+QUOTE_COLUMNS = ("best_bid", "best_ask", "bid_iv", "ask_iv", "mark_iv")
+GREEK_COLUMNS = ("delta", "gamma", "theta", "vega", "rho")
+VALUE_COLUMNS = PRICE_COLUMNS + QUOTE_COLUMNS + GREEK_COLUMNS
+VALUE_INDEX: dict[str, int] = {name: i for i, name in enumerate(VALUE_COLUMNS)}
+PRESERVED_VALUES = np.array([column not in PRICE_COLUMNS for column in VALUE_COLUMNS])
+
+# Row tuples taken by ChainState.update
+CHAIN_COLUMNS = ("symbol", "contract_type", "timestamp") + VALUE_COLUMNS
+
+CALL = b"call_options"
+
+HEADER = np.dtype(
+    [
+        ("magic", "S8"),
+        ("capacity", "<u4"),
+        ("count", "<u4"),
+        # Odd while the producer is writing (seqlock)
+        ("sequence", "<u8"),
+        # Bumped when contracts are added or cleared, readers then rebuild
+        # their index
+        ("layout", "<u8"),
+        ("overflowed", "<u8"),
+        ("updated_at", "<i8"),
+    ]
+)
+
+# Times a reader retries a read that overlapped a write before giving up
+MAX_READ_ATTEMPTS = 1000
+
+
+def state_dtype(capacity: int) -> np.dtype:
+    """Layout of a chain state file: the header, then one array per column"""
+    return np.dtype(
+        [
+            ("header", HEADER),
+            ("symbol", "S32", (capacity,)),
+            ("contract_type", "S24", (capacity,)),
+            ("underlying", "S16", (capacity,)),
+            ("expiry", "<M8[D]", (capacity,)),
+            ("strike", "<f8", (capacity,)),
+            # Exchange timestamp of the latest tick, epoch microseconds
+            ("timestamp", "<i8", (capacity,)),
+            ("values", "<f8", (capacity, len(VALUE_COLUMNS))),
+        ],
+        align=True,
+    )
+
+
+@dataclass
+class ChainRows:
+    """Contracts copied out of the chain state, one array per column"""
+
+    symbol: np.ndarray
+    contract_type: np.ndarray
+    underlying: np.ndarray
+    expiry: np.ndarray
+    strike: np.ndarray
+    timestamp: np.ndarray
+    values: np.ndarray
+
+    def __len__(self) -> int:
+        return self.symbol.size
+
+    def column(self, name: str) -> np.ndarray:
+        """Values of a VALUE_COLUMNS column, NaN where missing"""
+        return self.values[:, VALUE_INDEX[name]]
+
+    @property
+    def is_call(self) -> np.ndarray:
+        return self.contract_type == CALL
+
+    def symbols(self) -> list[str]:
+        return [symbol.decode() for symbol in self.symbol.tolist()]
+
+    def contract_types(self) -> list[str]:
+        return [contract_type.decode() for contract_type in self.contract_type.tolist()]
+
+    def expiry_dates(self) -> list[Optional[str]]:
+        """ISO expiry dates, None for contracts without one"""
+        return [None if np.isnat(expiry) else str(expiry) for expiry in self.expiry]
+
+    def optional(self, name: str) -> list[Optional[float]]:
+        """Values of a column (VALUE_COLUMNS or strike) as floats, None where missing"""
+        values = self.strike if name == "strike" else self.column(name)
+        result = values.astype(object)
+        result[np.isnan(values)] = None
+        return result.tolist()
+
+
+@dataclass
+class ChainIndex:
+    """
+    Slots of the contracts by symbol, and of the options of each
+    (underlying, expiry) sorted by strike with the call first
+    """
+
+    layout: Optional[int] = None
+    count: int = 0
+    slots: dict[str, int] = field(default_factory=dict)
+    expiries: dict[tuple[str, date], tuple[np.ndarray, np.ndarray]] = field(
+        default_factory=dict
+    )
+
+    def expiry(self, underlying: str, expiry: date) -> tuple[np.ndarray, np.ndarray]:
+        """Slots and strikes of an expiry's options"""
+        return self.expiries.get(
+            (underlying, expiry), (np.empty(0, np.intp), np.empty(0))
+        )
+
+
+def build_index(
+    layout: int,
+    symbols: np.ndarray,
+    contract_types: np.ndarray,
+    underlyings: np.ndarray,
+    expiries: np.ndarray,
+    strikes: np.ndarray,
+) -> ChainIndex:
+    groups: dict[tuple[str, date], list[int]] = {}
+    for slot, (underlying, expiry) in enumerate(
+        zip(underlyings.tolist(), expiries.tolist())
+    ):
+        if expiry is not None:
+            groups.setdefault((underlying.decode(), expiry), []).append(slot)
+
+    index = ChainIndex(
+        layout=layout,
+        count=symbols.size,
+        slots={symbol.decode(): slot for slot, symbol in enumerate(symbols.tolist())},
+    )
+    for key, slots in groups.items():
+        slots = np.asarray(slots, dtype=np.intp)
+        slots = slots[np.lexsort((contract_types[slots] != CALL, strikes[slots]))]
+        index.expiries[key] = (slots, strikes[slots])
+    return index
+
+
+def retire(path: str) -> None:
+    """Mark a chain state file as replaced, so readers let go of it, and remove it"""
+    try:
+        with open(path, "r+b") as file:
+            if os.fstat(file.fileno()).st_size >= HEADER.itemsize:
+                with mmap.mmap(file.fileno(), HEADER.itemsize) as buffer:
+                    buffer[: len(RETIRED)] = RETIRED
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ChainState:
+    """
+    Live options chain in a memory-mapped file, written in place by the
+    producer and read by consumers in other processes.
+
+    A contract gets a slot when first seen and keeps it until clear(); its
+    underlying, expiry and strike are parsed from the symbol once. Every
+    column is an array over the slots. The producer is the only writer and
+    wraps each update in a seqlock: the sequence is odd while it writes and
+    bumped again when done. Readers copy what they need and retry when the
+    sequence moved meanwhile, so they never wait for the producer and never
+    see half an update.
+    """
+
+    def __init__(self, path: str, buffer: mmap.mmap) -> None:
+        self.path = path
+        self.buffer = buffer
+        self.capacity = int(np.ndarray((), HEADER, buffer=buffer)["capacity"])
+        self.data = np.ndarray((), state_dtype(self.capacity), buffer=buffer)
+        self.header = self.data["header"]
+        self.symbol = self.data["symbol"]
+        self.contract_type = self.data["contract_type"]
+        self.underlying = self.data["underlying"]
+        self.expiry = self.data["expiry"]
+        self.strike = self.data["strike"]
+        self.timestamp = self.data["timestamp"]
+        self.values = self.data["values"]
+        # Writer: slot of each symbol. Readers: index of the last read layout
+        self.slots: dict[str, int] = {}
+        self.index = ChainIndex()
+
+    @classmethod
+    def create(
+        cls, path: str = CHAIN_STATE_PATH, capacity: int = CHAIN_STATE_CAPACITY
+    ) -> "ChainState":
+        """
+        Open the producer's state at path, cleared. A file of the same size is
+        reused in place, so attached readers keep working; one of another
+        capacity is retired and replaced.
+        """
+        size = state_dtype(capacity).itemsize
+        if os.path.exists(path) and os.path.getsize(path) != size:
+            retire(path)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            buffer = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        np.ndarray((), HEADER, buffer=buffer)["capacity"] = capacity
+        state = cls(path, buffer)
+        state.clear()
+        return state
+
+    @classmethod
+    def attach(cls, path: str = CHAIN_STATE_PATH) -> Optional["ChainState"]:
+        """Map the producer's state read-only, None if there is no usable one"""
+        try:
+            with open(path, "rb") as file:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(buffer) >= HEADER.itemsize:
+            header = np.ndarray((), HEADER, buffer=buffer)
+            if (
+                header["magic"] == MAGIC
+                and len(buffer) == state_dtype(int(header["capacity"])).itemsize
+            ):
+                return cls(path, buffer)
+            del header
+        buffer.close()
+        return None
+
+    @property
+    def valid(self) -> bool:
+        """False once the producer retired the file"""
+        return self.header["magic"] == MAGIC
+
+    def close(self, retire_file: bool = False) -> None:
+        """Unmap the state, the producer also retires the file"""
+        self.data = self.header = self.values = None
+        self.symbol = self.contract_type = self.underlying = None
+        self.expiry = self.strike = self.timestamp = None
+        try:
+            self.buffer.close()
+        except BufferError:
+            # Arrays still viewing the mapping, it is unmapped with them
+            pass
+        if retire_file:
+            retire(self.path)
+
+    # Producer side
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        sequence = int(self.header["sequence"])
+        # Skips the odd sequence of a writer that died while writing
+        sequence += 1 if sequence % 2 == 0 else 2
+        self.header["sequence"] = sequence
+        try:
+            yield
+        finally:
+            self.header["updated_at"] = time.time_ns()
+            self.header["sequence"] = sequence + 1
+
+    def clear(self) -> None:
+        """Forget every contract, e.g. when the producer starts a new stream"""
+        with self.writing():
+            self.header["magic"] = MAGIC
+            self.header["count"] = 0
+            self.header["overflowed"] = 0
+            self.header["layout"] = int(self.header["layout"]) + 1
+            self.symbol[:] = b""
+            self.values[:] = np.nan
+        self.slots.clear()
+
+    def update(self, rows: Iterable[tuple]) -> int:
+        """
+        Write CHAIN_COLUMNS rows, at most one per symbol, in one seqlock
+        section. Returns the number of contracts written.
+        """
+        slots: list[int] = []
+        timestamps: list[int] = []
+        values: list[list[float]] = []
+        added: list[tuple[int, tuple]] = []
+        full = False
+        for row in rows:
+            slot = self.slots.get(row[0])
+            if slot is None:
+                if len(self.slots) >= self.capacity:
+                    full = True
+                    continue
+                slot = self.slots[row[0]] = len(self.slots)
+                added.append((slot, row))
+            slots.append(slot)
+            timestamps.append(row[2] or 0)
+            values.append(
+                [np.nan if value is None else float(value) for value in row[3:]]
+            )
+
+        if full:
+            self.overflow()
+        if not slots:
+            return 0
+
+        slots_array = np.asarray(slots, dtype=np.intp)
+        values_array = np.asarray(values, dtype=np.float64)
+        with self.writing():
+            for slot, row in added:
+                self.add_contract(slot, row[0], row[1])
+            if added:
+                self.header["count"] = len(self.slots)
+                self.header["layout"] = int(self.header["layout"]) + 1
+            missing = np.isnan(values_array) & PRESERVED_VALUES
+            values_array[missing] = self.values[slots_array][missing]
+            self.values[slots_array] = values_array
+            self.timestamp[slots_array] = timestamps
+        return len(slots)
+
+    def add_contract(self, slot: int, symbol: str, contract_type: str) -> None:
+        option = parse_option_symbol(symbol)
+        self.symbol[slot] = symbol.encode()
+        self.contract_type[slot] = contract_type.encode()
+        self.underlying[slot] = option.underlying.encode() if option else b""
+        self.expiry[slot] = option.expiry if option else np.datetime64("NaT")
+        self.strike[slot] = option.strike if option else np.nan
+
+    def overflow(self) -> None:
+        """Full: readers stop using the state until the next clear()"""
+        if not self.header["overflowed"]:
+            logger.warning(
+                f"Chain state is full at {self.capacity} contracts, "
+                "consumers read Postgres until the next stream"
+            )
+            with self.writing():
+                self.header["overflowed"] = 1
+
+    # Reader side
+
+    def read(
+        self, select: Optional[Callable[[ChainIndex], np.ndarray]] = None
+    ) -> Optional[ChainRows]:
+        """
+        Consistent copy of the slots picked by select from the index (all
+        contracts by default). None when the state is retired, overflowed or
+        stayed busy for MAX_READ_ATTEMPTS attempts.
+        """
+        for _ in range(MAX_READ_ATTEMPTS):
+            sequence = int(self.header["sequence"])
+            if sequence % 2 == 0:
+                if self.header["magic"] != MAGIC or self.header["overflowed"]:
+                    return None
+                try:
+                    index = self.current_index()
+                    slots = np.arange(index.count) if select is None else select(index)
+                    rows = self.copy(slots)
+                except (IndexError, ValueError, UnicodeDecodeError):
+                    # Torn by a concurrent write, the sequence check retries it
+                    rows = None
+                if rows is not None and int(self.header["sequence"]) == sequence:
+                    self.index = index
+                    return rows
+            time.sleep(0)
+        logger.warning("Chain state stayed busy, reading Postgres instead")
+        return None
+
+    def current_index(self) -> ChainIndex:
+        layout = int(self.header["layout"])
+        if self.index.layout == layout:
+            return self.index
+        count = min(int(self.header["count"]), self.capacity)
+        return build_index(
+            layout,
+            self.symbol[:count].copy(),
+            self.contract_type[:count].copy(),
+            self.underlying[:count].copy(),
+            self.expiry[:count].copy(),
+            self.strike[:count].copy(),
+        )
+
+    def copy(self, slots: np.ndarray) -> ChainRows:
+        return ChainRows(
+            symbol=self.symbol[slots],
+            contract_type=self.contract_type[slots],
+            underlying=self.underlying[slots],
+            expiry=self.expiry[slots],
+            strike=self.strike[slots],
+            timestamp=self.timestamp[slots],
+            values=self.values[slots],
+        )
+
+    def snapshot(self) -> Optional[ChainRows]:
+        """Every contract"""
+        return self.read()
+
+    def contracts(self, symbols: Iterable[str]) -> Optional[ChainRows]:
+        """The known contracts among symbols"""
+        symbols = list(symbols)
+
+        def select(index: ChainIndex) -> np.ndarray:
+            slots = [index.slots[symbol] for symbol in symbols if symbol in index.slots]
+            return np.asarray(slots, dtype=np.intp)
+
+        return self.read(select)
+
+    def expiry_chain(self, underlying: str, expiry: date) -> Optional[ChainRows]:
+        """Options of an expiry by strike, the call before the put"""
+        return self.read(lambda index: index.expiry(underlying, expiry)[0])
+
+    def strike_range(
+        self, underlying: str, expiry: date, low: float, high: float
+    ) -> Optional[ChainRows]:
+        """Options of an expiry with low <= strike <= high, by strike"""
+
+        def select(index: ChainIndex) -> np.ndarray:
+            slots, strikes = index.expiry(underlying, expiry)
+            start = np.searchsorted(strikes, low, side="left")
+            end = np.searchsorted(strikes, high, side="right")
+            return slots[start:end]
+
+        return self.read(select)
+
+    def at_the_money(
+        self, underlying: str, expiry: date, spot: Optional[float] = None
+    ) -> Optional[ChainRows]:
+        """
+        Options of an expiry at the strike closest to spot, by default the
+        spot price of its latest tick
+        """
+        spot_column = VALUE_INDEX["spot_price"]
+
+        def select(index: ChainIndex) -> np.ndarray:
+            slots, strikes = index.expiry(underlying, expiry)
+            price = spot
+            if price is None:
+                spots = self.values[slots, spot_column]
+                known = ~np.isnan(spots)
+                if not known.any():
+                    return slots[:0]
+                price = spots[known][np.argmax(self.timestamp[slots][known])]
+            if not slots.size:
+                return slots
+            position = np.searchsorted(strikes, price)
+            nearby = strikes[max(position - 1, 0) : position + 1]
+            strike = nearby[np.argmin(np.abs(nearby - price))]
+            return slots[strikes == strike]
+
+        return self.read(select)
+
+
+class LiveChain:
+    """
+    The producer's chain state as seen from another process, attached on
+    first use and again after the producer replaced the file. Reads return
+    None while there is no usable state, callers then fall back to Postgres.
+    """
+
+    def __init__(self, path: str = CHAIN_STATE_PATH) -> None:
+        self.path = path
+        self.state: Optional[ChainState] = None
+
+    def get(self) -> Optional[ChainState]:
+        if not self.path:
+            return None
+        if self.state is not None and not self.state.valid:
+            self.state.close()
+            self.state = None
+        if self.state is None:
+            self.state = ChainState.attach(self.path)
+        return self.state
+
+    def contracts(self, symbols: Optional[Iterable[str]] = None) -> Optional[ChainRows]:
+        """Every contract, or the known ones among symbols"""
+        state = self.get()
+        if state is None:
+            return None
+        return state.snapshot() if symbols is None else state.contracts(symbols)
+
+    def close(self) -> None:
+        if self.state is not None:
+            self.state.close()
+            self.state = None
+
+
+live_chain = LiveChain()
@@ -0,0 +1,172 @@
+import asyncio
+import asyncpg
+from typing import Iterable, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.common.core.config import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME
+from services.common.core.logging import common_logger as logger
+
+# Postgres channel carrying the symbols written to market_data.options
+OPTIONS_CHANNEL = "options_changes"
+
+# Marker meaning any row may have changed (table cleared, notifications missed)
+RESYNC = "*"
+
+# NOTIFY payloads must be shorter than 8000 bytes
+MAX_PAYLOAD_BYTES = 7900
+
+
+def encode_symbols(symbols: Iterable[str]) -> list[str]:
+    """Split symbols into comma separated NOTIFY payloads"""
+    payloads, current, size = [], [], 0
+    for symbol in symbols:
+        length = len(symbol.encode()) + 1
+        if current and size + length > MAX_PAYLOAD_BYTES:
+            payloads.append(",".join(current))
+            current, size = [], 0
+        current.append(symbol)
+        size += length
+    if current:
+        payloads.append(",".join(current))
+    return payloads
+
+
+def decode_symbols(payload: str) -> set[str]:
+    return {symbol for symbol in payload.split(",") if symbol}
+
+
+async def notify_changes(
+    db: AsyncSession, symbols: Iterable[str], channel: str = OPTIONS_CHANNEL
+) -> None:
+    """
+    Queue a notification for the changed symbols on the session's transaction.
+
+    Postgres delivers it when the transaction commits, so listeners never see a
+    symbol before its row is visible.
+    """
+    for payload in encode_symbols(symbols):
+        await db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": channel, "payload": payload},
+        )
+
+
+class ChangeSubscription:
+    """
+    Pending changed symbols of one subscriber.
+
+    Publishing only adds to a set, so a slow subscriber receives every changed
+    symbol once, however many times it changed since the last get().
+    """
+
+    def __init__(self) -> None:
+        self.pending: set[str] = set()
+        self.event = asyncio.Event()
+
+    def push(self, symbols: Iterable[str]) -> None:
+        self.pending.update(symbols)
+        if self.pending:
+            self.event.set()
+
+    async def get(self) -> set[str]:
+        """Wait for changes and return everything pending"""
+        await self.event.wait()
+        self.event.clear()
+        pending, self.pending = self.pending, set()
+        return pending
+
+
+class ChangeBus:
+    """In-process publish/subscribe of changes, e.g. market_data.options symbols"""
+
+    def __init__(self) -> None:
+        self.subscriptions: set[ChangeSubscription] = set()
+
+    def subscribe(
+        self, subscription: Optional[ChangeSubscription] = None
+    ) -> ChangeSubscription:
+        subscription = subscription or ChangeSubscription()
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ChangeSubscription) -> None:
+        self.subscriptions.discard(subscription)
+
+    def publish(self, symbols: Iterable[str]) -> None:
+        symbols = set(symbols)
+        if not symbols:
+            return
+        for subscription in self.subscriptions:
+            subscription.push(symbols)
+
+
+change_bus = ChangeBus()
+
+
+class ChangeListener:
+    """
+    Relays Postgres notifications on a channel, OPTIONS_CHANNEL by default, to
+    a ChangeBus.
+
+    Uses a dedicated asyncpg connection and reconnects with backoff. Every
+    (re)connect publishes RESYNC, as notifications sent while disconnected
+    are lost.
+    """
+
+    def __init__(
+        self,
+        bus: ChangeBus = change_bus,
+        channel: str = OPTIONS_CHANNEL,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.bus = bus
+        self.channel = channel
+        self.max_backoff = max_backoff
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def on_notification(self, connection, pid, channel, payload) -> None:
+        self.bus.publish(decode_symbols(payload))
+
+    async def run(self) -> None:
+        backoff = 1.0
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    host=DB_HOST,
+                    port=DB_PORT,
+                    database=DB_NAME,
+                )
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(self.channel, self.on_notification)
+                logger.info(f"Listening for changes on {self.channel}")
+                backoff = 1.0
+                self.bus.publish([RESYNC])
+                await closed.wait()
+                logger.warning(f"Change listener connection to {self.channel} lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Change listener error on {self.channel}: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
@@ -0,0 +1,249 @@
+import io
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta
+from typing import Optional, Sequence
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+SCHEMA = "market_data"
+TICKS_TABLE = "options_ticks"
+BARS_TABLE = "options_bars_1m"
+
+# Columns of market_data.options_ticks, in table order
+TICK_COLUMNS = (
+    "time",
+    "symbol",
+    "underlying_asset_symbol",
+    "contract_type",
+    "strike_price",
+    "mark_price",
+    "spot_price",
+    "best_bid",
+    "best_ask",
+    "bid_size",
+    "ask_size",
+    "bid_iv",
+    "ask_iv",
+    "mark_iv",
+    "delta",
+    "gamma",
+    "theta",
+    "vega",
+    "rho",
+    "oi",
+)
+TICK_VALUE_COLUMNS = TICK_COLUMNS[4:]
+
+BAR_COLUMNS = (
+    "symbol",
+    "time",
+    "underlying_asset_symbol",
+    "contract_type",
+    "strike_price",
+    "open",
+    "high",
+    "low",
+    "close",
+    "spot_price",
+    "best_bid",
+    "best_ask",
+    "mark_iv",
+    "delta",
+    "gamma",
+    "theta",
+    "vega",
+    "rho",
+    "oi",
+    "ticks",
+)
+BAR_VALUE_COLUMNS = BAR_COLUMNS[4:]
+
+# Columns returned as strings, every other column is numeric
+TEXT_COLUMNS = frozenset(("symbol", "underlying_asset_symbol", "contract_type"))
+
+# Latest non-null value of a column within a bar
+LAST_VALUE = "(array_agg({0} ORDER BY time DESC) FILTER (WHERE {0} IS NOT NULL))[1]"
+
+DOWNSAMPLE_TICKS = text(f"""
+    INSERT INTO {SCHEMA}.{BARS_TABLE} ({", ".join(BAR_COLUMNS)})
+    SELECT
+        symbol,
+        date_trunc('minute', time) AS bar,
+        min(underlying_asset_symbol),
+        min(contract_type),
+        min(strike_price),
+        (array_agg(mark_price ORDER BY time)
+            FILTER (WHERE mark_price IS NOT NULL))[1],
+        max(mark_price),
+        min(mark_price),
+        {LAST_VALUE.format("mark_price")},
+        {", ".join(LAST_VALUE.format(column) for column in BAR_COLUMNS[9:19])},
+        count(*)
+    FROM {SCHEMA}.{TICKS_TABLE}
+    WHERE time >= :start AND time < :end
+    GROUP BY symbol, bar
+    ON CONFLICT (symbol, time) DO UPDATE SET
+        {", ".join(f"{column} = EXCLUDED.{column}" for column in BAR_COLUMNS[2:])}
+    """)
+
+LIST_PARTITIONS = text(f"""
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    JOIN pg_namespace ON pg_namespace.oid = parent.relnamespace
+    WHERE pg_namespace.nspname = '{SCHEMA}' AND parent.relname = '{TICKS_TABLE}'
+    """)
+
+
+def partition_name(day: date) -> str:
+    return f"{TICKS_TABLE}_{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> Optional[date]:
+    """Day of a daily partition, None for the default partition"""
+    try:
+        return datetime.strptime(name.removeprefix(f"{TICKS_TABLE}_"), "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+async def driver_connection(db: AsyncSession):
+    """The asyncpg connection behind a session, for COPY"""
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    return raw_connection.driver_connection
+
+
+async def ensure_partitions(db: AsyncSession, first_day: date, days: int) -> None:
+    """Create the daily partitions of [first_day, first_day + days) if missing"""
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        await db.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {SCHEMA}.{partition_name(day)} "
+                f"PARTITION OF {SCHEMA}.{TICKS_TABLE} "
+                f"FOR VALUES FROM ('{day}') TO ('{day + timedelta(days=1)}')"
+            )
+        )
+
+
+async def drop_partitions_before(db: AsyncSession, cutoff: date) -> list[str]:
+    """Drop the daily partitions of days before cutoff, returns their names"""
+    result = await db.execute(LIST_PARTITIONS)
+    expired = [
+        name
+        for name in result.scalars()
+        if (day := partition_day(name)) is not None and day < cutoff
+    ]
+    for name in sorted(expired):
+        await db.execute(text(f"DROP TABLE IF EXISTS {SCHEMA}.{name}"))
+    return expired
+
+
+async def copy_ticks(db: AsyncSession, rows: Sequence[tuple]) -> None:
+    """Append rows in TICK_COLUMNS order with COPY, in the session's transaction"""
+    if not rows:
+        return
+    connection = await driver_connection(db)
+    await connection.copy_records_to_table(
+        TICKS_TABLE, schema_name=SCHEMA, records=rows, columns=TICK_COLUMNS
+    )
+
+
+async def downsample_ticks(db: AsyncSession, start: datetime, end: datetime) -> int:
+    """Roll the ticks of [start, end) into one-minute bars, returns bars written"""
+    result = await db.execute(DOWNSAMPLE_TICKS, {"start": start, "end": end})
+    return result.rowcount
+
+
+async def fetch_columns(
+    db: AsyncSession,
+    table: str,
+    columns: Sequence[str],
+    start: datetime,
+    end: datetime,
+    symbols: Optional[Sequence[str]] = None,
+) -> dict[str, np.ndarray]:
+    """
+    Rows of table with time in [start, end), optionally of some symbols only,
+    as one NumPy array per column ordered by time. The rows are streamed with
+    COPY and parsed column-wise by pandas, no ORM or per-row objects. Times are
+    datetime64[us] UTC, numeric columns float64 with NaN for NULL.
+    """
+    selected = [
+        "(extract(epoch FROM time) * 1000000)::bigint" if column == "time" else column
+        for column in columns
+    ]
+    query = (
+        f"SELECT {', '.join(selected)} FROM {SCHEMA}.{table} "
+        "WHERE time >= $1 AND time < $2"
+    )
+    args: list = [start, end]
+    if symbols is not None:
+        query += " AND symbol = ANY($3::text[])"
+        args.append(list(symbols))
+    query += " ORDER BY time"
+
+    buffer = io.BytesIO()
+    connection = await driver_connection(db)
+    await connection.copy_from_query(query, *args, output=buffer, format="csv")
+    buffer.seek(0)
+    return parse_columns(buffer, columns)
+
+
+def parse_columns(buffer: io.BytesIO, columns: Sequence[str]) -> dict[str, np.ndarray]:
+    """Parse COPY CSV output (epoch microsecond times) into NumPy columns"""
+    dtypes = {
+        column: (
+            object
+            if column in TEXT_COLUMNS
+            else np.int64 if column in ("time", "ticks") else np.float64
+        )
+        for column in columns
+    }
+    if buffer.getbuffer().nbytes == 0:
+        return {
+            column: np.empty(0, "datetime64[us]" if column == "time" else dtype)
+            for column, dtype in dtypes.items()
+        }
+    frame = pd.read_csv(buffer, header=None, names=list(columns), dtype=dtypes)
+    result = {column: frame[column].to_numpy() for column in columns}
+    if "time" in result:
+        result["time"] = result["time"].astype("datetime64[us]")
+    return result
+
+
+async def fetch_ticks(
+    db: AsyncSession,
+    start: datetime,
+    end: datetime,
+    symbols: Optional[Sequence[str]] = None,
+    columns: Sequence[str] = TICK_VALUE_COLUMNS,
+) -> dict[str, np.ndarray]:
+    """Tick history of [start, end) as NumPy columns, always with time and symbol"""
+    columns = ["time", "symbol"] + [
+        column for column in columns if column not in ("time", "symbol")
+    ]
+    unknown = set(columns) - set(TICK_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown tick columns: {sorted(unknown)}")
+    return await fetch_columns(db, TICKS_TABLE, columns, start, end, symbols)
+
+
+async def fetch_bars(
+    db: AsyncSession,
+    start: datetime,
+    end: datetime,
+    symbols: Optional[Sequence[str]] = None,
+    columns: Sequence[str] = BAR_VALUE_COLUMNS,
+) -> dict[str, np.ndarray]:
+    """One-minute bars of [start, end) as NumPy columns, with time and symbol"""
+    columns = ["time", "symbol"] + [
+        column for column in columns if column not in ("time", "symbol")
+    ]
+    unknown = set(columns) - set(BAR_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown bar columns: {sorted(unknown)}")
+    return await fetch_columns(db, BARS_TABLE, columns, start, end, symbols)
@@ -4,6 +4,10 @@ from datetime import date as Date
 from abc import ABC, abstractmethod
 
 
+class ExchangeError(Exception):
+    """The exchange answered a request with an API level error"""
+
+
 class BaseExchange(ABC):
     def __init__(
         self,
@@ -0,0 +1,79 @@
+from dataclasses import dataclass, field
+from datetime import date as Date
+from typing import Iterable, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class OptionSymbol:
+    """Parts of a Delta option symbol such as C-BTC-90000-310525"""
+
+    symbol: str
+    contract_type: str
+    underlying: str
+    strike: float
+    expiry: Date
+
+
+def parse_option_symbol(symbol: str) -> Optional[OptionSymbol]:
+    """Parse a Delta option symbol, None for anything else"""
+    parts = symbol.split("-")
+    if len(parts) != 4 or parts[0] not in ("C", "P") or len(parts[3]) != 6:
+        return None
+    expiry = parts[3]
+    try:
+        return OptionSymbol(
+            symbol=symbol,
+            contract_type="call" if parts[0] == "C" else "put",
+            underlying=parts[1],
+            strike=float(parts[2]),
+            expiry=Date(2000 + int(expiry[4:6]), int(expiry[2:4]), int(expiry[:2])),
+        )
+    except ValueError:
+        return None
+
+
+@dataclass
+class ContractCatalog:
+    """
+    Live option symbols indexed by (underlying, expiry) and by symbol, built
+    once per products fetch so lookups do not parse symbols again.
+    """
+
+    loaded_at: float
+    symbols: Tuple[str, ...] = ()
+    by_expiry: dict[Tuple[str, Date], Tuple[str, ...]] = field(default_factory=dict)
+    by_symbol: dict[str, OptionSymbol] = field(default_factory=dict)
+
+    @classmethod
+    def from_symbols(
+        cls, symbols: Iterable[str], loaded_at: float
+    ) -> "ContractCatalog":
+        by_expiry: dict[Tuple[str, Date], list[str]] = {}
+        by_symbol = {}
+        for symbol in symbols:
+            option = parse_option_symbol(symbol)
+            if option is None:
+                continue
+            by_symbol[symbol] = option
+            by_expiry.setdefault((option.underlying, option.expiry), []).append(symbol)
+        return cls(
+            loaded_at=loaded_at,
+            symbols=tuple(by_symbol),
+            by_expiry={key: tuple(value) for key, value in by_expiry.items()},
+            by_symbol=by_symbol,
+        )
+
+    def is_fresh(self, now: float, ttl: float) -> bool:
+        return now - self.loaded_at < ttl
+
+    def contracts(self, underlying: str, expiry: Date) -> Tuple[str, ...]:
+        """Symbols of the options on underlying expiring on expiry"""
+        return self.by_expiry.get((underlying, expiry), ())
+
+    def expiry(self, symbol: str) -> Optional[Date]:
+        option = self.by_symbol.get(symbol)
+        return option.expiry if option else None
+
+    def expiries(self, underlying: str) -> list[Date]:
+        """Listed expiries of an underlying, soonest first"""
+        return sorted(expiry for name, expiry in self.by_expiry if name == underlying)
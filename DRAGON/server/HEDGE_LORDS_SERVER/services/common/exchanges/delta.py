@@ -1,19 +1,37 @@
-import json
+import time
 import httpx
 import asyncio
-import websockets
+import importlib.util
 import pandas as pd
 
 from datetime import datetime
 from datetime import date as Date
 from services.common.types.enums import Resolution
 from services.common.core.logging import common_logger as logger
-from services.common.core.config import EXCHANGES
-from services.common.exchanges.base import BaseExchange
+from services.common.core.config import CONTRACT_CATALOG_TTL, EXCHANGES
+from services.common.exchanges.base import BaseExchange, ExchangeError
+from services.common.exchanges.catalog import ContractCatalog
+from services.common.exchanges.stream import WebsocketSession
+
+# Pooled REST connections
+HTTP_MAX_CONNECTIONS = 10
+HTTP_TIMEOUT = 10.0
+# HTTP/2 needs the optional h2 package (httpx[http2]), HTTP/1.1 keep-alive otherwise
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
 
 
 class DeltaExchange(BaseExchange):
-    def __init__(self, on_message_callback: callable):
+    """
+    Delta Exchange adapter. The REST calls share one pooled client and the
+    options catalog is cached for catalog_ttl seconds; both live as long as
+    the adapter, until close(). REST only users need no message callback.
+    """
+
+    def __init__(
+        self,
+        on_message_callback: callable = None,
+        catalog_ttl: float = CONTRACT_CATALOG_TTL,
+    ):
         super().__init__(
             base_url=EXCHANGES["delta_exchange"]["base_url"],
             ws_url=EXCHANGES["delta_exchange"]["ws_url"],
@@ -21,94 +39,146 @@ class DeltaExchange(BaseExchange):
             api_secret=EXCHANGES["delta_exchange"]["api_secret"],
             on_message_callback=on_message_callback,
         )
-        self.ws = None
-
-    async def listen(self) -> None:
-        try:
-            async for message in self.ws:
-                await self.on_message_callback(message)
-        except Exception as e:
-            logger.error(f"Error listening to Delta Exchange: {e}")
+        self.stream: WebsocketSession | None = None
+        self.http: httpx.AsyncClient | None = None
+        self.catalog_ttl = catalog_ttl
+        self.catalog: ContractCatalog | None = None
+        self.catalog_lock = asyncio.Lock()
 
     async def connect(self) -> None:
-        try:
-            self.ws = await websockets.connect(self.ws_url)
-            asyncio.create_task(self.listen())
-        except Exception as e:
-            logger.error(f"Error connecting to Delta Exchange: {e}")
+        """Start a websocket session that reconnects until disconnect()"""
+        if self.stream is None:
+            self.stream = WebsocketSession(self.ws_url, self.on_message_callback)
+        await self.stream.start()
 
     async def disconnect(self) -> None:
+        if not self.stream:
+            return
+
         try:
-            await self.ws.close()
+            await self.stream.stop()
         except Exception as e:
             logger.error(f"Error disconnecting from Delta Exchange: {e}")
+        finally:
+            self.stream = None
 
     async def subscribe(self, coin: str, date: Date) -> None:
         try:
-            if not self.ws:
+            if not self.stream:
                 raise RuntimeError("Not connected to Delta Exchange")
 
             contracts = await self.filtered_contracts(coin, date)
             logger.info(f"Subscribing to contracts: {contracts}")
             contracts.append(coin)
-
-            message = {
-                "type": "subscribe",
-                "payload": {
-                    "channels": [
-                        {
-                            "name": "v2/ticker",
-                            "symbols": contracts,
-                        }
-                    ]
-                },
-            }
-            await self.ws.send(json.dumps(message))
+            await self.stream.subscribe(contracts)
         except Exception as e:
             logger.error(f"Error subscribing to Delta Exchange: {e}")
 
     async def unsubscribe(self) -> None:
-        if not self.ws:
+        if not self.stream:
             return
 
         try:
-            message = {
-                "type": "unsubscribe",
-                "payload": {"channels": [{"name": "v2/ticker", "symbols": [""]}]},
-            }
-            await self.ws.send(json.dumps(message))
+            await self.stream.unsubscribe()
         except Exception as e:
             logger.error(f"Error unsubscribing from Delta Exchange: {e}")
 
     @property
     async def all_options_contracts(self) -> list[str]:
-        params = {"contract_types": "call_options,put_options", "states": "live"}
+        catalog = await self.contract_catalog()
+        return list(catalog.symbols)
 
-        async with httpx.AsyncClient() as client:
+    async def filtered_contracts(self, coin: str, date: Date) -> list[str]:
+        catalog = await self.contract_catalog()
+        return list(catalog.contracts(coin[:3], date))
+
+    async def contract_catalog(self, refresh: bool = False) -> ContractCatalog:
+        """
+        Live options indexed by (underlying, expiry), fetched at most once per
+        catalog_ttl. A failed refresh keeps serving the previous catalog.
+        """
+        catalog = self.catalog
+        if (
+            not refresh
+            and catalog
+            and catalog.is_fresh(time.monotonic(), self.catalog_ttl)
+        ):
+            return catalog
+        async with self.catalog_lock:
+            # Another caller may have refreshed it while this one waited
+            if self.catalog is not catalog:
+                return self.catalog
             try:
-                response = await client.get(
-                    f"{self.base_url}/v2/products", params=params
+                symbols = await self.fetch_options_symbols()
+                self.catalog = ContractCatalog.from_symbols(symbols, time.monotonic())
+                logger.info(
+                    f"Loaded {len(self.catalog.symbols)} live options from Delta Exchange"
                 )
-                response.raise_for_status()
-                data = response.json()
-
-                if data["success"]:
-                    return [product["symbol"] for product in data["result"]]
-                return []
-            except httpx.RequestError as e:
-                self.logger.error(f"Delta Exchange API error: {e}")
-                return []
+            except (httpx.HTTPError, ExchangeError) as e:
+                logger.error(f"Delta Exchange API error: {e}")
+                if self.catalog is None:
+                    return ContractCatalog(loaded_at=time.monotonic())
+            return self.catalog
+
+    async def fetch_options_symbols(self) -> list[str]:
+        """Symbols of the live call and put options"""
+        params = {"contract_types": "call_options,put_options", "states": "live"}
+        response = await self.client.get(f"{self.base_url}/v2/products", params=params)
+        response.raise_for_status()
+        data = response.json()
+        if not data.get("success"):
+            raise ExchangeError(f"Products request failed: {data}")
+        return [product["symbol"] for product in data["result"]]
 
-    async def filtered_contracts(self, coin: str, date: Date) -> list[str]:
-        contracts = await self.all_options_contracts
-        return [
-            contract
-            for contract in contracts
-            if (parts := contract.split("-"))
-            and len(parts) == 4
-            and parts[1] == coin[:3]
-            and datetime.strptime(parts[3], "%d%m%y").date() == date
-        ]
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """HTTP client shared by the REST calls, keeps connections alive"""
+        if self.http is None or self.http.is_closed:
+            self.http = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                ),
+            )
+        return self.http
+
+    async def close(self) -> None:
+        """Close the pooled HTTP connections"""
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+
+    async def __aenter__(self) -> "DeltaExchange":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def fetch_candles(
+        self, coin: str, resolution: Resolution, start: int, end: int
+    ) -> list[dict]:
+        """
+        Raw candles with open time in [start, end] (epoch seconds).
+
+        Raises httpx errors for failed requests and ExchangeError when the
+        API reports a failure.
+        """
+        params = {
+            "resolution": resolution.value,
+            "symbol": coin,
+            "start": start,
+            "end": end,
+        }
+        response = await self.client.get(
+            f"{self.base_url}/v2/history/candles", params=params
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not data.get("success"):
+            raise ExchangeError(f"Candles request for {coin} failed: {data}")
+        return data.get("result") or []
 
     async def get_historical_data(
         self,
@@ -118,57 +188,36 @@ class DeltaExchange(BaseExchange):
         end_date: datetime,
         set_index: bool = False,
     ) -> pd.DataFrame:
-        params = {
-            "resolution": resolution.value,
-            "symbol": coin,
-            "start": int(start_date.timestamp()),
-            "end": int(end_date.timestamp()),
-        }
         df = pd.DataFrame(columns=["open", "high", "low", "close", "volume", "time"])
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/v2/history/candles", params=params
-                )
-
-                # Check for HTTP errors
-                response.raise_for_status()
-                data = response.json()
-                # Check API-level success indicator
-                if data.get("success") and data.get(
-                    "result"
-                ):  # Use .get for safer access
-                    temp_df = pd.DataFrame(data["result"])
-                    if temp_df.empty:
-                        self.logger.warning(
-                            f"Received empty result list for {coin} from API for {resolution} resolution and dates {start_date} to {end_date}."
-                        )
-
-                    temp_df["time"] = pd.to_datetime(
-                        temp_df["time"], unit="s", utc=True
-                    )
-                    temp_df["symbol"] = coin
-                    df = temp_df
-                else:
-                    self.logger.warning(
-                        f"API call for {coin} did not succeed or returned no result. Response: {data}"
-                    )
-
-            except httpx.RequestError as e:
-                # Network-level errors (connection, timeout, etc.)
-                self.logger.error(f"Delta Exchange API request error for {coin}: {e}")
-            except httpx.HTTPStatusError as e:
-                # HTTP errors (4xx, 5xx)
-                self.logger.error(
-                    f"Delta Exchange API HTTP status error for {coin}: {e.response.status_code} - {e.response.text}"
-                )
-            except Exception as e:
-                # Other potential errors (e.g., JSON decoding)
-                self.logger.error(
-                    f"Unexpected error fetching historical data for {coin}: {e}",
-                    exc_info=True,
+        try:
+            candles = await self.fetch_candles(
+                coin,
+                resolution,
+                int(start_date.timestamp()),
+                int(end_date.timestamp()),
+            )
+            if candles:
+                df = pd.DataFrame(candles)
+                df["time"] = pd.to_datetime(df["time"], unit="s", utc=True)
+                df["symbol"] = coin
+            else:
+                logger.warning(
+                    f"Received empty result list for {coin} from API for {resolution} resolution and dates {start_date} to {end_date}."
                 )
-            finally:
-                if set_index and not df.empty and "time" in df.columns:
-                    df = df.set_index("time")
-                return df
+        except httpx.RequestError as e:
+            # Network-level errors (connection, timeout, etc.)
+            logger.error(f"Delta Exchange API request error for {coin}: {e}")
+        except httpx.HTTPStatusError as e:
+            # HTTP errors (4xx, 5xx)
+            logger.error(
+                f"Delta Exchange API HTTP status error for {coin}: {e.response.status_code} - {e.response.text}"
+            )
+        except Exception as e:
+            # API errors and other potential errors (e.g., JSON decoding)
+            logger.error(
+                f"Unexpected error fetching historical data for {coin}: {e}",
+                exc_info=True,
+            )
+        if set_index and not df.empty and "time" in df.columns:
+            df = df.set_index("time")
+        return df
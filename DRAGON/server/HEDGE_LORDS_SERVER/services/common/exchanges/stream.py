@@ -0,0 +1,257 @@
+import re
+import json
+import time
+import random
+import asyncio
+import websockets
+
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+from services.common.core.logging import common_logger as logger
+
+# Reconnect backoff, doubled after every failed attempt up to the maximum
+RECONNECT_INITIAL_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+# Protocol level pings, a missing pong closes the connection
+PING_INTERVAL = 20.0
+PING_TIMEOUT = 20.0
+# The exchange sends a heartbeat every 30 seconds once enabled, a connection
+# silent for longer is considered dead even if it still answers pings
+IDLE_TIMEOUT = 45.0
+# Seconds start() waits for the first connection before returning
+CONNECT_TIMEOUT = 10.0
+# Messages whose exchange timestamp is older than this on arrival count as late
+LATE_MESSAGE_SECONDS = 2.0
+
+HEARTBEAT_MESSAGE = '{"type":"heartbeat"'
+
+# Ticker timestamps are epoch microseconds
+TIMESTAMP = re.compile(r'"timestamp":\s*"?(\d{10,})')
+
+
+def message_lag(message: str, now: float) -> Optional[float]:
+    """Seconds between a message's exchange timestamp and now, without parsing it"""
+    match = TIMESTAMP.search(message)
+    if match is None:
+        return None
+    return now - int(match.group(1)) / 1e6
+
+
+@dataclass
+class StreamMetrics:
+    """Counters of a websocket session, kept across reconnects"""
+
+    started_at: float = field(default_factory=time.monotonic)
+    connections: int = 0
+    failed_connections: int = 0
+    disconnects: int = 0
+    messages_received: int = 0
+    messages_dropped: int = 0
+    messages_late: int = 0
+    heartbeats: int = 0
+    max_lag_seconds: float = 0.0
+    last_message_at: Optional[float] = None
+    disconnected_at: Optional[float] = None
+    downtime_seconds: float = 0.0
+    latency_ms: Optional[float] = None
+
+    def record_disconnect(self) -> None:
+        self.disconnects += 1
+        self.disconnected_at = time.monotonic()
+
+    def record_connect(self) -> None:
+        self.connections += 1
+        if self.disconnected_at is not None:
+            self.downtime_seconds += time.monotonic() - self.disconnected_at
+            self.disconnected_at = None
+
+    def snapshot(self) -> dict[str, float]:
+        now = time.monotonic()
+        downtime = self.downtime_seconds
+        if self.disconnected_at is not None:
+            downtime += now - self.disconnected_at
+        return {
+            "uptime_seconds": now - self.started_at,
+            "connected": self.disconnected_at is None and self.connections > 0,
+            "connections": self.connections,
+            "reconnects": max(self.connections - 1, 0),
+            "failed_connections": self.failed_connections,
+            "disconnects": self.disconnects,
+            "downtime_seconds": downtime,
+            "messages_received": self.messages_received,
+            "messages_dropped": self.messages_dropped,
+            "messages_late": self.messages_late,
+            "heartbeats": self.heartbeats,
+            "max_lag_seconds": self.max_lag_seconds,
+            "seconds_since_last_message": (
+                now - self.last_message_at if self.last_message_at else None
+            ),
+            "latency_ms": self.latency_ms,
+        }
+
+
+class WebsocketSession:
+    """
+    Managed websocket subscription to the v2/ticker channel.
+
+    The session reconnects with exponential backoff and jitter whenever the
+    connection drops, fails its pings or goes silent, and then resubscribes
+    to the last symbol set, so a stream keeps running unattended. Messages
+    are passed to on_message in arrival order; a message the callback fails
+    on is counted as dropped and the session carries on.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        on_message: Callable[[str], Awaitable[None]],
+        initial_delay: float = RECONNECT_INITIAL_DELAY,
+        max_delay: float = RECONNECT_MAX_DELAY,
+        idle_timeout: float = IDLE_TIMEOUT,
+        late_seconds: float = LATE_MESSAGE_SECONDS,
+    ) -> None:
+        self.url = url
+        self.on_message = on_message
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.idle_timeout = idle_timeout
+        self.late_seconds = late_seconds
+        self.symbols: list[str] = []
+        self.ws = None
+        self.task: Optional[asyncio.Task] = None
+        self.connected = asyncio.Event()
+        self.metrics = StreamMetrics()
+
+    async def start(self, timeout: float = CONNECT_TIMEOUT) -> bool:
+        """Start the session, returns whether it connected within timeout"""
+        if self.task is None:
+            self.metrics = StreamMetrics()
+            self.task = asyncio.create_task(self.run())
+        try:
+            await asyncio.wait_for(self.connected.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Websocket not connected after {timeout}s, still retrying")
+            return False
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def subscribe(self, symbols: list[str]) -> None:
+        """Replace the subscribed symbols, also sent again after every reconnect"""
+        self.symbols = list(symbols)
+        await self.send(self.subscribe_message())
+
+    async def unsubscribe(self) -> None:
+        symbols, self.symbols = self.symbols, []
+        if symbols:
+            await self.send(
+                {
+                    "type": "unsubscribe",
+                    "payload": {
+                        "channels": [{"name": "v2/ticker", "symbols": symbols}]
+                    },
+                }
+            )
+
+    def subscribe_message(self) -> dict:
+        return {
+            "type": "subscribe",
+            "payload": {"channels": [{"name": "v2/ticker", "symbols": self.symbols}]},
+        }
+
+    async def send(self, message: dict) -> None:
+        """Send now if connected, otherwise the next connection resubscribes"""
+        if self.ws is None:
+            return
+        try:
+            await self.ws.send(json.dumps(message))
+        except ConnectionClosed:
+            # The receive loop notices too and reconnects
+            pass
+
+    async def run(self) -> None:
+        delay = self.initial_delay
+        while True:
+            try:
+                async with websockets.connect(
+                    self.url, ping_interval=PING_INTERVAL, ping_timeout=PING_TIMEOUT
+                ) as ws:
+                    self.ws = ws
+                    self.metrics.record_connect()
+                    self.connected.set()
+                    await ws.send(json.dumps({"type": "enable_heartbeat"}))
+                    if self.symbols:
+                        await ws.send(json.dumps(self.subscribe_message()))
+                    delay = self.initial_delay
+                    logger.info(
+                        f"Websocket connected to {self.url} "
+                        f"({len(self.symbols)} symbols)"
+                    )
+                    await self.receive(ws)
+                    logger.warning("Websocket closed by the exchange")
+            except asyncio.CancelledError:
+                raise
+            except ConnectionClosed as e:
+                logger.warning(f"Websocket connection closed: {e}")
+            except (OSError, InvalidHandshake, asyncio.TimeoutError) as e:
+                self.metrics.failed_connections += 1
+                logger.error(f"Websocket connection failed: {e!r}")
+            finally:
+                if self.connected.is_set():
+                    self.metrics.record_disconnect()
+                self.connected.clear()
+                self.ws = None
+
+            wait = random.uniform(delay / 2, delay)
+            logger.info(f"Reconnecting websocket in {wait:.1f}s")
+            await asyncio.sleep(wait)
+            delay = min(delay * 2, self.max_delay)
+
+    async def receive(self, ws) -> None:
+        """Deliver messages until the connection closes or goes silent"""
+        metrics = self.metrics
+        watchdog = asyncio.create_task(self.watch_idle(ws))
+        try:
+            async for message in ws:
+                now = time.monotonic()
+                metrics.last_message_at = now
+                metrics.messages_received += 1
+                if message.startswith(HEARTBEAT_MESSAGE):
+                    metrics.heartbeats += 1
+                    metrics.latency_ms = ws.latency * 1000
+                    continue
+                lag = message_lag(message, time.time())
+                if lag is not None:
+                    if lag > self.late_seconds:
+                        metrics.messages_late += 1
+                    if lag > metrics.max_lag_seconds:
+                        metrics.max_lag_seconds = lag
+                try:
+                    await self.on_message(message)
+                except Exception as e:
+                    metrics.messages_dropped += 1
+                    logger.error(f"Websocket message handler failed: {e}")
+        finally:
+            watchdog.cancel()
+
+    async def watch_idle(self, ws) -> None:
+        """Close a connection that has not delivered anything for idle_timeout"""
+        last_seen = time.monotonic()
+        while True:
+            await asyncio.sleep(self.idle_timeout / 4)
+            last_seen = max(last_seen, self.metrics.last_message_at or 0.0)
+            if time.monotonic() - last_seen > self.idle_timeout:
+                logger.warning(
+                    f"Websocket silent for {self.idle_timeout}s, reconnecting"
+                )
+                await ws.close()
+                return
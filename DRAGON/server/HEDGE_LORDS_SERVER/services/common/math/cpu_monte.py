@@ -1,55 +1,236 @@
 import numpy as np
 import pandas as pd
-from services.common.core.logging import simulator_logger as logger
+from dataclasses import dataclass
+from typing import Any, Literal
+from services.common.math.return_models import (
+    ReturnModel,
+    get_return_model,
+    log_return_params,
+)
+from services.common.math.rng import make_generator, new_seed, spawn_seeds
+from services.common.math.streaming import RunningMoments, QuantileSketch
+from services.common.types.enums import SimulationModel
 
+# Upper bound on the number of random draws held in memory at once (~32 MB of float64)
+MAX_BLOCK_ELEMENTS = 1 << 22
 
-def simulate(prices: pd.Series, candles: int, iterations: int):
-    returns = prices.pct_change().dropna()
-    log_returns = np.log(1 + returns)
 
-    mu = log_returns.mean()
-    var = log_returns.var()
-    stdev = log_returns.std()
-    drift = mu - (0.5 * var * (prices.shape[0] - 2) / prices.shape[0])
+@dataclass
+class SimulationStatistics:
+    """Summary of the simulated final prices"""
 
-    Z = np.random.laplace(size=(candles, iterations))
-    daily_returns = np.exp(drift + stdev * Z)
+    count: int
+    mean: float
+    std: float
+    min: float
+    max: float
+    quantiles: dict[float, float]
+    seed: int
 
-    price_paths = np.zeros((candles, iterations))
-    price_paths[0] = prices.iloc[-1]
-    for t in range(1, candles):
-        price_paths[t] = price_paths[t - 1] * daily_returns[t]
 
-    logger.info("Entered 2")
+def simulate(
+    prices: pd.Series,
+    candles: int,
+    iterations: int,
+    mode: Literal["full", "terminal"] = "full",
+    max_block_elements: int = MAX_BLOCK_ELEMENTS,
+    rng: np.random.Generator | None = None,
+    model: SimulationModel | str = SimulationModel.LAPLACE,
+    params: Any = None,
+) -> np.ndarray:
+    """
+    Simulates future prices from a return model calibrated on the closes.
+
+    Args:
+        prices: Historical close prices, oldest first.
+        candles: Number of candles in each path, the first one being the last close.
+        iterations: Number of simulated paths.
+        mode: "full" returns every candle of every path, "terminal" only the
+            final price of each path.
+        max_block_elements: Maximum number of random draws generated at once.
+        rng: Random generator to draw from, a fresh unseeded one if None.
+        model: Return model of the log returns, Laplace shocks by default.
+        params: Parameters of the model, calibrated on prices if None.
+
+    Returns:
+        Array of shape (candles, iterations) in "full" mode, (iterations,) in
+        "terminal" mode.
+    """
+    return_model = get_return_model(model)
+    if params is None:
+        params = return_model.calibrate(prices.to_numpy(dtype=float))
+    last_price = float(prices.iloc[-1])
+    rng = rng if rng is not None else make_generator()
+
+    if mode == "terminal":
+        return _terminal_prices(
+            last_price,
+            return_model,
+            params,
+            candles,
+            iterations,
+            max_block_elements,
+            rng,
+        )
+    elif mode == "full":
+        return _full_paths(
+            last_price,
+            return_model,
+            params,
+            candles,
+            iterations,
+            max_block_elements,
+            rng,
+        )
+    raise ValueError(f"Unknown simulation mode: {mode}")
+
+
+def _full_paths(
+    last_price: float,
+    return_model: ReturnModel,
+    params: Any,
+    candles: int,
+    iterations: int,
+    max_block_elements: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Builds whole price paths as a log-space cumulative sum, in blocks of paths"""
+    price_paths = np.empty((candles, iterations))
+    price_paths[0] = last_price
+    steps = candles - 1
+    if steps < 1:
+        return price_paths
+
+    block = max(1, max_block_elements // steps)
+    for start in range(0, iterations, block):
+        stop = min(start + block, iterations)
+        log_returns = return_model.sample(params, steps, stop - start, rng)
+        paths = price_paths[1:, start:stop]
+        np.cumsum(log_returns, axis=0, out=paths)
+        np.exp(paths, out=paths)
+        paths *= last_price
+
     return price_paths
 
 
-def get_mean_price(prices: pd.Series, candles: int, iterations: int, freq: str):
+def _terminal_prices(
+    last_price: float,
+    return_model: ReturnModel,
+    params: Any,
+    candles: int,
+    iterations: int,
+    max_block_elements: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Computes only the final price of each path from the summed log returns"""
+    steps = candles - 1
+    if steps < 1:
+        return np.full(iterations, last_price)
+
+    log_return_sum = return_model.terminal(
+        params, steps, iterations, rng, max_block_elements
+    )
+    return last_price * np.exp(log_return_sum)
+
+
+def simulate_statistics(
+    prices: pd.Series,
+    candles: int,
+    iterations: int,
+    quantiles: tuple[float, ...] = (0.05, 0.5, 0.95),
+    block_size: int = 100_000,
+    compression: int = 500,
+    seed: int | None = None,
+    model: SimulationModel | str = SimulationModel.LAPLACE,
+    params: Any = None,
+) -> SimulationStatistics:
+    """
+    Simulates final prices in fixed-size blocks and summarises them in one pass.
+
+    Only one block is held in memory at a time, so the peak memory does not
+    depend on the number of iterations. Mean and variance are exact, quantiles
+    are estimated with a QuantileSketch.
+
+    Args:
+        prices: Historical close prices, oldest first.
+        candles: Number of candles in each path, the first one being the last close.
+        iterations: Number of simulated paths.
+        quantiles: Quantiles to estimate, each in [0, 1].
+        block_size: Number of paths simulated per block.
+        compression: Size parameter of the quantile sketch.
+        seed: Seed of the run, drawn from OS entropy if None. Each block draws
+            from its own child stream.
+        model: Return model of the log returns, Laplace shocks by default.
+        params: Parameters of the model, calibrated on prices if None.
+
+    Returns:
+        SimulationStatistics of the final prices.
+    """
+    return_model = get_return_model(model)
+    if params is None:
+        params = return_model.calibrate(prices.to_numpy(dtype=float))
+    last_price = float(prices.iloc[-1])
+    moments = RunningMoments()
+    sketch = QuantileSketch(compression)
+    seed = seed if seed is not None else new_seed()
+    starts = range(0, iterations, block_size)
+
+    for start, block_seed in zip(starts, spawn_seeds(seed, len(starts))):
+        rng = make_generator(block_seed)
+        final_prices = _terminal_prices(
+            last_price,
+            return_model,
+            params,
+            candles,
+            min(block_size, iterations - start),
+            MAX_BLOCK_ELEMENTS,
+            rng,
+        )
+        moments.update(final_prices)
+        sketch.update(final_prices)
+
+    return SimulationStatistics(
+        count=moments.count,
+        mean=moments.mean,
+        std=moments.std,
+        min=moments.min,
+        max=moments.max,
+        quantiles={q: sketch.quantile(q) for q in quantiles},
+        seed=seed,
+    )
+
+
+def get_price_band(
+    prices: pd.Series, candles: int, iterations: int, freq: str
+) -> pd.DataFrame:
+    """Mean, 5th and 95th percentile of the predicted price from a single simulation"""
     predicted_time = prices.index[-1] + (candles * pd.Timedelta(freq))
     if prices.index[-1].time() != pd.to_datetime("12:00:00").time():
-        return pd.Series({predicted_time: np.nan})
-    simulations = simulate(prices, candles, iterations)
-    predicted_price = np.mean(simulations[-1])
-    return pd.Series({predicted_time: predicted_price})
+        return pd.DataFrame(
+            {"mean": np.nan, "lower": np.nan, "upper": np.nan}, index=[predicted_time]
+        )
+    stats = simulate_statistics(prices, candles, iterations, quantiles=(0.05, 0.95))
+    return pd.DataFrame(
+        {
+            "mean": stats.mean,
+            "lower": stats.quantiles[0.05],
+            "upper": stats.quantiles[0.95],
+        },
+        index=[predicted_time],
+    )
+
+
+def get_mean_price(prices: pd.Series, candles: int, iterations: int, freq: str):
+    return get_price_band(prices, candles, iterations, freq)["mean"]
 
 
 def get_upper_price(
     prices: pd.Series, candles: int, iterations: int, freq: str
 ) -> pd.DataFrame:
-    predicted_time = prices.index[-1] + (candles * pd.Timedelta(freq))
-    if prices.index[-1].time() != pd.to_datetime("12:00:00").time():
-        return pd.Series({predicted_time: np.nan})
-    simulations = simulate(prices, candles, iterations)
-    predicted_price = np.percentile(simulations[-1], 95)
-    return pd.Series({predicted_time: predicted_price})
+    return get_price_band(prices, candles, iterations, freq)["upper"]
 
 
 def get_lower_price(
     prices: pd.Series, candles: int, iterations: int, freq: str
 ) -> pd.DataFrame:
-    predicted_time = prices.index[-1] + (candles * pd.Timedelta(freq))
-    if prices.index[-1].time() != pd.to_datetime("12:00:00").time():
-        return pd.Series({predicted_time: np.nan})
-    simulations = simulate(prices, candles, iterations)
-    predicted_price = np.percentile(simulations[-1], 5)
-    return pd.Series({predicted_time: predicted_price})
+    return get_price_band(prices, candles, iterations, freq)["lower"]
@@ -1,5 +1,6 @@
 import numpy as np
-from typing import Literal, Union
+from dataclasses import dataclass
+from typing import Literal, Optional, Union
 
 
 def call_payoff(
@@ -81,3 +82,214 @@ def put_payoff(
         return total_payoff.item()
     else:
         return total_payoff
+
+
+# Upper bound of legs x prices evaluated at once, keeps the blocks in cache
+MAX_KERNEL_ELEMENTS = 1 << 18
+
+
+def leg_sides(is_call: np.ndarray, dtype: type) -> np.ndarray:
+    """+1 for calls (S - K), -1 for puts (K - S)"""
+    return np.where(np.asarray(is_call, dtype=bool).ravel(), 1, -1).astype(dtype)
+
+
+def leg_weights(
+    directions: np.ndarray,
+    lot_sizes: Union[float, np.ndarray],
+    legs: int,
+    dtype: type,
+) -> np.ndarray:
+    """Direction times lot size of each leg"""
+    weights = np.asarray(directions, dtype=dtype) * np.asarray(lot_sizes, dtype=dtype)
+    return np.ascontiguousarray(np.broadcast_to(weights, (legs,)))
+
+
+def leg_payoffs(
+    prices: np.ndarray,
+    strikes: np.ndarray,
+    premiums: np.ndarray,
+    directions: np.ndarray,
+    is_call: np.ndarray,
+    lot_sizes: Union[float, np.ndarray] = 1.0,
+    dtype: type = np.float64,
+) -> np.ndarray:
+    """
+    Payoff of each leg at each price, as a (legs, prices) matrix.
+
+    Args:
+        prices: Underlying asset prices, shape (n,).
+        strikes, premiums, directions, is_call: One entry per leg. directions
+            are 1 (buy) or -1 (sell), is_call is True for calls, False for puts.
+        lot_sizes: Lot size per leg, or one for all legs.
+        dtype: np.float64, or np.float32 to halve memory traffic.
+
+    Returns:
+        Matrix whose row i equals call_payoff/put_payoff of leg i.
+    """
+    prices = np.asarray(prices, dtype=dtype).ravel()
+    strikes = np.asarray(strikes, dtype=dtype).ravel()
+    sides = leg_sides(is_call, dtype)
+    weights = leg_weights(directions, lot_sizes, strikes.size, dtype)
+
+    payoffs = (prices[None, :] - strikes[:, None]) * sides[:, None]
+    np.maximum(payoffs, 0, out=payoffs)
+    payoffs -= np.asarray(premiums, dtype=dtype).reshape(-1, 1)
+    payoffs *= weights[:, None]
+    return payoffs
+
+
+def portfolio_payoff(
+    prices: np.ndarray,
+    strikes: np.ndarray,
+    premiums: np.ndarray,
+    directions: np.ndarray,
+    is_call: np.ndarray,
+    lot_sizes: Union[float, np.ndarray] = 1.0,
+    dtype: type = np.float64,
+    max_block_elements: int = MAX_KERNEL_ELEMENTS,
+) -> np.ndarray:
+    """
+    Total payoff of a multi-leg position at each price.
+
+    Evaluates all call legs and all put legs against a block of prices as
+    (legs, block) matrices and sums them with one matrix-vector product each.
+    Blocks keep the matrices cache sized. Works the same for a diagram's price
+    grid and a Monte Carlo terminal distribution.
+
+    Returns:
+        Array of shape (n,) with the summed payoff, in the given dtype.
+    """
+    prices = np.asarray(prices, dtype=dtype).ravel()
+    strikes = np.asarray(strikes, dtype=dtype).ravel()
+    legs = strikes.size
+    if legs == 0:
+        return np.zeros_like(prices)
+
+    calls = np.asarray(is_call, dtype=bool).ravel()
+    weights = leg_weights(directions, lot_sizes, legs, dtype)
+    # Premiums do not depend on the price, sum them once
+    premium_total = dtype(np.dot(weights, np.asarray(premiums, dtype=dtype)))
+    call_strikes, call_weights = strikes[calls], weights[calls]
+    put_strikes, put_weights = strikes[~calls], weights[~calls]
+
+    total = np.empty_like(prices)
+    block = max(1, min(prices.size, max_block_elements // legs))
+    call_buffer = np.empty((call_strikes.size, block), dtype=dtype)
+    put_buffer = np.empty((put_strikes.size, block), dtype=dtype)
+    for start in range(0, prices.size, block):
+        chunk = prices[start : start + block]
+        out = total[start : start + block]
+        intrinsic = call_buffer[:, : chunk.size]
+        np.subtract(chunk[None, :], call_strikes[:, None], out=intrinsic)
+        np.maximum(intrinsic, 0, out=intrinsic)
+        np.dot(call_weights, intrinsic, out=out)
+        if put_strikes.size:
+            intrinsic = put_buffer[:, : chunk.size]
+            np.subtract(put_strikes[:, None], chunk[None, :], out=intrinsic)
+            np.maximum(intrinsic, 0, out=intrinsic)
+            out += put_weights @ intrinsic
+    total -= premium_total
+    return total
+
+
+@dataclass(frozen=True)
+class PiecewisePayoff:
+    """
+    Exact expiry payoff of a portfolio of vanilla options, which is linear
+    between strikes. kinks are the distinct strikes in increasing order and
+    values the payoff at each of them; below the first kink the payoff moves
+    by left_slope per unit of price, above the last by right_slope.
+    """
+
+    kinks: np.ndarray
+    values: np.ndarray
+    left_slope: float
+    right_slope: float
+
+    def __call__(self, prices: Union[float, np.ndarray]) -> np.ndarray:
+        prices = np.asarray(prices, dtype=np.float64)
+        if self.kinks.size == 0:
+            return np.zeros_like(prices)
+        first, last = self.kinks[0], self.kinks[-1]
+        return np.where(
+            prices < first,
+            self.values[0] + self.left_slope * (prices - first),
+            np.where(
+                prices > last,
+                self.values[-1] + self.right_slope * (prices - last),
+                np.interp(prices, self.kinks, self.values),
+            ),
+        )
+
+    def vertices(self) -> tuple[np.ndarray, np.ndarray]:
+        """Price 0 (prices cannot go lower) followed by the kinks, with their payoffs"""
+        if self.kinks.size == 0 or self.kinks[0] <= 0:
+            return self.kinks, self.values
+        zero = self.values[0] - self.left_slope * self.kinks[0]
+        return np.r_[0.0, self.kinks], np.r_[zero, self.values]
+
+    def breakevens(self) -> np.ndarray:
+        """Prices where the payoff crosses or touches zero, in increasing order"""
+        prices, values = self.vertices()
+        if prices.size == 0:
+            return prices
+        roots = [prices[values == 0]]
+        # Sign changes between consecutive vertices
+        crossing = values[:-1] * values[1:] < 0
+        left, right = prices[:-1][crossing], prices[1:][crossing]
+        low, high = values[:-1][crossing], values[1:][crossing]
+        roots.append(left - low * (right - left) / (high - low))
+        # Beyond the last kink
+        if values[-1] * self.right_slope < 0:
+            roots.append([prices[-1] - values[-1] / self.right_slope])
+        return np.unique(np.concatenate(roots))
+
+    def max_profit(self) -> Optional[float]:
+        """Highest payoff for prices from 0 up, None when unbounded"""
+        if self.right_slope > 0:
+            return None
+        _, values = self.vertices()
+        return float(values.max()) if values.size else 0.0
+
+    def max_loss(self) -> Optional[float]:
+        """Lowest payoff for prices from 0 up, None when unbounded"""
+        if self.right_slope < 0:
+            return None
+        _, values = self.vertices()
+        return float(values.min()) if values.size else 0.0
+
+    def points(self, low: float, high: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The kinks inside (low, high) with both ends, and their payoffs. Joined
+        by straight lines they draw the payoff exactly.
+        """
+        inside = self.kinks[(self.kinks > low) & (self.kinks < high)]
+        prices = np.r_[low, inside, high]
+        return prices, self(prices)
+
+
+def piecewise_payoff(
+    strikes: np.ndarray,
+    premiums: np.ndarray,
+    directions: np.ndarray,
+    is_call: np.ndarray,
+    lot_sizes: Union[float, np.ndarray] = 1.0,
+) -> PiecewisePayoff:
+    """
+    Exact payoff of a multi-leg position, from its breakpoints: the payoff
+    at every distinct strike plus the slopes outside them. Every call adds
+    its weight to the slope above its strike, every put subtracts it below.
+    """
+    strikes = np.asarray(strikes, dtype=np.float64).ravel()
+    calls = np.asarray(is_call, dtype=bool).ravel()
+    weights = leg_weights(directions, lot_sizes, strikes.size, np.float64)
+    kinks = np.unique(strikes)
+    values = leg_payoffs(kinks, strikes, premiums, directions, calls, lot_sizes).sum(
+        axis=0
+    )
+    return PiecewisePayoff(
+        kinks=kinks,
+        values=values,
+        left_slope=-float(weights[~calls].sum()),
+        right_slope=float(weights[calls].sum()),
+    )
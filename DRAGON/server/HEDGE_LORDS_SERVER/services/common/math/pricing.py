@@ -0,0 +1,325 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Literal, Union
+
+ArrayLike = Union[float, np.ndarray]
+
+SQRT_2PI = np.sqrt(2 * np.pi)
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+DAYS_PER_YEAR = 365
+
+# Hart (1968) rational approximation of the normal tail, double precision
+_HART_NUMERATOR = (
+    3.52624965998911e-02,
+    0.700383064443688,
+    6.37396220353165,
+    33.912866078383,
+    112.079291497871,
+    221.213596169931,
+    220.206867912376,
+)
+_HART_DENOMINATOR = (
+    8.83883476483184e-02,
+    1.75566716318264,
+    16.064177579207,
+    86.7807322029461,
+    296.564248779674,
+    637.333633378831,
+    793.826512519948,
+    440.413735824752,
+)
+
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    """Standard normal CDF, accurate to about 1e-14 without scipy"""
+    x = np.asarray(x, dtype=float)
+    z = np.abs(x)
+
+    # Horner steps in place, the chain grids are large
+    numerator = np.full_like(z, _HART_NUMERATOR[0])
+    for coefficient in _HART_NUMERATOR[1:]:
+        numerator *= z
+        numerator += coefficient
+    denominator = np.full_like(z, _HART_DENOMINATOR[0])
+    for coefficient in _HART_DENOMINATOR[1:]:
+        denominator *= z
+        denominator += coefficient
+    tail = np.exp(-0.5 * z * z)
+    tail *= numerator
+    tail /= denominator
+
+    # Continued fraction for the far tail
+    far = z >= 7.07106781186547
+    if far.any():
+        zf = z[far]
+        fraction = zf + 0.65
+        for k in (4, 3, 2, 1):
+            fraction = zf + k / fraction
+        tail[far] = np.exp(-0.5 * zf * zf) / fraction / SQRT_2PI
+    return np.where(x > 0, 1 - tail, tail)
+
+
+@dataclass
+class OptionGreeks:
+    """
+    Price and Greeks per option, one array entry per contract.
+
+    vega and rho are per 1% move of volatility and rate, theta is per
+    calendar day, the convention the exchange uses for its Greeks.
+    """
+
+    price: np.ndarray
+    delta: np.ndarray
+    gamma: np.ndarray
+    vega: np.ndarray
+    theta: np.ndarray
+    rho: np.ndarray
+
+
+def _broadcast(*arrays: ArrayLike) -> list[np.ndarray]:
+    return [np.asarray(a, dtype=float) for a in np.broadcast_arrays(*arrays)]
+
+
+def _generalized_black(
+    underlying: ArrayLike,
+    strike: ArrayLike,
+    time_to_expiry: ArrayLike,
+    volatility: ArrayLike,
+    is_call: ArrayLike,
+    rate: ArrayLike,
+    carry: ArrayLike,
+    model: Literal["black_scholes", "black76"],
+) -> OptionGreeks:
+    """
+    Generalized Black-Scholes with cost of carry b (Haug): b = r - q prices
+    options on spot, b = 0 options on a forward (Black-76).
+
+    Expired contracts and zero volatility give the discounted intrinsic value.
+    """
+    S, K, T, sigma, rate, carry = _broadcast(
+        underlying, strike, time_to_expiry, volatility, rate, carry
+    )
+    call = np.broadcast_to(np.asarray(is_call, dtype=bool), S.shape)
+    sign = np.where(call, 1.0, -1.0)
+
+    live = (T > 0) & (sigma > 0)
+    T_safe = np.where(live, T, 1.0)
+    sigma_safe = np.where(live, sigma, 1.0)
+    sqrt_t = np.sqrt(T_safe)
+    vol_sqrt_t = sigma_safe * sqrt_t
+
+    carry_discount = np.exp((carry - rate) * T)
+    discount = np.exp(-rate * T)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = (np.log(S / K) + (carry + 0.5 * sigma_safe**2) * T_safe) / vol_sqrt_t
+    d2 = d1 - vol_sqrt_t
+    n_d1 = norm_pdf(d1)
+    N_d1 = norm_cdf(sign * d1)
+    N_d2 = norm_cdf(sign * d2)
+
+    price = sign * (S * carry_discount * N_d1 - K * discount * N_d2)
+    delta = sign * carry_discount * N_d1
+    gamma = carry_discount * n_d1 / (S * vol_sqrt_t)
+    vega = S * carry_discount * n_d1 * sqrt_t
+    theta = (
+        -S * carry_discount * n_d1 * sigma_safe / (2 * sqrt_t)
+        - sign * (carry - rate) * S * carry_discount * N_d1
+        - sign * rate * K * discount * N_d2
+    )
+    if model == "black76":
+        rho = -T_safe * price
+    else:
+        rho = sign * K * T_safe * discount * N_d2
+
+    # Expired or zero volatility: intrinsic value of the forward
+    forward = S * carry_discount
+    intrinsic = np.maximum(sign * (forward - K * discount), 0.0)
+    in_the_money = sign * (forward - K * discount) > 0
+    price = np.where(live, price, intrinsic)
+    delta = np.where(live, delta, np.where(in_the_money, sign * carry_discount, 0.0))
+    zero = np.zeros_like(price)
+    return OptionGreeks(
+        price=price,
+        delta=delta,
+        gamma=np.where(live, gamma, zero),
+        vega=np.where(live, vega / 100, zero),
+        theta=np.where(live, theta / DAYS_PER_YEAR, zero),
+        rho=np.where(live, rho / 100, zero),
+    )
+
+
+def black_scholes(
+    spot: ArrayLike,
+    strike: ArrayLike,
+    time_to_expiry: ArrayLike,
+    volatility: ArrayLike,
+    is_call: ArrayLike,
+    rate: ArrayLike = 0.0,
+    dividend_yield: ArrayLike = 0.0,
+) -> OptionGreeks:
+    """
+    Black-Scholes price and Greeks of options on spot.
+
+    Args:
+        spot: Underlying spot price(s).
+        strike: Strike price(s).
+        time_to_expiry: Years to expiry, see years_to_expiry.
+        volatility: Annualized volatility, 0.5 for 50%.
+        is_call: True for calls, False for puts.
+        rate: Continuously compounded risk-free rate.
+        dividend_yield: Continuous yield of the underlying.
+
+    All arguments broadcast against each other, so a whole chain is priced
+    in one call.
+    """
+    carry = np.asarray(rate, dtype=float) - np.asarray(dividend_yield, dtype=float)
+    return _generalized_black(
+        spot, strike, time_to_expiry, volatility, is_call, rate, carry, "black_scholes"
+    )
+
+
+def black76(
+    forward: ArrayLike,
+    strike: ArrayLike,
+    time_to_expiry: ArrayLike,
+    volatility: ArrayLike,
+    is_call: ArrayLike,
+    rate: ArrayLike = 0.0,
+) -> OptionGreeks:
+    """Black-76 price and Greeks of options on a forward or future, see black_scholes"""
+    return _generalized_black(
+        forward, strike, time_to_expiry, volatility, is_call, rate, 0.0, "black76"
+    )
+
+
+def black_scholes_price(
+    spot: ArrayLike,
+    strike: ArrayLike,
+    time_to_expiry: ArrayLike,
+    volatility: ArrayLike,
+    is_call: ArrayLike,
+    rate: ArrayLike = 0.0,
+) -> np.ndarray:
+    """
+    Black-Scholes price only, for large grids where the Greeks are not
+    needed. Same conventions as black_scholes.
+    """
+    S, K, T, sigma, rate = _broadcast(spot, strike, time_to_expiry, volatility, rate)
+    sign = np.where(np.asarray(is_call, dtype=bool), 1.0, -1.0)
+
+    live = (T > 0) & (sigma > 0)
+    vol_sqrt_t = np.where(live, sigma * np.sqrt(T), 1.0)
+    strike_value = K * np.exp(-rate * T)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = np.log(S / strike_value) / vol_sqrt_t + 0.5 * vol_sqrt_t
+    price = sign * (
+        S * norm_cdf(sign * d1) - strike_value * norm_cdf(sign * (d1 - vol_sqrt_t))
+    )
+    intrinsic = np.maximum(sign * (S - strike_value), 0.0)
+    return np.where(live, price, intrinsic)
+
+
+def implied_volatility(
+    price: ArrayLike,
+    underlying: ArrayLike,
+    strike: ArrayLike,
+    time_to_expiry: ArrayLike,
+    is_call: ArrayLike,
+    rate: ArrayLike = 0.0,
+    dividend_yield: ArrayLike = 0.0,
+    model: Literal["black_scholes", "black76"] = "black_scholes",
+    tolerance: float = 1e-8,
+    max_iterations: int = 50,
+    lower: float = 1e-4,
+    upper: float = 10.0,
+) -> np.ndarray:
+    """
+    Implied volatility of every option at once.
+
+    Vectorized Newton iteration on vega, safeguarded by a bracket: an
+    element falls back to bisection whenever its Newton step leaves the
+    bracket, which always contains the solution. Prices outside the
+    no-arbitrage bounds give NaN.
+    """
+    price, S, K, T, rate, dividend_yield = _broadcast(
+        price, underlying, strike, time_to_expiry, rate, dividend_yield
+    )
+    call = np.broadcast_to(np.asarray(is_call, dtype=bool), S.shape)
+    carry = np.zeros_like(S) if model == "black76" else rate - dividend_yield
+
+    def model_price(volatility: np.ndarray) -> OptionGreeks:
+        return _generalized_black(S, K, T, volatility, call, rate, carry, model)
+
+    low = np.full_like(S, lower)
+    high = np.full_like(S, upper)
+    min_price = model_price(low).price
+    max_price = model_price(high).price
+    valid = (T > 0) & (price >= min_price) & (price <= max_price)
+
+    # Manaster-Koehler start, converges monotonically for most of the chain
+    forward = S * np.exp(carry * T)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volatility = np.sqrt(2 * np.abs(np.log(forward / K)) / np.where(T > 0, T, 1))
+    volatility = np.clip(np.nan_to_num(volatility, nan=0.5), 0.1, upper / 2)
+
+    active = valid.copy()
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+        greeks = model_price(volatility)
+        error = greeks.price - price
+        converged = np.abs(error) <= tolerance * np.maximum(price, 1.0)
+        active &= ~converged
+
+        # The price increases with volatility, so the sign tightens the bracket
+        high = np.where(active & (error > 0), volatility, high)
+        low = np.where(active & (error < 0), volatility, low)
+        vega = greeks.vega * 100
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = volatility - error / vega
+        bisect = (newton <= low) | (newton >= high) | ~np.isfinite(newton)
+        step = np.where(bisect, 0.5 * (low + high), newton)
+        volatility = np.where(active, step, volatility)
+
+    return np.where(valid, volatility, np.nan)
+
+
+def years_to_expiry(
+    expiry: np.ndarray, now: np.datetime64, minimum: float = 0.0
+) -> np.ndarray:
+    """Year fractions between now and datetime64 expiries, floored at minimum"""
+    seconds = (
+        np.asarray(expiry, dtype="datetime64[s]") - np.datetime64(now, "s")
+    ).astype(float)
+    return np.maximum(seconds / SECONDS_PER_YEAR, minimum)
+
+
+def reprice_chain(
+    spot: float,
+    strike: np.ndarray,
+    time_to_expiry: np.ndarray,
+    volatility: np.ndarray,
+    is_call: np.ndarray,
+    spot_shock: float = 0.0,
+    vol_shock: float = 0.0,
+    rate: float = 0.0,
+) -> OptionGreeks:
+    """
+    Black-Scholes prices and Greeks of a chain after a relative spot shock
+    (0.1 for +10%) and an absolute volatility shock (0.05 for +5 vol points).
+    """
+    shocked_volatility = np.maximum(
+        np.asarray(volatility, dtype=float) + vol_shock, 0.0
+    )
+    return black_scholes(
+        spot * (1 + spot_shock),
+        strike,
+        time_to_expiry,
+        shocked_volatility,
+        is_call,
+        rate,
+    )
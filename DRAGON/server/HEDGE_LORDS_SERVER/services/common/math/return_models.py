@@ -0,0 +1,354 @@
+import numpy as np
+import pandas as pd
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+from services.common.types.enums import SimulationModel
+
+# Calibrated parameter sets kept in memory
+MAX_CACHED_CALIBRATIONS = 256
+# GARCH(1,1) maximum likelihood grid search: points per axis, zoom rounds and
+# most recent returns used
+GARCH_GRID_POINTS = 24
+GARCH_REFINEMENTS = 3
+GARCH_MAX_RETURNS = 5000
+# Returns further from the median than this many robust standard deviations
+# are counted as jumps by the Merton calibration
+JUMP_THRESHOLD = 4.0
+# Median absolute deviation to standard deviation of a normal distribution
+MAD_TO_STD = 1.4826
+
+
+def log_returns(closes: np.ndarray) -> np.ndarray:
+    """Per-candle log returns of a close series, oldest first"""
+    return np.diff(np.log(np.asarray(closes, dtype=float)))
+
+
+def log_return_params(prices: pd.Series) -> tuple[float, float]:
+    """
+    Estimates the per-candle drift and volatility of the log returns.
+
+    Args:
+        prices: Historical close prices, oldest first.
+
+    Returns:
+        Tuple of (drift, stdev) for the log return of a single candle.
+    """
+    returns = prices.pct_change().dropna()
+    log_returns = np.log(1 + returns)
+
+    mu = log_returns.mean()
+    var = log_returns.var()
+    stdev = log_returns.std()
+    drift = mu - (0.5 * var * (prices.shape[0] - 2) / prices.shape[0])
+    return float(drift), float(stdev)
+
+
+class ReturnModel(ABC):
+    """
+    Distribution of per-candle log returns. Parameters are fitted once on a
+    close series, then paths are drawn for any number of candles; both are
+    vectorized over the whole series or all paths at once.
+    """
+
+    @abstractmethod
+    def calibrate(self, closes: np.ndarray) -> Any:
+        """Fit the parameters on historical closes, oldest first"""
+
+    @abstractmethod
+    def sample(
+        self, params: Any, steps: int, paths: int, rng: np.random.Generator
+    ) -> np.ndarray:
+        """Log returns of the next steps candles, (steps, paths)"""
+
+    def terminal(
+        self,
+        params: Any,
+        steps: int,
+        paths: int,
+        rng: np.random.Generator,
+        max_block_elements: int,
+    ) -> np.ndarray:
+        """Sum of the next steps log returns of each path, (paths,)"""
+        total = np.empty(paths)
+        block = max(1, max_block_elements // steps)
+        for start in range(0, paths, block):
+            stop = min(start + block, paths)
+            total[start:stop] = self.sample(params, steps, stop - start, rng).sum(
+                axis=0
+            )
+        return total
+
+
+@dataclass(frozen=True)
+class LaplaceParams:
+    drift: float
+    stdev: float
+
+
+class LaplaceModel(ReturnModel):
+    """Laplace shocks scaled by the sample volatility, around the sample drift"""
+
+    def calibrate(self, closes: np.ndarray) -> LaplaceParams:
+        return LaplaceParams(*log_return_params(pd.Series(closes)))
+
+    def sample(self, params, steps, paths, rng):
+        returns = rng.laplace(size=(steps, paths))
+        returns *= params.stdev
+        returns += params.drift
+        return returns
+
+    def terminal(self, params, steps, paths, rng, max_block_elements):
+        # A Laplace(0, 1) draw is the difference of two Exp(1) draws, so the
+        # sum of n of them is exactly the difference of two Gamma(n, 1) draws
+        shock_sum = rng.gamma(steps, size=paths)
+        shock_sum -= rng.gamma(steps, size=paths)
+        return steps * params.drift + params.stdev * shock_sum
+
+
+@dataclass(frozen=True)
+class GBMParams:
+    drift: float
+    volatility: float
+
+
+class GBMModel(ReturnModel):
+    """Geometric Brownian motion: i.i.d. normal log returns"""
+
+    def calibrate(self, closes: np.ndarray) -> GBMParams:
+        returns = log_returns(closes)
+        return GBMParams(float(returns.mean()), float(returns.std(ddof=1)))
+
+    def sample(self, params, steps, paths, rng):
+        returns = rng.standard_normal((steps, paths))
+        returns *= params.volatility
+        returns += params.drift
+        return returns
+
+    def terminal(self, params, steps, paths, rng, max_block_elements):
+        return steps * params.drift + np.sqrt(
+            steps
+        ) * params.volatility * rng.standard_normal(paths)
+
+
+@dataclass(frozen=True, eq=False)
+class BootstrapParams:
+    returns: np.ndarray
+
+
+class BootstrapModel(ReturnModel):
+    """Historical bootstrap: log returns resampled with replacement"""
+
+    def calibrate(self, closes: np.ndarray) -> BootstrapParams:
+        returns = log_returns(closes)
+        if returns.size == 0:
+            raise ValueError("Bootstrap needs at least two closes")
+        return BootstrapParams(returns)
+
+    def sample(self, params, steps, paths, rng):
+        return params.returns[rng.integers(0, params.returns.size, (steps, paths))]
+
+
+@dataclass(frozen=True)
+class GARCHParams:
+    mu: float
+    omega: float
+    alpha: float
+    beta: float
+    # Conditional variance of the first simulated candle
+    variance: float
+
+
+def garch_log_likelihoods(
+    residuals: np.ndarray, variance: float, alpha: np.ndarray, beta: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gaussian GARCH(1,1) log likelihoods (up to a constant) of many
+    (alpha, beta) candidates at once, with variance targeting. One pass over
+    the residuals updates every candidate's variance together.
+
+    Returns the log likelihoods and each candidate's next-candle variance.
+    """
+    omega = variance * (1 - alpha - beta)
+    conditional = np.full(alpha.shape, variance)
+    log_likelihood = np.zeros(alpha.shape)
+    for squared in residuals * residuals:
+        log_likelihood -= np.log(conditional) + squared / conditional
+        conditional *= beta
+        conditional += omega + alpha * squared
+    return 0.5 * log_likelihood, conditional
+
+
+class GARCHModel(ReturnModel):
+    """
+    GARCH(1,1) volatility clustering with normal innovations, fitted by
+    maximum likelihood over a zooming (alpha, persistence) grid.
+    """
+
+    def calibrate(self, closes: np.ndarray) -> GARCHParams:
+        returns = log_returns(closes)[-GARCH_MAX_RETURNS:]
+        mu = float(returns.mean())
+        residuals = returns - mu
+        variance = float(residuals.var())
+        if returns.size < 10 or variance == 0:
+            return GARCHParams(mu, variance, 0.0, 0.0, variance)
+
+        # Persistence alpha + beta and the share of it due to alpha, so every
+        # grid point is stationary
+        persistence = np.array([0.2, 0.999])
+        share = np.array([0.01, 0.6])
+        for _ in range(GARCH_REFINEMENTS + 1):
+            p, s = np.meshgrid(
+                np.linspace(*persistence, GARCH_GRID_POINTS),
+                np.linspace(*share, GARCH_GRID_POINTS),
+            )
+            alpha, beta = (s * p).ravel(), ((1 - s) * p).ravel()
+            log_likelihood, next_variance = garch_log_likelihoods(
+                residuals, variance, alpha, beta
+            )
+            index = int(np.nanargmax(log_likelihood))
+            best = (alpha[index], beta[index], next_variance[index])
+            # Zoom on the best point, a quarter of the span on each side
+            persistence = np.clip(
+                p.ravel()[index] + np.diff(persistence) / 4 * np.array([-1, 1]),
+                0.01,
+                0.999,
+            )
+            share = np.clip(
+                s.ravel()[index] + np.diff(share) / 4 * np.array([-1, 1]), 0.001, 0.999
+            )
+
+        alpha, beta, next_variance = best
+        return GARCHParams(
+            mu=mu,
+            omega=variance * (1 - alpha - beta),
+            alpha=float(alpha),
+            beta=float(beta),
+            variance=float(next_variance),
+        )
+
+    def sample(self, params, steps, paths, rng):
+        returns = rng.standard_normal((steps, paths))
+        conditional = np.full(paths, params.variance)
+        for step in returns:
+            step *= np.sqrt(conditional)
+            conditional *= params.beta
+            conditional += params.omega + params.alpha * step * step
+        returns += params.mu
+        return returns
+
+
+@dataclass(frozen=True)
+class MertonParams:
+    drift: float
+    volatility: float
+    # Expected jumps per candle, and the normal distribution of a jump
+    jump_intensity: float
+    jump_mean: float
+    jump_std: float
+
+
+class MertonModel(ReturnModel):
+    """
+    Merton jump-diffusion: normal log returns plus Poisson arriving normal
+    jumps. Returns beyond JUMP_THRESHOLD robust (MAD) standard deviations are
+    taken as jumps, the rest as the diffusion.
+    """
+
+    def calibrate(self, closes: np.ndarray) -> MertonParams:
+        returns = log_returns(closes)
+        median = np.median(returns)
+        scale = MAD_TO_STD * np.median(np.abs(returns - median))
+        jumps = (
+            np.abs(returns - median) > JUMP_THRESHOLD * scale
+            if scale > 0
+            else np.zeros(returns.shape, dtype=bool)
+        )
+        diffusion = returns[~jumps]
+        drift = float(diffusion.mean())
+        jump_sizes = returns[jumps] - drift
+        return MertonParams(
+            drift=drift,
+            volatility=float(diffusion.std(ddof=1)),
+            jump_intensity=float(jumps.mean()),
+            jump_mean=float(jump_sizes.mean()) if jump_sizes.size else 0.0,
+            jump_std=float(jump_sizes.std(ddof=1)) if jump_sizes.size > 1 else 0.0,
+        )
+
+    def jumps(self, params, counts: np.ndarray, rng) -> np.ndarray:
+        """Sum of counts normal jumps, drawn as one normal per count"""
+        return counts * params.jump_mean + np.sqrt(
+            counts
+        ) * params.jump_std * rng.standard_normal(counts.shape)
+
+    def sample(self, params, steps, paths, rng):
+        returns = rng.standard_normal((steps, paths))
+        returns *= params.volatility
+        returns += params.drift
+        if params.jump_intensity > 0:
+            returns += self.jumps(
+                params, rng.poisson(params.jump_intensity, (steps, paths)), rng
+            )
+        return returns
+
+    def terminal(self, params, steps, paths, rng, max_block_elements):
+        total = steps * params.drift + np.sqrt(
+            steps
+        ) * params.volatility * rng.standard_normal(paths)
+        if params.jump_intensity > 0:
+            total += self.jumps(
+                params, rng.poisson(params.jump_intensity * steps, paths), rng
+            )
+        return total
+
+
+RETURN_MODELS: dict[SimulationModel, ReturnModel] = {
+    SimulationModel.LAPLACE: LaplaceModel(),
+    SimulationModel.BOOTSTRAP: BootstrapModel(),
+    SimulationModel.GBM: GBMModel(),
+    SimulationModel.GARCH: GARCHModel(),
+    SimulationModel.MERTON: MertonModel(),
+}
+
+
+def get_return_model(model: SimulationModel | str) -> ReturnModel:
+    return RETURN_MODELS[SimulationModel(model)]
+
+
+class CalibrationCache:
+    """
+    Calibrated parameters per (data key, model), so repeated simulations of
+    the same history skip refitting. The key should identify the close series,
+    e.g. (symbol, resolution, data hash). Least recently used entries are
+    dropped beyond max_entries. Safe to call from worker threads; the fit runs
+    outside the lock, so concurrent misses of one key may each fit it.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_CALIBRATIONS) -> None:
+        self.max_entries = max_entries
+        self.entries: OrderedDict[tuple, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def calibrate(
+        self, key: Hashable, model: SimulationModel | str, closes: np.ndarray
+    ) -> Any:
+        model = SimulationModel(model)
+        entry_key = (key, model)
+        with self.lock:
+            params = self.entries.get(entry_key)
+            if params is not None:
+                self.entries.move_to_end(entry_key)
+                self.hits += 1
+                return params
+            self.misses += 1
+
+        params = get_return_model(model).calibrate(closes)
+        with self.lock:
+            self.entries[entry_key] = params
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return params
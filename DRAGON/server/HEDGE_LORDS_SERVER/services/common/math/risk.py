@@ -0,0 +1,90 @@
+import numpy as np
+from typing import Sequence
+from services.common.math.pricing import (
+    SECONDS_PER_YEAR,
+    OptionGreeks,
+    black_scholes_price,
+)
+
+# Confidence levels of the value at risk reported by default
+CONFIDENCE_LEVELS = (0.95, 0.99)
+
+
+def path_pnl(
+    paths: np.ndarray,
+    seconds_to_expiry: np.ndarray,
+    strikes: np.ndarray,
+    volatilities: np.ndarray,
+    is_call: np.ndarray,
+    directions: np.ndarray,
+    premiums: np.ndarray,
+    lot_size: float = 1.0,
+) -> np.ndarray:
+    """
+    Mark-to-market P&L of a portfolio along simulated price paths.
+
+    Args:
+        paths: Underlying prices, (steps, paths).
+        seconds_to_expiry: Time left on each leg at each step, (steps, legs).
+        strikes, volatilities, is_call, directions, premiums: Per leg, (legs,).
+            Legs without a volatility (0) are valued at intrinsic value.
+        lot_size: Contract size multiplier.
+
+    Returns:
+        (steps, paths) P&L, premiums paid included. At a leg's expiry its value
+        is the payoff, so the last step of paths ending at expiry is the
+        terminal P&L.
+    """
+    paths = np.asarray(paths, dtype=float)
+    time_to_expiry = np.maximum(seconds_to_expiry, 0.0) / SECONDS_PER_YEAR
+    pnl = np.full(paths.shape, -float(np.dot(directions, premiums)))
+    # One pass over the path matrix per leg keeps the peak memory at a few paths
+    # matrices, whatever the number of legs
+    for leg in range(len(strikes)):
+        pnl += directions[leg] * black_scholes_price(
+            paths,
+            strikes[leg],
+            time_to_expiry[:, leg, None],
+            volatilities[leg],
+            is_call[leg],
+        )
+    pnl *= lot_size
+    return pnl
+
+
+def value_at_risk(
+    pnl: np.ndarray, confidence_levels: Sequence[float] = CONFIDENCE_LEVELS
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Historical-simulation VaR and CVaR (expected shortfall) of a P&L sample,
+    as positive losses, one per confidence level. A single sort serves every
+    level.
+    """
+    pnl = np.sort(np.asarray(pnl, dtype=float).ravel())
+    levels = np.asarray(confidence_levels, dtype=float)
+    # Number of outcomes in each tail, at least one. Rounded first, as
+    # (1 - 0.95) * 10000 is slightly above 500 in floating point
+    tail = np.ceil(np.round((1 - levels) * pnl.size, 6)).astype(int)
+    tail = np.maximum(tail, 1)
+    tail_means = np.cumsum(pnl)[tail - 1] / tail
+    return -pnl[tail - 1], -tail_means
+
+
+def max_drawdowns(pnl: np.ndarray) -> np.ndarray:
+    """
+    Largest peak to trough fall of each path's P&L, (steps, paths) -> (paths,).
+    Paths start from zero P&L at entry, which counts as the first peak.
+    """
+    peaks = np.maximum.accumulate(np.maximum(pnl, 0.0), axis=0)
+    return (peaks - pnl).max(axis=0)
+
+
+def portfolio_greeks(
+    greeks: OptionGreeks, directions: np.ndarray, lot_size: float = 1.0
+) -> dict[str, float]:
+    """Position weighted sum of per leg Greeks"""
+    weights = lot_size * np.asarray(directions, dtype=float)
+    return {
+        name: float(weights @ getattr(greeks, name))
+        for name in ("delta", "gamma", "vega", "theta", "rho")
+    }
@@ -0,0 +1,23 @@
+import numpy as np
+
+
+def new_seed() -> int:
+    """Draws a fresh 128-bit seed from OS entropy, so the run can be recorded and replayed"""
+    return int(np.random.SeedSequence().entropy)
+
+
+def spawn_seeds(seed: int, n: int) -> list[np.random.SeedSequence]:
+    """
+    Derives n independent, reproducible child seed sequences from one seed.
+
+    Child i only depends on (seed, i), so a run split into n blocks gives the
+    same numbers no matter how the blocks are distributed across workers.
+    """
+    return np.random.SeedSequence(seed).spawn(n)
+
+
+def make_generator(
+    seed: int | np.random.SeedSequence | None = None,
+) -> np.random.Generator:
+    """Creates a PCG64 generator, seeded from OS entropy if seed is None"""
+    return np.random.default_rng(seed)
@@ -0,0 +1,259 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+# Structures searched when the request names none
+STRUCTURES = ("vertical", "straddle", "strangle", "butterfly", "iron_condor")
+# Widest butterfly and condor wing, in strike steps
+MAX_WING_STEPS = 4
+# Candidates x paths of P&L held at once, 4 MB in float32
+MAX_SCORE_ELEMENTS = 1 << 20
+
+
+@dataclass
+class StrategyCandidates:
+    """
+    Multi-leg strategies over one expiry's chain. Row i of quantities holds
+    the signed contracts of strategy i in each chain contract (+1 bought,
+    -1 sold, -2 for the body of a butterfly), premiums the net premium paid
+    per unit, negative for a credit.
+    """
+
+    structures: np.ndarray
+    quantities: np.ndarray
+    premiums: np.ndarray
+    strikes: np.ndarray
+    is_call: np.ndarray
+
+    def __len__(self) -> int:
+        return self.structures.size
+
+    def legs(self, candidate: int) -> list[tuple[int, float]]:
+        """Chain contracts and quantities of a candidate"""
+        row = self.quantities[candidate]
+        return [
+            (int(contract), float(row[contract])) for contract in np.flatnonzero(row)
+        ]
+
+
+@dataclass
+class StrategyScores:
+    """Terminal P&L statistics of each candidate, lot size applied"""
+
+    premiums: np.ndarray
+    expected_pnl: np.ndarray
+    probability_of_profit: np.ndarray
+    # Expected shortfall beyond the confidence level, as a positive loss
+    conditional_value_at_risk: np.ndarray
+
+
+def nearest_strikes(strikes: np.ndarray, center: float, count: int) -> np.ndarray:
+    """The count distinct strikes closest to center, in increasing order"""
+    grid = np.unique(strikes)
+    closest = np.argsort(np.abs(grid - center), kind="stable")[:count]
+    return np.sort(grid[closest])
+
+
+def structure_legs(
+    structure: str, calls: np.ndarray, puts: np.ndarray, max_wing_steps: int
+) -> list[tuple[str, np.ndarray, tuple[int, ...]]]:
+    """
+    Variants of a structure as (name, contracts, directions): contracts holds
+    one row of chain positions per candidate (-1 where the strike has no
+    such contract), directions the side of each column.
+    """
+    strikes = calls.size
+    first, second = np.triu_indices(strikes, 1)
+    if structure == "vertical":
+        call_pairs = np.column_stack([calls[first], calls[second]])
+        put_pairs = np.column_stack([puts[first], puts[second]])
+        return [
+            ("bull_call_spread", call_pairs, (1, -1)),
+            ("bear_call_spread", call_pairs, (-1, 1)),
+            ("bull_put_spread", put_pairs, (1, -1)),
+            ("bear_put_spread", put_pairs, (-1, 1)),
+        ]
+    if structure == "straddle":
+        pairs = np.column_stack([puts, calls])
+        return [("long_straddle", pairs, (1, 1)), ("short_straddle", pairs, (-1, -1))]
+    if structure == "strangle":
+        pairs = np.column_stack([puts[first], calls[second]])
+        return [("long_strangle", pairs, (1, 1)), ("short_strangle", pairs, (-1, -1))]
+
+    wings = np.arange(1, max_wing_steps + 1)
+    if structure == "butterfly":
+        # Body at each strike with wings w steps either side
+        body, wing = (grid.ravel() for grid in np.meshgrid(np.arange(strikes), wings))
+        inside = (body - wing >= 0) & (body + wing < strikes)
+        body, wing = body[inside], wing[inside]
+        variants = []
+        for side, contracts in (("call", calls), ("put", puts)):
+            rows = np.column_stack(
+                [
+                    contracts[body - wing],
+                    contracts[body],
+                    contracts[body],
+                    contracts[body + wing],
+                ]
+            )
+            variants += [
+                (f"long_{side}_butterfly", rows, (1, -1, -1, 1)),
+                (f"short_{side}_butterfly", rows, (-1, 1, 1, -1)),
+            ]
+        return variants
+    if structure == "iron_condor":
+        # Short put and call at two strikes, wings w steps outside them
+        pair, wing = (
+            grid.ravel() for grid in np.meshgrid(np.arange(first.size), wings)
+        )
+        low, high = first[pair] - wing, second[pair] + wing
+        inside = (low >= 0) & (high < strikes)
+        pair, low, high = pair[inside], low[inside], high[inside]
+        rows = np.column_stack(
+            [puts[low], puts[first[pair]], calls[second[pair]], calls[high]]
+        )
+        return [
+            ("iron_condor", rows, (1, -1, -1, 1)),
+            ("reverse_iron_condor", rows, (-1, 1, 1, -1)),
+        ]
+    raise ValueError(f"Unknown strategy structure {structure}")
+
+
+def enumerate_strategies(
+    strikes: np.ndarray,
+    is_call: np.ndarray,
+    bids: np.ndarray,
+    asks: np.ndarray,
+    structures: Sequence[str] = STRUCTURES,
+    center: Optional[float] = None,
+    max_strikes: Optional[int] = None,
+    max_wing_steps: int = MAX_WING_STEPS,
+) -> StrategyCandidates:
+    """
+    Every variant of the structures over the chain of one expiry, priced at
+    the ask for bought legs and the bid for sold ones. Candidates with a leg
+    that cannot be traded (no contract or no quote on its side) are left out.
+    With max_strikes, only the strikes closest to center are combined.
+
+    Args:
+        strikes, is_call, bids, asks: One entry per chain contract, missing
+            quotes as NaN.
+    """
+    strikes = np.asarray(strikes, dtype=np.float64)
+    is_call = np.asarray(is_call, dtype=bool)
+    bids = np.asarray(bids, dtype=np.float64)
+    asks = np.asarray(asks, dtype=np.float64)
+
+    grid = np.unique(strikes)
+    if max_strikes is not None and center is not None:
+        grid = nearest_strikes(grid, center, max_strikes)
+    position = np.searchsorted(grid, strikes)
+    listed = (position < grid.size) & (
+        grid[np.minimum(position, grid.size - 1)] == strikes
+    )
+    calls = np.full(grid.size, -1)
+    puts = np.full(grid.size, -1)
+    calls[position[listed & is_call]] = np.flatnonzero(listed & is_call)
+    puts[position[listed & ~is_call]] = np.flatnonzero(listed & ~is_call)
+
+    buyable = np.r_[np.isfinite(asks) & (asks > 0), False]
+    sellable = np.r_[np.isfinite(bids) & (bids > 0), False]
+    names, blocks = [], []
+    for structure in dict.fromkeys(structures):
+        for name, contracts, directions in structure_legs(
+            structure, calls, puts, max_wing_steps
+        ):
+            directions = np.array(directions)
+            # -1 picks the False appended to the masks
+            tradable = np.where(directions > 0, buyable[contracts], sellable[contracts])
+            contracts = contracts[tradable.all(axis=1)]
+            block = np.zeros((len(contracts), strikes.size))
+            rows = np.arange(len(contracts))
+            for column, direction in enumerate(directions):
+                np.add.at(block, (rows, contracts[:, column]), direction)
+            names.append(np.full(len(contracts), name, dtype=object))
+            blocks.append(block)
+
+    quantities = np.concatenate(blocks) if blocks else np.zeros((0, strikes.size))
+    bought = np.maximum(quantities, 0)
+    sold = np.maximum(-quantities, 0)
+    premiums = bought @ np.nan_to_num(asks) - sold @ np.nan_to_num(bids)
+    return StrategyCandidates(
+        structures=np.concatenate(names) if names else np.empty(0, dtype=object),
+        quantities=quantities,
+        premiums=premiums,
+        strikes=strikes,
+        is_call=is_call,
+    )
+
+
+def score_strategies(
+    candidates: StrategyCandidates,
+    terminal_prices: np.ndarray,
+    lot_size: float = 1.0,
+    confidence_level: float = 0.95,
+    dtype: type = np.float32,
+    max_block_elements: int = MAX_SCORE_ELEMENTS,
+) -> StrategyScores:
+    """
+    Terminal P&L statistics of every candidate over the simulated prices.
+
+    The payoff of each traded contract at each terminal price is computed
+    once, as a (contracts, paths) matrix; the P&L of a block of candidates
+    is then one matrix product of their quantities with it. Blocks keep the
+    P&L cache sized, whatever the number of candidates. The expected P&L is
+    exact, from the mean payoff of each contract; probability of profit and
+    CVaR are counted on the dtype P&L, np.float32 halves the memory traffic.
+    """
+    prices = np.asarray(terminal_prices, dtype=np.float64).ravel()
+    # Contracts outside every candidate are left out of the product
+    traded = np.flatnonzero(candidates.quantities.any(axis=0))
+    quantities = candidates.quantities[:, traded]
+    sides = np.where(candidates.is_call[traded], 1.0, -1.0)
+    intrinsic = (prices[None, :] - candidates.strikes[traded, None]) * sides[:, None]
+    np.maximum(intrinsic, 0, out=intrinsic)
+
+    expected = lot_size * (quantities @ intrinsic.mean(axis=1) - candidates.premiums)
+    count = len(candidates)
+    profitable = np.empty(count)
+    shortfall = np.empty(count)
+    # Same tail as value_at_risk
+    tail = max(int(np.ceil(np.round((1 - confidence_level) * prices.size, 6))), 1)
+    intrinsic = intrinsic.astype(dtype)
+    quantities = quantities.astype(dtype)
+    premiums = candidates.premiums.astype(dtype)
+    block = max(1, max_block_elements // max(prices.size, 1))
+    for start in range(0, count, block):
+        rows = slice(start, start + block)
+        pnl = quantities[rows] @ intrinsic
+        pnl -= premiums[rows, None]
+        pnl *= lot_size
+        profitable[rows] = np.count_nonzero(pnl > 0, axis=1) / prices.size
+        # Flat stretches of the payoffs tie many outcomes, which slows
+        # np.partition down more than a full (vectorized) sort
+        pnl.sort(axis=1)
+        shortfall[rows] = -pnl[:, :tail].mean(axis=1, dtype=np.float64)
+
+    return StrategyScores(
+        premiums=candidates.premiums * lot_size,
+        expected_pnl=expected,
+        probability_of_profit=profitable,
+        conditional_value_at_risk=shortfall,
+    )
+
+
+def rank_strategies(scores: StrategyScores, objective: str, top: int) -> np.ndarray:
+    """
+    Indices of the top candidates: highest expected P&L or probability of
+    profit, or lowest CVaR. Ties go to the higher expected P&L.
+    """
+    if objective == "expected_value":
+        primary = -scores.expected_pnl
+    elif objective == "probability_of_profit":
+        primary = -scores.probability_of_profit
+    elif objective == "cvar":
+        primary = scores.conditional_value_at_risk
+    else:
+        raise ValueError(f"Unknown objective {objective}")
+    order = np.lexsort((-scores.expected_pnl, primary))
+    return order[:top]
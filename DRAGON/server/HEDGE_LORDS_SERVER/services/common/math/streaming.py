@@ -0,0 +1,105 @@
+import numpy as np
+
+
+class RunningMoments:
+    """
+    Online count, mean, variance, min and max of a stream of values.
+
+    Blocks are merged with the parallel variant of Welford's algorithm, so
+    updating with one large block costs a single vectorized pass over it.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return
+
+        block_count = values.size
+        block_mean = float(values.mean())
+        block_m2 = float(np.square(values - block_mean).sum())
+
+        total = self.count + block_count
+        delta = block_mean - self.mean
+        self.mean += delta * block_count / total
+        self.m2 += block_m2 + delta * delta * self.count * block_count / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (ddof=1)"""
+        if self.count < 2:
+            return np.nan
+        return self.m2 / (self.count - 1)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+
+class QuantileSketch:
+    """
+    Merging t-digest style quantile sketch.
+
+    Values are kept as weighted centroids. Centroid sizes follow the arcsin
+    scale function, so centroids are small in the tails and large around the
+    median, which keeps extreme percentiles accurate with a bounded number of
+    centroids (roughly ``compression``).
+    """
+
+    def __init__(self, compression: int = 500) -> None:
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return
+
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        means = np.concatenate((self.means, values))
+        weights = np.concatenate((self.weights, np.ones(values.size)))
+        order = np.argsort(means, kind="stable")
+        means = means[order]
+        weights = weights[order]
+
+        # Assign every point to a bucket of the scale function and collapse
+        # each bucket into a single centroid.
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression / np.pi * np.arcsin(2 * q - 1)
+        buckets = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.diff(buckets, prepend=-1))
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q: float | np.ndarray) -> float | np.ndarray:
+        """Estimates the q-th quantile(s), q in [0, 1]"""
+        if self.weights.size == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+
+        cumulative = np.cumsum(self.weights)
+        centers = cumulative - self.weights / 2
+        # Anchor the interpolation on the exact extremes
+        positions = np.concatenate(([0.0], centers, [cumulative[-1]]))
+        values = np.concatenate(([self.min], self.means, [self.max]))
+        result = np.interp(np.asarray(q) * cumulative[-1], positions, values)
+        return float(result) if np.ndim(result) == 0 else result
@@ -0,0 +1,63 @@
+-- Append-only history of option and futures ticks. market_data.options only
+-- keeps the latest row per symbol, this keeps every tick for backtesting and
+-- IV-surface analysis. Partitioned by day on the exchange timestamp, daily
+-- partitions are created ahead of time and dropped after the retention period
+-- by the producer, ticks outside them land in the default partition.
+CREATE TABLE IF NOT EXISTS market_data.options_ticks (
+    time TIMESTAMP WITH TIME ZONE NOT NULL,
+    symbol VARCHAR(50) NOT NULL,
+    underlying_asset_symbol VARCHAR(20) NOT NULL,
+    contract_type VARCHAR(20) NOT NULL,
+    strike_price DOUBLE PRECISION,
+    mark_price DOUBLE PRECISION,
+    spot_price DOUBLE PRECISION,
+    best_bid DOUBLE PRECISION,
+    best_ask DOUBLE PRECISION,
+    bid_size DOUBLE PRECISION,
+    ask_size DOUBLE PRECISION,
+    bid_iv DOUBLE PRECISION,
+    ask_iv DOUBLE PRECISION,
+    mark_iv DOUBLE PRECISION,
+    delta DOUBLE PRECISION,
+    gamma DOUBLE PRECISION,
+    theta DOUBLE PRECISION,
+    vega DOUBLE PRECISION,
+    rho DOUBLE PRECISION,
+    oi DOUBLE PRECISION
+) PARTITION BY RANGE (time);
+
+CREATE TABLE IF NOT EXISTS market_data.options_ticks_default
+    PARTITION OF market_data.options_ticks DEFAULT;
+
+-- Ticks arrive in time order, so a BRIN index stays a few pages per partition
+-- and still narrows range scans to the matching blocks
+CREATE INDEX IF NOT EXISTS idx_options_ticks_time
+    ON market_data.options_ticks USING BRIN (time) WITH (pages_per_range = 32);
+
+-- One-minute bars rolled up from the ticks, kept after the ticks expire
+CREATE TABLE IF NOT EXISTS market_data.options_bars_1m (
+    symbol VARCHAR(50) NOT NULL,
+    time TIMESTAMP WITH TIME ZONE NOT NULL,
+    underlying_asset_symbol VARCHAR(20) NOT NULL,
+    contract_type VARCHAR(20) NOT NULL,
+    strike_price DOUBLE PRECISION,
+    open DOUBLE PRECISION,
+    high DOUBLE PRECISION,
+    low DOUBLE PRECISION,
+    close DOUBLE PRECISION,
+    spot_price DOUBLE PRECISION,
+    best_bid DOUBLE PRECISION,
+    best_ask DOUBLE PRECISION,
+    mark_iv DOUBLE PRECISION,
+    delta DOUBLE PRECISION,
+    gamma DOUBLE PRECISION,
+    theta DOUBLE PRECISION,
+    vega DOUBLE PRECISION,
+    rho DOUBLE PRECISION,
+    oi DOUBLE PRECISION,
+    ticks INTEGER NOT NULL,
+    PRIMARY KEY (symbol, time)
+);
+
+CREATE INDEX IF NOT EXISTS idx_options_bars_1m_time
+    ON market_data.options_bars_1m USING BRIN (time);
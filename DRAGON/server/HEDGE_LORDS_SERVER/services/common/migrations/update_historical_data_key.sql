@@ -0,0 +1,14 @@
+-- Store candles of several symbols and resolutions side by side, keyed by
+-- (symbol, resolution, time) so backfills only fetch the missing candles.
+-- Existing rows have no resolution. They are a copy of exchange data, so they
+-- are dropped and the next backfill reloads them.
+TRUNCATE market_data.historical_data;
+
+ALTER TABLE market_data.historical_data ADD COLUMN IF NOT EXISTS resolution VARCHAR(5) NOT NULL;
+
+ALTER TABLE market_data.historical_data DROP CONSTRAINT IF EXISTS historical_data_pkey;
+
+ALTER TABLE market_data.historical_data ADD PRIMARY KEY (symbol, resolution, time);
+
+-- Covered by the primary key
+DROP INDEX IF EXISTS market_data.idx_historical_data_symbol;
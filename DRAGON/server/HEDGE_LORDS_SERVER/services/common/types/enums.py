@@ -50,3 +50,25 @@ class OptionsTypes(Enum):
 
 class FuturesTypes(Enum):
     PERPETUAL_FUTURES = "perpetual_futures"
+
+
+class SimulationModel(Enum):
+    LAPLACE = "laplace"
+    BOOTSTRAP = "bootstrap"
+    GBM = "gbm"
+    GARCH = "garch"
+    MERTON = "merton"
+
+
+class StrategyStructure(Enum):
+    VERTICAL = "vertical"
+    STRADDLE = "straddle"
+    STRANGLE = "strangle"
+    BUTTERFLY = "butterfly"
+    IRON_CONDOR = "iron_condor"
+
+
+class StrategyObjective(Enum):
+    EXPECTED_VALUE = "expected_value"
+    PROBABILITY_OF_PROFIT = "probability_of_profit"
+    CVAR = "cvar"
@@ -1,6 +1,6 @@
 from typing import Optional, Union
 from decimal import Decimal
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, Field, field_validator
 from sqlalchemy import (
     Column,
     String,
@@ -13,8 +13,9 @@ from sqlalchemy import (
 from datetime import date as Date
 from sqlalchemy.sql import func
 from services.common.db.database import Base
-from services.common.types.enums import Resolution
+from services.common.types.enums import Resolution, SimulationModel
 from services.common.types.enums import Direction, OptionsTypes, FuturesTypes
+from services.common.types.enums import StrategyObjective, StrategyStructure
 
 
 class PriceBand(BaseModel):
@@ -131,6 +132,7 @@ class SimpleTicker(BaseModel):
 
 class SelectedTicker(SimpleTicker):
     position: Direction
+    mark_iv: Optional[float] = None
 
 
 class DataPoints(BaseModel):
@@ -138,6 +140,20 @@ class DataPoints(BaseModel):
     y: list[float]
 
 
+class PayoffKinks(DataPoints):
+    """
+    Exact expiry payoff: x are the strikes inside the diagram's price range
+    and its two ends, joined by straight lines they draw the payoff
+    """
+
+    left_slope: float = 0.0
+    right_slope: float = 0.0
+    breakevens: list[float] = []
+    # None when unbounded
+    max_profit: Optional[float] = None
+    max_loss: Optional[float] = None
+
+
 # Union type for handling both options and futures
 TickerData = Union[OptionsTicker, FuturesTicker]
 
@@ -146,7 +162,8 @@ class HistoricalData(Base):
     __tablename__ = "historical_data"
     __table_args__ = {"schema": "market_data"}
 
-    symbol = Column(String(10), nullable=False)
+    symbol = Column(String(10), primary_key=True)
+    resolution = Column(String(5), primary_key=True)  # Resolution value, e.g. "1h"
     time = Column(TIMESTAMP(timezone=True), primary_key=True)
     open = Column(Numeric(20, 8))
     high = Column(Numeric(20, 8))
@@ -237,13 +254,34 @@ class SubscriptionRequest(BaseModel):
 
 
 class LoadOHLCVRequest(BaseModel):
-    symbol: str
+    # Also accepts a single "symbol"
+    symbols: list[str] = Field(validation_alias=AliasChoices("symbols", "symbol"))
     resolution: Resolution
     lookback_units: int  # e.g., number of lookback units, if 1hr resolution, and 2000 lookback units, it means 2000 hours of lookback
 
+    @field_validator("symbols", mode="before")
+    @classmethod
+    def single_symbol(cls, value):
+        return [value] if isinstance(value, str) else value
+
 
 class SimulateRequest(BaseModel):
     symbol: str
     expiry_date: Date
     resolution: Resolution
     iterations: int
+    seed: Optional[int] = None  # Fixes the random streams so the run can be reproduced
+    model: SimulationModel = SimulationModel.LAPLACE  # Return model of the paths
+
+
+class RiskRequest(SimulateRequest):
+    confidence_levels: list[float] = [0.95, 0.99]
+
+
+class StrategyRequest(SimulateRequest):
+    objective: StrategyObjective = StrategyObjective.EXPECTED_VALUE
+    structures: list[StrategyStructure] = list(StrategyStructure)
+    confidence_level: float = Field(0.95, gt=0, lt=1)  # Of the CVaR
+    top: int = Field(20, ge=1, le=500)  # Strategies returned
+    # Strikes combined, the closest to spot, by default STRATEGY_MAX_STRIKES
+    max_strikes: Optional[int] = Field(None, ge=2)
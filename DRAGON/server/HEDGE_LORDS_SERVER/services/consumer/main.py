@@ -6,43 +6,71 @@ from services.consumer.routes import router as consumer_router
 from services.consumer.routes import router as auth_router
 from services.consumer.service import consumer
 from services.consumer.payoff_service import payoff_consumer
+from services.consumer.prewarm import prewarmer
+from services.consumer.websocket_manager import manager
 from services.common.core.logging import consumer_logger as logger
+from services.common.db.candles import CANDLES_CHANNEL, candle_bus
+from services.common.db.changes import ChangeListener
+
+change_listener = ChangeListener()
+candle_listener = ChangeListener(bus=candle_bus, channel=CANDLES_CHANNEL)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: run migrations and start polling
+    # Startup: listen for producer writes and start the change streams
     logger.info("CONSUMER: Application starting")
 
+    # Warm up the simulation process pool so the first request doesn't pay for it
+    payoff_consumer.simulation_engine.start()
+
+    # Relay the producer's NOTIFY messages to the in-process change bus
+    change_listener.start()
+    # Cached close series reload when the producer's backfill writes candles
+    candle_listener.start()
+    payoff_consumer.history.start()
+    # Simulate the live expiries ahead of the requests
+    prewarmer.start()
+    # Heartbeats reap websocket clients that went away without closing
+    manager.start()
+
     # Create background tasks instead of awaiting directly
-    consumer_task = asyncio.create_task(consumer.start_polling())
-    payoff_task = asyncio.create_task(payoff_consumer.start_polling())
+    consumer_task = asyncio.create_task(consumer.start_streaming())
+    payoff_task = asyncio.create_task(payoff_consumer.start_streaming())
 
     yield
 
-    # Shutdown: stop polling gracefully
+    # Shutdown: stop streaming gracefully
     logger.info("CONSUMER: Application shutting down")
     consumer.should_stop = True
     payoff_consumer.should_stop = True
 
-    # Wait for polling tasks to stop
-    polling_task = asyncio.create_task(consumer.stop_polling())
-    payoff_polling_task = asyncio.create_task(payoff_consumer.stop_polling())
+    # Wait for streaming tasks to stop
+    polling_task = asyncio.create_task(consumer.stop_streaming())
+    payoff_polling_task = asyncio.create_task(payoff_consumer.stop_streaming())
 
     # Wait for both tasks with a timeout
     try:
-        # Cancel the running polling tasks
+        # Cancel the running streaming tasks
         consumer_task.cancel()
         payoff_task.cancel()
 
         await asyncio.wait_for(
             asyncio.gather(polling_task, payoff_polling_task), timeout=5.0
         )
-        logger.info("CONSUMER: Polling tasks stopped successfully")
+        logger.info("CONSUMER: Streaming tasks stopped successfully")
     except asyncio.TimeoutError:
-        logger.warning("CONSUMER: Timeout waiting for polling tasks to stop")
+        logger.warning("CONSUMER: Timeout waiting for streaming tasks to stop")
     except Exception as e:
-        logger.error(f"CONSUMER: Error stopping polling tasks: {e}")
+        logger.error(f"CONSUMER: Error stopping streaming tasks: {e}")
+
+    await prewarmer.stop()
+    await change_listener.stop()
+    await candle_listener.stop()
+    await payoff_consumer.history.stop()
+    await manager.stop()
+
+    payoff_consumer.simulation_engine.shutdown()
 
 
 app = FastAPI(
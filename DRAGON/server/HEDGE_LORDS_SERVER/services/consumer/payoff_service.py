@@ -1,87 +1,155 @@
 import os
-import httpx
-import subprocess
+import time
 import asyncio
 import json
 import numpy as np
 import pandas as pd
-from datetime import datetime, date, timezone
+from datetime import datetime, date, timezone, timedelta
 from sqlalchemy import select
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
-from services.consumer.websocket_manager import manager
+from services.consumer.websocket_manager import Subscriber, manager
+from services.consumer.risk_service import RiskService
+from services.consumer.strategy_service import ExpiryChain, strategy_report
+from services.consumer.portfolio import (
+    DEFAULT_SESSION,
+    MAX_SURFACE_STEPS,
+    SURFACE_STEPS,
+    PayoffSurface,
+    Portfolio,
+)
 from services.common.db.database import get_db_session
+from services.common.db.candles import HistoricalCloseCache
+from services.common.db.changes import RESYNC, ChangeSubscription, change_bus
+from services.common.db.chain_state import live_chain
+from services.common.core.config import STRATEGY_MAX_STRIKES, STREAM_MIN_INTERVAL
 from services.common.core.logging import consumer_logger as logger
 from services.common.types.models import (
     Options,
     SelectedTicker,
-    DataPoints,
-    SimulateRequest,
 )
 from typing import Optional
 from decimal import Decimal
-from services.common.types.enums import Resolution
-from services.common.math.options_contracts import call_payoff, put_payoff
+from services.common.types.enums import (
+    Resolution,
+    ResolutionSeconds,
+    SimulationModel,
+    StrategyObjective,
+    StrategyStructure,
+)
+from services.common.math.options_contracts import portfolio_payoff
+from services.common.math.return_models import CalibrationCache
+from services.common.math.rng import new_seed
+from services.simulator.engine import SimulationEngine
+from services.simulator.store import SimulationStore, StoredSimulation, hash_prices
+
+# Marks a session whose diagram settings changed on the change subscription
+SESSION_PREFIX = "session:"
 
 
 class PayoffDiagramConsumer:
     def __init__(self):
-        self.polling_task = None
         self.should_stop = False
-        self.selected_contracts = {}
-        self.price_range_percentage = 0.1  # Default 10% range for price points
-        self.lot_size: float = 1.0  # Default lot size for contracts
-        self.num_price_points = 500  # Number of price points to calculate
+        # Portfolio of each session, clients without a session id share DEFAULT_SESSION
+        self.portfolios: dict[str, Portfolio] = {}
+        # Trading websocket clients of each session
+        self.session_subscribers: dict[str, set[Subscriber]] = {}
+        # Changed symbols, plus session markers whenever a diagram's settings change
+        self.subscription = ChangeSubscription()
+        self.simulation_engine = SimulationEngine()
+        # Return model parameters per (symbol, resolution, data hash, model)
+        self.calibrations = CalibrationCache()
+        # Close series per (symbol, resolution), reloaded when the backfill writes
+        self.history = HistoricalCloseCache()
+        # The producer's in-memory chain, when it runs on this host
+        self.live_chain = live_chain
         self.set_sim_directory()
-
-    async def process_message(self, message: str):
+        self.simulation_store = SimulationStore(self.sim_directory)
+        self.risk_service = RiskService()
+
+    def get_portfolio(self, session_id: str = DEFAULT_SESSION) -> Portfolio:
+        portfolio = self.portfolios.get(session_id)
+        if portfolio is None:
+            portfolio = self.portfolios[session_id] = Portfolio(session_id)
+        return portfolio
+
+    def add_subscriber(self, session_id: str, subscriber: Subscriber) -> None:
+        self.session_subscribers.setdefault(session_id, set()).add(subscriber)
+        self.request_update(session_id)
+
+    def remove_subscriber(
+        self, session_id: str, subscriber: Subscriber, drop_portfolio: bool = False
+    ) -> None:
+        subscribers = self.session_subscribers.get(session_id, set())
+        subscribers.discard(subscriber)
+        if not subscribers:
+            self.session_subscribers.pop(session_id, None)
+            if drop_portfolio:
+                self.portfolios.pop(session_id, None)
+
+    async def process_message(self, message: str, session_id: str = DEFAULT_SESSION):
         """Process incoming messages from the client"""
         try:
             data = json.loads(message)
             message_type = data.get("type")
+            portfolio = self.get_portfolio(session_id)
 
             if message_type == "select_contract":
                 contract_symbol = data.get("symbol")
                 position = data.get("position", "buy")  # Default to "buy"
                 if contract_symbol:
-                    self.selected_contracts[contract_symbol] = position
+                    portfolio.select(contract_symbol, position)
                     logger.info(
-                        f"PAYOFF: Added contract {contract_symbol} to selection with position {position}"
+                        f"PAYOFF: Added contract {contract_symbol} to selection of {session_id} with position {position}"
                     )
 
             elif message_type == "deselect_contract":
                 contract_symbol = data.get("symbol")
-                if contract_symbol and contract_symbol in self.selected_contracts:
-                    del self.selected_contracts[contract_symbol]
+                if contract_symbol and contract_symbol in portfolio.selected_contracts:
+                    portfolio.deselect(contract_symbol)
                     logger.info(
-                        f"PAYOFF: Removed contract {contract_symbol} from selection"
+                        f"PAYOFF: Removed contract {contract_symbol} from selection of {session_id}"
                     )
 
             elif message_type == "set_price_range":
                 percentage = data.get("percentage")
                 if percentage is not None and 0.01 <= percentage <= 0.5:
-                    self.price_range_percentage = percentage
+                    portfolio.set_price_range(percentage)
                     logger.info(
-                        f"PAYOFF: Updated price range percentage to {percentage}"
+                        f"PAYOFF: Updated price range percentage of {session_id} to {percentage}"
                     )
 
             elif message_type == "set_lot_size":
                 lot_size = data.get("lot_size")
                 if lot_size is not None and lot_size > 0:
-                    self.lot_size = lot_size
-                    logger.info(f"PAYOFF: Updated lot size to {lot_size}")
+                    portfolio.lot_size = lot_size
+                    logger.info(
+                        f"PAYOFF: Updated lot size of {session_id} to {lot_size}"
+                    )
 
             elif message_type == "clear_selection":
-                self.selected_contracts.clear()
-                logger.info("PAYOFF: Cleared all selected contracts")
+                portfolio.clear()
+                logger.info(f"PAYOFF: Cleared all selected contracts of {session_id}")
+
+            elif message_type == "subscribe_surface":
+                steps = data.get("steps", SURFACE_STEPS)
+                if isinstance(steps, int) and 2 <= steps <= MAX_SURFACE_STEPS:
+                    portfolio.surface_steps = steps
+                    logger.info(
+                        f"PAYOFF: Streaming payoff surfaces of {session_id} with {steps} time slices"
+                    )
+
+            elif message_type == "unsubscribe_surface":
+                portfolio.surface_steps = None
+
+            self.request_update(session_id)
 
             # Return a confirmation message with the current state.
             return {
                 "type": "confirmation",
-                "selected_contracts": {
-                    k: v for k, v in self.selected_contracts.items()
-                },
-                "price_range_percentage": self.price_range_percentage,
+                "selected_contracts": dict(portfolio.selected_contracts),
+                "price_range_percentage": portfolio.price_range_percentage,
+                "surface_steps": portfolio.surface_steps,
             }
 
         except json.JSONDecodeError:
@@ -98,7 +166,9 @@ class PayoffDiagramConsumer:
         expiry_date: date,
         resolution: Resolution,
         iterations: int = 10000,
-    ) -> pd.DataFrame | None:
+        seed: Optional[int] = None,
+        model: SimulationModel = SimulationModel.LAPLACE,
+    ) -> StoredSimulation | None:
         expiry_datetime = datetime(
             year=expiry_date.year,
             month=expiry_date.month,
@@ -108,44 +178,76 @@ class PayoffDiagramConsumer:
             second=0,
             tzinfo=timezone.utc,
         )
-        sim_file_name = self.get_file_name(
-            symbol, expiry_datetime, resolution, iterations
+        key = self.simulation_store.make_key(
+            symbol, expiry_datetime, resolution, iterations, seed, model
         )
-        sim_file_path = os.path.join(self.sim_directory, sim_file_name)
-        stored_sims = self.get_stored_sims(sim_file_path)
 
-        if stored_sims is not None:
-            logger.info(
-                f"Using cached Monte Carlo simulation for symbol {symbol}, expiry {expiry_datetime}, resolution {resolution}, iterations {iterations}"
-            )
-            return stored_sims
+        try:
+            prices = await self.get_historical_closes(symbol, resolution)
+            if prices.empty:
+                logger.warning(
+                    f"No {resolution.value} historical data found for symbol {symbol}"
+                )
+                return None
 
-        else:
-            try:
-                batch_file_name = "run_simulator.bat"
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                self.create_sims_json(symbol, expiry_date, resolution, iterations)
-
-                project_root = os.path.abspath(os.path.join(script_dir, "..", ".."))
-                batch_file_path = os.path.join(project_root, batch_file_name)
-                logger.info(project_root)
-                result = subprocess.run(
-                    [batch_file_path],
-                    cwd=project_root,  # Run with project root as current dir
-                    check=True,  # Raise CalledProcessError if bat fails
-                    capture_output=True,  # Get stdout/stderr
-                    text=True,  # Decode as text
+            data_hash = hash_prices(prices)
+            stored_sims = self.simulation_store.get(key, data_hash)
+            if stored_sims is not None:
+                logger.info(
+                    f"Using cached Monte Carlo simulation for symbol {symbol}, expiry {expiry_datetime}, resolution {resolution}, iterations {iterations}"
+                )
+                return stored_sims
+
+            resolution_seconds = ResolutionSeconds[resolution.name].value
+            seconds_to_expiry = (expiry_datetime - prices.index[-1]).total_seconds()
+            candles = int(seconds_to_expiry / resolution_seconds)
+            if candles < 1:
+                logger.warning(
+                    f"Expiry {expiry_datetime} is not after the last candle {prices.index[-1]}"
                 )
-                if result.stdout:
-                    logger.info(f"Script result: {result.stdout.strip()}")
-                if result.stderr:
-                    logger.warning(f"Script result: {result.stderr.strip()}")
-                df = pd.read_csv(sim_file_path, parse_dates=True, index_col=0)
-                return df
-            except Exception as e:
-                logger.error(f"Error starting Monte Carlo simulation: {e}")
+                return None
+
+            timestamps = pd.date_range(
+                start=prices.index[-1],
+                end=expiry_datetime,
+                freq=timedelta(seconds=resolution_seconds),
+                inclusive="right",  # Include the end timestamp (expiry_datetime)
+            )
+            seed = seed if seed is not None else new_seed()
+            closes = prices.to_numpy()
+            params = await asyncio.to_thread(
+                self.calibrations.calibrate,
+                (symbol, resolution, data_hash),
+                model,
+                closes,
+            )
+            price_paths = await self.simulation_engine.run(
+                closes, candles, iterations, seed, model, params
+            )
+            simulation = await asyncio.to_thread(
+                self.simulation_store.put,
+                key,
+                price_paths,
+                timestamps,
+                data_hash,
+                seed,
+            )
+            logger.info(
+                f"Monte Carlo simulation completed for symbol {symbol}, expiry {expiry_datetime}, resolution {resolution}, model {model.value}, seed {seed}"
+            )
+            return simulation
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error running Monte Carlo simulation: {e}")
         return None
 
+    async def get_historical_closes(
+        self, symbol: str, resolution: Resolution
+    ) -> pd.Series:
+        """Fetch the historical close series, oldest first, indexed by UTC time"""
+        return await self.history.get(symbol, resolution)
+
     async def get_expected_values(
         self,
         symbol: str,
@@ -153,9 +255,13 @@ class PayoffDiagramConsumer:
         resolution: Resolution,
         db: AsyncSession,
         iterations: int = 10000,
+        seed: Optional[int] = None,
+        session_id: str = DEFAULT_SESSION,
+        model: SimulationModel = SimulationModel.LAPLACE,
     ) -> dict[str, dict[str, float]]:
-        """Get expected value for the selected contracts"""
-        if not self.selected_contracts:
+        """Get expected value for the selected contracts of a session"""
+        portfolio = self.get_portfolio(session_id)
+        if not portfolio.selected_contracts:
             logger.warning("No selected contracts to calculate expected value")
             return np.nan
 
@@ -168,11 +274,11 @@ class PayoffDiagramConsumer:
                 Options.spot_price,
                 Options.contract_type,
                 Options.strike_price,
-            ).where(Options.symbol.in_(self.selected_contracts.keys()))
+            ).where(Options.symbol.in_(portfolio.selected_contracts.keys()))
 
             contracts_table_coro = db.execute(query)
             sims_coro = self.get_monte_carlo(
-                symbol, expiry_date, resolution, iterations
+                symbol, expiry_date, resolution, iterations, seed, model
             )
 
             logger.info("Gathering data from database and simulation")
@@ -188,9 +294,9 @@ class PayoffDiagramConsumer:
             }
 
             simulations = results[1]
-            final_sims = simulations.iloc[-1, :]
+            final_sims = np.asarray(simulations.final_prices)
             final_payoffs = self.calculate_final_payoffs(
-                symbol, expiry_date, final_sims, contracts_dict
+                symbol, expiry_date, final_sims, contracts_dict, portfolio
             )
             expected_values = {
                 "expected_values": {
@@ -216,11 +322,126 @@ class PayoffDiagramConsumer:
         finally:
             return expected_values
 
+    async def get_risk(
+        self,
+        symbol: str,
+        expiry_date: date,
+        resolution: Resolution,
+        iterations: int = 10000,
+        seed: Optional[int] = None,
+        confidence_levels: tuple[float, ...] = (0.95, 0.99),
+        session_id: str = DEFAULT_SESSION,
+        model: SimulationModel = SimulationModel.LAPLACE,
+    ) -> Optional[dict]:
+        """
+        Risk report of a session's portfolio over the (cached) simulation,
+        None without priced contracts or simulation
+        """
+        portfolio = await self.update_portfolio(session_id)
+        if not portfolio.legs:
+            logger.warning(f"RISK: No priced contracts selected in {session_id}")
+            return None
+        simulation = await self.get_monte_carlo(
+            symbol, expiry_date, resolution, iterations, seed, model
+        )
+        if simulation is None:
+            return None
+        return await self.risk_service.evaluate(
+            portfolio, simulation, confidence_levels
+        )
+
+    async def get_expiry_chain(
+        self, symbol: str, expiry_date: date
+    ) -> Optional[ExpiryChain]:
+        """
+        Options of symbol expiring on expiry_date, from the producer's chain
+        state or else the database. None when the database cannot be read
+        """
+        underlying = symbol[:3]
+        state = self.live_chain.get()
+        rows = state.expiry_chain(underlying, expiry_date) if state else None
+        if rows is not None:
+            return ExpiryChain.from_rows(rows)
+
+        try:
+            query = select(
+                Options.symbol,
+                Options.contract_type,
+                Options.strike_price,
+                Options.best_bid,
+                Options.best_ask,
+                Options.spot_price,
+                Options.timestamp,
+            ).where(
+                Options.symbol.like(f"%-{underlying}-%-{expiry_date:%d%m%y}"),
+                Options.contract_type.in_(("call_options", "put_options")),
+            )
+            async with get_db_session() as session:
+                result = await session.execute(query)
+                return ExpiryChain.from_records(result.all())
+        except Exception as e:
+            logger.error(f"STRATEGIES: Error fetching the {symbol} chain: {e}")
+            return None
+
+    async def get_strategies(
+        self,
+        symbol: str,
+        expiry_date: date,
+        resolution: Resolution,
+        iterations: int = 10000,
+        seed: Optional[int] = None,
+        objective: StrategyObjective = StrategyObjective.EXPECTED_VALUE,
+        structures: Optional[list[StrategyStructure]] = None,
+        confidence_level: float = 0.95,
+        top: int = 20,
+        max_strikes: Optional[int] = None,
+        session_id: str = DEFAULT_SESSION,
+        model: SimulationModel = SimulationModel.LAPLACE,
+    ) -> Optional[dict]:
+        """
+        Best strategies of an expiry's chain over the (cached) simulation, at
+        the session's lot size. None without quoted options or simulation
+        """
+        chain, simulation = await asyncio.gather(
+            self.get_expiry_chain(symbol, expiry_date),
+            self.get_monte_carlo(
+                symbol, expiry_date, resolution, iterations, seed, model
+            ),
+        )
+        if not chain or simulation is None:
+            logger.warning(
+                f"STRATEGIES: No options chain or simulation of {symbol} {expiry_date}"
+            )
+            return None
+
+        started = time.perf_counter()
+        report = await asyncio.to_thread(
+            strategy_report,
+            chain,
+            simulation,
+            objective.value,
+            [structure.value for structure in structures or StrategyStructure],
+            confidence_level,
+            top,
+            self.get_portfolio(session_id).lot_size,
+            max_strikes or STRATEGY_MAX_STRIKES,
+        )
+        logger.info(
+            f"STRATEGIES: Scored {report['candidates']} strategies of {symbol} "
+            f"{expiry_date} in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return report
+
     def calculate_final_payoffs(
-        self, symbol: str, expiry_date: date, sims: np.ndarray, contracts: dict
+        self,
+        symbol: str,
+        expiry_date: date,
+        sims: np.ndarray,
+        contracts: dict,
+        portfolio: Portfolio,
     ) -> np.ndarray:
-        total_payoff = np.zeros_like(sims, dtype=float)
-        for contract, position in self.selected_contracts.items():
+        strikes, premiums, directions, is_call = [], [], [], []
+        for contract, position in portfolio.selected_contracts.items():
             # Symbol check
             key_parts = contract.split("-")
             if symbol[:3] != key_parts[1]:
@@ -238,28 +459,28 @@ class PayoffDiagramConsumer:
             elif position == "sell":
                 cost_or_credit = contracts[contract]["best_bid"]
                 position_multiplier = -1
-            try:
-                if contracts[contract]["contract_type"] == "call_options":
-                    contract_payoff = call_payoff(
-                        sims, strike, cost_or_credit, position_multiplier, self.lot_size
-                    )
-                elif contracts[contract]["contract_type"] == "put_options":
-                    contract_payoff = put_payoff(
-                        sims, strike, cost_or_credit, position_multiplier, self.lot_size
-                    )
-                total_payoff += contract_payoff
-            except Exception as e:
-                logger.error(
-                    f"Error calculating payoff for contract {contract.symbol}: {e}",
-                    exc_info=True,
-                )
-        return total_payoff
+
+            contract_type = contracts[contract]["contract_type"]
+            if contract_type not in ("call_options", "put_options"):
+                continue
+            if strike is None or cost_or_credit is None:
+                logger.error(f"Missing strike or quote for contract {contract}")
+                continue
+            strikes.append(strike)
+            premiums.append(cost_or_credit)
+            directions.append(position_multiplier)
+            is_call.append(contract_type == "call_options")
+
+        # All legs against all simulated prices in one pass
+        return portfolio_payoff(
+            sims, strikes, premiums, directions, is_call, portfolio.lot_size
+        )
 
     async def get_selected_contracts_data(
-        self, db: AsyncSession
+        self, db: AsyncSession, portfolio: Portfolio
     ) -> list[SelectedTicker]:
-        """Get data for the selected contracts from the database"""
-        if not self.selected_contracts:
+        """Get data for the selected contracts of a portfolio from the database"""
+        if not portfolio.selected_contracts:
             return []
 
         try:
@@ -270,7 +491,8 @@ class PayoffDiagramConsumer:
                 Options.best_bid,
                 Options.best_ask,
                 Options.spot_price,
-            ).where(Options.symbol.in_(self.selected_contracts.keys()))
+                Options.mark_iv,
+            ).where(Options.symbol.in_(portfolio.selected_contracts.keys()))
 
             logger.debug(
                 f"QUERY: {query.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True})}"
@@ -291,12 +513,15 @@ class PayoffDiagramConsumer:
                             if row.spot_price
                             else None,
                             expiry_date=self._extract_expiry_date(row.symbol),
-                            position=self.selected_contracts.get(row.symbol, "buy"),
+                            position=portfolio.selected_contracts.get(
+                                row.symbol, "buy"
+                            ),
+                            mark_iv=float(row.mark_iv) if row.mark_iv else None,
                         )
                     )
 
             logger.debug(
-                f"PAYOFF: Retrieved data for {len(self.selected_contracts)} selected contracts"
+                f"PAYOFF: Retrieved data for {len(portfolio.selected_contracts)} selected contracts"
             )
             contract_data.sort(key=lambda x: x.strike_price)
             return contract_data
@@ -306,6 +531,44 @@ class PayoffDiagramConsumer:
             logger.exception(e)
             return []
 
+    def live_selected_contracts(
+        self, portfolio: Portfolio
+    ) -> Optional[list[SelectedTicker]]:
+        """Like get_selected_contracts_data, from the producer's chain state"""
+        if not portfolio.selected_contracts:
+            return []
+        rows = self.live_chain.contracts(portfolio.selected_contracts)
+        if rows is None:
+            return None
+
+        contract_data: list[SelectedTicker] = []
+        for symbol, contract_type, strike, bid, ask, spot, expiry, mark_iv in zip(
+            rows.symbols(),
+            rows.contract_types(),
+            rows.optional("strike"),
+            rows.optional("best_bid"),
+            rows.optional("best_ask"),
+            rows.optional("spot_price"),
+            rows.expiry_dates(),
+            rows.optional("mark_iv"),
+        ):
+            if strike:
+                contract_data.append(
+                    SelectedTicker(
+                        symbol=symbol,
+                        contract_type=contract_type.replace("_options", ""),
+                        strike_price=strike,
+                        best_bid=bid or None,
+                        best_ask=ask or None,
+                        spot_price=spot or None,
+                        expiry_date=expiry,
+                        position=portfolio.selected_contracts.get(symbol, "buy"),
+                        mark_iv=mark_iv or None,
+                    )
+                )
+        contract_data.sort(key=lambda x: x.strike_price)
+        return contract_data
+
     def _extract_expiry_date(self, symbol: str) -> Optional[str]:
         """Extract expiry date from option symbol if possible"""
         try:
@@ -321,165 +584,112 @@ class PayoffDiagramConsumer:
         except Exception:
             return None
 
-    def calculate_payoff_points(
-        self, contracts_data: list[SelectedTicker]
-    ) -> DataPoints:
-        """Calculate payoff diagram data points for the selected contracts using NumPy"""
-        if not contracts_data or len(contracts_data) == 0:
-            return DataPoints(x=[], y=[])
+    async def update_portfolio(self, session_id: str = DEFAULT_SESSION) -> Portfolio:
+        """Apply the current market data of its selected contracts to a session's portfolio"""
+        portfolio = self.get_portfolio(session_id)
+        contracts_data = self.live_selected_contracts(portfolio)
+        if contracts_data is None:
+            async with get_db_session() as session:
+                contracts_data = await self.get_selected_contracts_data(
+                    session, portfolio
+                )
+        logger.debug(f"PAYOFF: Selected contracts: {len(contracts_data)}")
+        portfolio.update_legs(contracts_data)
+        return portfolio
 
+    async def get_current_payoff_data(self, session_id: str = DEFAULT_SESSION):
+        """Fetch the selected contracts of a session and return its payoff data"""
         try:
-            min_x = contracts_data[0].strike_price * (1 - self.price_range_percentage)
-            max_x = contracts_data[-1].strike_price * (1 + self.price_range_percentage)
-            x = np.linspace(min_x, max_x, self.num_price_points)
-            y = np.zeros_like(x)
-
-            for contract in contracts_data:
-                payoff_function = np.zeros_like(x)
-                logger.info(contract)
-                if contract.contract_type == "call":
-                    payoff_function = call_payoff(
-                        x,
-                        contract.strike_price,
-                        contract.best_ask or 0,
-                        1 if contract.position.value == "buy" else -1,
-                        self.lot_size,
-                    )
-                elif contract.contract_type == "put":
-                    payoff_function = put_payoff(
-                        x,
-                        contract.strike_price,
-                        contract.best_ask or 0,
-                        1 if contract.position.value == "buy" else -1,
-                        self.lot_size,
-                    )
-                else:
-                    continue
-                y += payoff_function
-
-            return DataPoints(x=x.tolist(), y=y.tolist())
+            portfolio = await self.update_portfolio(session_id)
+            return self.payoff_message(portfolio)
 
         except Exception as e:
-            logger.error(f"PAYOFF: Error calculating payoff points: {e}")
+            logger.error(f"PAYOFF: Error while fetching payoff data: {e}")
             logger.exception(e)
-            return {"datapoints": []}
-
-    async def get_current_payoff_data(self):
-        """Fetch selected contracts and return calculated payoff data"""
-        try:
-            async with get_db_session() as session:
-                contracts_data = await self.get_selected_contracts_data(session)
-                logger.info(f"PAYOFF: Selected contracts: {len(contracts_data)}")
+            return {"error": "Failed to fetch payoff data"}
 
-                payoff_data = self.calculate_payoff_points(contracts_data)
+    def payoff_message(self, portfolio: Portfolio) -> dict:
+        return {
+            "type": "payoff_update",
+            "timestamp": int(datetime.now().timestamp() * 1000),
+            "data": portfolio.payoff_kinks().model_dump(),
+            "selected_contracts": list(portfolio.selected_contracts),
+        }
 
-                return {
-                    "type": "payoff_update",
-                    "timestamp": int(datetime.now().timestamp() * 1000),
-                    "data": payoff_data.model_dump(),
-                    "selected_contracts": list(self.selected_contracts),
-                }
+    async def get_payoff_surface(
+        self, session_id: str = DEFAULT_SESSION, steps: int = SURFACE_STEPS
+    ) -> Optional[PayoffSurface]:
+        """Payoff surface of a session's portfolio, None without priced legs"""
+        portfolio = await self.update_portfolio(session_id)
+        return portfolio.payoff_surface(steps)
+
+    def surface_frame(self, session_id: str) -> Optional[bytes]:
+        """Binary surface frame for sessions subscribed to surfaces"""
+        portfolio = self.portfolios.get(session_id)
+        if portfolio is None or portfolio.surface_steps is None:
+            return None
+        surface = portfolio.payoff_surface(portfolio.surface_steps)
+        return surface.frame() if surface is not None else None
 
-        except Exception as e:
-            logger.error(f"PAYOFF: Error while fetching payoff data: {e}")
-            logger.exception(e)
-            return {"error": "Failed to fetch payoff data"}
+    def request_update(self, session_id: Optional[str] = None) -> None:
+        """Recalculate and send the payoff diagram of a session, or of all sessions"""
+        self.subscription.push(
+            [RESYNC if session_id is None else SESSION_PREFIX + session_id]
+        )
 
-    async def start_polling(self):
-        """Start polling the database for updates and broadcast updated graph data"""
-        logger.info("PAYOFF: Starting database polling")
+    def changed_sessions(self, symbols: set[str]) -> list[str]:
+        """Connected sessions whose diagram depends on the changed symbols"""
+        return [
+            session_id
+            for session_id in self.session_subscribers
+            if RESYNC in symbols
+            or SESSION_PREFIX + session_id in symbols
+            or not symbols.isdisjoint(self.get_portfolio(session_id).selected_contracts)
+        ]
+
+    async def start_streaming(self):
+        """Send each connected session its payoff diagram whenever its contracts or settings change"""
+        logger.info("PAYOFF: Starting change stream")
         self.should_stop = False
+        change_bus.subscribe(self.subscription)
+
+        try:
+            while not self.should_stop:
+                symbols = await self.subscription.get()
+                for session_id in self.changed_sessions(symbols):
+                    try:
+                        message = await self.get_current_payoff_data(session_id)
+                        frame = self.surface_frame(session_id)
+                        for subscriber in self.session_subscribers.get(session_id, ()):
+                            manager.send(subscriber, message)
+                            if frame is not None:
+                                manager.send_bytes(subscriber, frame)
+                        logger.debug(
+                            f"PAYOFF: Sent payoff diagram data to {session_id}"
+                        )
+                    except Exception as e:
+                        logger.error(f"PAYOFF: Error sending to websocket: {e}")
+                        logger.exception(e)
+
+                # Changes arriving meanwhile are coalesced into the next update
+                await asyncio.sleep(STREAM_MIN_INTERVAL)
+        finally:
+            change_bus.unsubscribe(self.subscription)
+            logger.info("PAYOFF: Change stream stopped")
 
-        while not self.should_stop:
-            try:
-                # Only poll if there is an active "trading" connection
-                if manager.active_connections.get("trading"):
-                    async with get_db_session() as session:
-                        contracts_data = await self.get_selected_contracts_data(session)
-                        # logger.info(
-                        #     f"PAYOFF: Selected contracts: {len(contracts_data)}"
-                        # )
-                        payoff_data = self.calculate_payoff_points(contracts_data)
-
-                        message = {
-                            "type": "payoff_update",
-                            "timestamp": int(datetime.now().timestamp() * 1000),
-                            "data": payoff_data.model_dump(),
-                            "selected_contracts": list(self.selected_contracts),
-                        }
-                        try:
-                            await manager.broadcast(message, "trading")
-                            logger.debug("PAYOFF: Sent payoff diagram data to client")
-                        except Exception as e:
-                            logger.error(f"PAYOFF: Error sending to websocket: {e}")
-
-            except Exception as e:
-                logger.error(f"PAYOFF: Error during polling: {e}")
-                logger.exception(e)
-
-            await asyncio.sleep(0.5)  # Poll every 0.5 seconds
-
-        logger.info("PAYOFF: Polling stopped")
-
-    async def stop_polling(self):
-        """Stop the polling process"""
-        logger.info("PAYOFF: Stopping polling")
+    async def stop_streaming(self):
+        """Stop the change stream"""
+        logger.info("PAYOFF: Stopping change stream")
         self.should_stop = True
 
-    def clear_simulations(self) -> None:
-        """Clear all stored simulations."""
-        if os.path.exists(self.sim_directory):
-            for file in os.listdir(self.sim_directory):
-                if file.endswith(".csv"):
-                    os.remove(os.path.join(self.sim_directory, file))
+    def clear_simulations(self, max_bytes: Optional[int] = None) -> None:
+        """Evict least recently used simulations down to max_bytes, or all of them."""
+        if max_bytes is None:
+            self.simulation_store.clear()
             logger.info("PAYOFF: All simulations cleared.")
         else:
-            logger.warning("PAYOFF: Simulation directory does not exist.")
-
-    def create_sims_json(
-        self,
-        symbol: str,
-        expiry_date: date,
-        resolution: Resolution,
-        iterations: int = 10000,
-    ) -> bool:
-        filename = "simulation_params.json"
-        simulations_req_file = os.path.join(self.sim_directory, filename)
-
-        request = {
-            "symbol": symbol,
-            "expiry_date": expiry_date.strftime("%Y%m%d"),
-            "resolution": resolution.value,
-            "iterations": iterations,
-        }
-
-        try:
-            if os.path.exists(simulations_req_file):
-                os.remove(simulations_req_file)
-            with open(simulations_req_file, "w", encoding="utf-8") as json_file:
-                json.dump(request, json_file, ensure_ascii=False, indent=4)
-            logger.info("JSON file rewritten")
-            return True
-        except Exception as e:
-            logger.error(f"Error creating new request file: {e}")
-            return False
-
-    @staticmethod
-    def get_stored_sims(path: str) -> pd.DataFrame | None:
-        if os.path.exists(path):
-            df = pd.read_csv(path, parse_dates=True, index_col=0)
-            df.index = pd.to_datetime(df.index, utc=True)
-            if df.empty:
-                return None
-            else:
-                return df
-
-    @staticmethod
-    def get_file_name(
-        symbol: str, expiry_datetime: datetime, resolution: Resolution, iterations: int
-    ) -> str:
-        """Generate a file name for the simulation results."""
-        return f"sim_{symbol}_{expiry_datetime.strftime('%Y%m%d')}_{resolution.name}_{iterations}.csv"
+            removed = self.simulation_store.evict(max_bytes)
+            logger.info(f"PAYOFF: Evicted {removed} simulations.")
 
     def set_sim_directory(self) -> None:
         script_path = os.path.abspath(__file__)
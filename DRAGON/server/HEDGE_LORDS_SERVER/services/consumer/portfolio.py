@@ -0,0 +1,404 @@
+import json
+import struct
+import hashlib
+import numpy as np
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from typing import Optional
+from services.common.math.options_contracts import (
+    PiecewisePayoff,
+    call_payoff,
+    leg_payoffs,
+    piecewise_payoff,
+    put_payoff,
+)
+from services.common.math.pricing import SECONDS_PER_YEAR, black_scholes_price
+from services.common.types.models import DataPoints, PayoffKinks, SelectedTicker
+
+# Session used by clients that do not send a session id
+DEFAULT_SESSION = "default"
+
+# Options expire at 12:00 UTC on their expiry date
+EXPIRY_HOUR_UTC = 12
+
+# Time slices of a payoff surface, from now to the first expiry
+SURFACE_STEPS = 8
+MAX_SURFACE_STEPS = 64
+
+
+@dataclass
+class Leg:
+    """Market data of a selected contract, with its cached intrinsic value vector"""
+
+    contract_type: str  # "call" or "put"
+    strike: float
+    direction: int  # 1 buy, -1 sell
+    premium: float
+    volatility: Optional[float] = None  # mark IV, 0.5 for 50%
+    expiry: Optional[datetime] = None
+    intrinsic: Optional[np.ndarray] = None
+
+    def key(self) -> tuple:
+        """Everything the diagram depends on, to detect changed legs"""
+        return (
+            self.contract_type,
+            self.strike,
+            self.direction,
+            self.premium,
+            self.volatility,
+            self.expiry,
+        )
+
+
+@dataclass
+class PayoffSurface:
+    """
+    Theoretical value of a portfolio over a (time, price) grid. The last time
+    slice is the first expiry, where the value is the at-expiry payoff.
+    """
+
+    version: int
+    timestamp: int  # ms, time of the first slice
+    prices: np.ndarray  # float32, (prices,)
+    days: np.ndarray  # float32, (times,), days after timestamp
+    values: np.ndarray  # float32, (times, prices)
+    encoded: Optional[bytes] = field(default=None, repr=False)
+
+    def frame(self) -> bytes:
+        """
+        Binary websocket frame of the surface:
+
+            uint32 header length | JSON header | float32 prices | float32 days
+            | float32 values, row per time slice
+
+        Little endian. The header is padded to keep the arrays 4 byte aligned,
+        so clients can view them as Float32Array without copying.
+        """
+        if self.encoded is None:
+            header = json.dumps(
+                {
+                    "type": "payoff_surface",
+                    "version": self.version,
+                    "timestamp": self.timestamp,
+                    "prices": len(self.prices),
+                    "days": len(self.days),
+                }
+            ).encode()
+            header += b" " * (-len(header) % 4)
+            self.encoded = b"".join(
+                (
+                    struct.pack("<I", len(header)),
+                    header,
+                    self.prices.astype("<f4").tobytes(),
+                    self.days.astype("<f4").tobytes(),
+                    self.values.astype("<f4").tobytes(),
+                )
+            )
+        return self.encoded
+
+
+class Portfolio:
+    """
+    Selected contracts of one session and their payoff diagram.
+
+    The diagram is evaluated on a price grid spanning the selected strikes.
+    Each leg caches its intrinsic value on that grid and the portfolio keeps
+    the direction weighted sum, so adding, removing or flipping a leg costs
+    one vector operation. Premiums only shift the payoff by a constant and
+    never touch the vectors. The grid, and with it every leg, is rebuilt only
+    when the strike range or the price range percentage changes.
+
+    version increases with every change of the diagram, payoff surfaces are
+    cached per version.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        price_range_percentage: float = 0.1,
+        lot_size: float = 1.0,
+        num_price_points: int = 500,
+    ) -> None:
+        self.session_id = session_id
+        self.version = 0
+        self.price_range_percentage = price_range_percentage
+        self._lot_size = lot_size
+        self.num_price_points = num_price_points
+        # Selection as sent by the client, symbol -> "buy"/"sell"
+        self.selected_contracts: dict[str, str] = {}
+        # Selected contracts with market data
+        self.legs: dict[str, Leg] = {}
+        self.grid: Optional[np.ndarray] = None
+        self.bounds: Optional[tuple[float, float]] = None
+        self.intrinsic_sum: Optional[np.ndarray] = None
+        # Number of intrinsic vectors computed, for monitoring the cache
+        self.vectors_computed = 0
+        # Underlying spot of the latest market data, not part of the version
+        self.spot_price: Optional[float] = None
+        # Time slices of the surface streamed to the session, None if not subscribed
+        self.surface_steps: Optional[int] = None
+        self.surface: Optional[tuple[tuple, PayoffSurface]] = None
+
+    @property
+    def lot_size(self) -> float:
+        return self._lot_size
+
+    @lot_size.setter
+    def lot_size(self, lot_size: float) -> None:
+        if lot_size != self._lot_size:
+            self._lot_size = lot_size
+            self.version += 1
+
+    def select(self, symbol: str, position: str) -> None:
+        self.selected_contracts[symbol] = position
+        leg = self.legs.get(symbol)
+        if leg is not None:
+            self._set_leg(
+                symbol, replace(leg, direction=direction(position), intrinsic=None)
+            )
+
+    def deselect(self, symbol: str) -> None:
+        self.selected_contracts.pop(symbol, None)
+        self._set_leg(symbol, None)
+
+    def clear(self) -> None:
+        self.selected_contracts.clear()
+        self.legs.clear()
+        self.version += 1
+        self._rebuild()
+
+    def set_price_range(self, percentage: float) -> None:
+        self.price_range_percentage = percentage
+        self.version += 1
+        self._rebuild()
+
+    def update_legs(self, tickers: list[SelectedTicker]) -> None:
+        """
+        Apply the current market data of the selected contracts. Contracts
+        missing from tickers are dropped from the diagram.
+        """
+        current = {
+            ticker.symbol: ticker
+            for ticker in tickers
+            if ticker.symbol in self.selected_contracts and ticker.strike_price
+        }
+        for symbol in [symbol for symbol in self.legs if symbol not in current]:
+            self._set_leg(symbol, None)
+        self.spot_price = next(
+            (t.spot_price for t in current.values() if t.spot_price), self.spot_price
+        )
+        for symbol, ticker in current.items():
+            self._set_leg(
+                symbol,
+                Leg(
+                    contract_type=ticker.contract_type.replace("_options", ""),
+                    strike=float(ticker.strike_price),
+                    direction=direction(self.selected_contracts[symbol]),
+                    premium=ticker.best_ask or 0.0,
+                    volatility=ticker.mark_iv,
+                    expiry=expiry_datetime(ticker.expiry_date),
+                ),
+            )
+
+    def fingerprint(self) -> str:
+        """
+        Hash of the legs, lot size and spot, equal for portfolios with the same
+        positions and market data, whatever their session
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(
+            repr(
+                (
+                    sorted(leg.key() for leg in self.legs.values()),
+                    self.lot_size,
+                    self.spot_price,
+                )
+            ).encode()
+        )
+        return digest.hexdigest()
+
+    def payoff_points(self) -> DataPoints:
+        if self.grid is None:
+            return DataPoints(x=[], y=[])
+        premium_sum = sum(
+            leg.direction * leg.premium
+            for leg in self.legs.values()
+            if leg.contract_type in ("call", "put")
+        )
+        y = self.lot_size * (self.intrinsic_sum - premium_sum)
+        return DataPoints(x=self.grid.tolist(), y=y.tolist())
+
+    def piecewise_payoff(self) -> Optional[PiecewisePayoff]:
+        """Exact expiry payoff of the option legs, None without any"""
+        legs = [
+            leg for leg in self.legs.values() if leg.contract_type in ("call", "put")
+        ]
+        if not legs:
+            return None
+        return piecewise_payoff(
+            [leg.strike for leg in legs],
+            [leg.premium for leg in legs],
+            [leg.direction for leg in legs],
+            [leg.contract_type == "call" for leg in legs],
+            self.lot_size,
+        )
+
+    def payoff_kinks(self) -> PayoffKinks:
+        """
+        The diagram as its kinks over the price range, with breakevens and
+        maximum profit and loss derived from the exact payoff
+        """
+        payoff = self.piecewise_payoff()
+        if payoff is None or self.bounds is None:
+            return PayoffKinks(x=[], y=[])
+        x, y = payoff.points(*self.bounds)
+        return PayoffKinks(
+            x=x.tolist(),
+            y=y.tolist(),
+            left_slope=payoff.left_slope,
+            right_slope=payoff.right_slope,
+            breakevens=payoff.breakevens().tolist(),
+            max_profit=payoff.max_profit(),
+            max_loss=payoff.max_loss(),
+        )
+
+    def payoff_surface(
+        self, steps: int = SURFACE_STEPS, now: Optional[datetime] = None
+    ) -> Optional[PayoffSurface]:
+        """
+        Black-Scholes value of the portfolio on the diagram's price grid at
+        steps times from now to the first expiry, premiums paid included.
+
+        Legs without a mark IV are valued at their intrinsic value. Surfaces
+        are cached per version and minute.
+        """
+        legs = [
+            leg for leg in self.legs.values() if leg.contract_type in ("call", "put")
+        ]
+        if self.grid is None or not legs:
+            return None
+        now = (now or datetime.now(timezone.utc)).replace(second=0, microsecond=0)
+        key = (self.version, steps, now)
+        if self.surface is not None and self.surface[0] == key:
+            return self.surface[1]
+
+        expiries = [leg.expiry for leg in legs if leg.expiry is not None]
+        end = max(min(expiries), now) if expiries else now
+        offsets = np.linspace(0.0, (end - now).total_seconds(), steps)
+        leg_seconds = np.array(
+            [((leg.expiry or end) - now).total_seconds() for leg in legs]
+        )
+        # Years left on each leg at each time slice, (times, legs)
+        time_to_expiry = (
+            np.maximum(leg_seconds[None, :] - offsets[:, None], 0.0) / SECONDS_PER_YEAR
+        )
+
+        value = black_scholes_price(
+            self.grid[None, None, :],
+            np.array([leg.strike for leg in legs])[None, :, None],
+            time_to_expiry[:, :, None],
+            np.array([leg.volatility or 0.0 for leg in legs])[None, :, None],
+            np.array([leg.contract_type == "call" for leg in legs])[None, :, None],
+        )
+        directions = np.array([leg.direction for leg in legs], dtype=float)
+        premium_sum = float(directions @ [leg.premium for leg in legs])
+        values = self.lot_size * (np.tensordot(directions, value, (0, 1)) - premium_sum)
+
+        surface = PayoffSurface(
+            version=self.version,
+            timestamp=int(now.timestamp() * 1000),
+            prices=self.grid.astype(np.float32),
+            days=(offsets / 86400).astype(np.float32),
+            values=values.astype(np.float32),
+        )
+        self.surface = (key, surface)
+        return surface
+
+    def _set_leg(self, symbol: str, leg: Optional[Leg]) -> None:
+        old = self.legs.pop(symbol, None)
+        if leg is not None:
+            self.legs[symbol] = leg
+        if (old and old.key()) != (leg and leg.key()):
+            self.version += 1
+
+        if self._bounds() != self.bounds:
+            self._rebuild()
+            return
+
+        if old is not None and leg is not None and old.intrinsic is not None:
+            if (old.contract_type, old.strike) == (leg.contract_type, leg.strike):
+                # Same vector, at most the direction changed
+                leg.intrinsic = old.intrinsic
+                if leg.direction != old.direction:
+                    self.intrinsic_sum += (
+                        leg.direction - old.direction
+                    ) * leg.intrinsic
+                return
+
+        if old is not None and old.intrinsic is not None:
+            self.intrinsic_sum -= old.direction * old.intrinsic
+        if leg is not None:
+            self._add_vector(leg)
+
+    def _bounds(self) -> Optional[tuple[float, float]]:
+        if not self.legs:
+            return None
+        strikes = [leg.strike for leg in self.legs.values()]
+        return (
+            min(strikes) * (1 - self.price_range_percentage),
+            max(strikes) * (1 + self.price_range_percentage),
+        )
+
+    def _rebuild(self) -> None:
+        self.bounds = self._bounds()
+        if self.bounds is None:
+            self.grid = None
+            self.intrinsic_sum = None
+            return
+
+        self.grid = np.linspace(*self.bounds, self.num_price_points)
+        self.intrinsic_sum = np.zeros_like(self.grid)
+        legs = [
+            leg for leg in self.legs.values() if leg.contract_type in ("call", "put")
+        ]
+        for leg in self.legs.values():
+            leg.intrinsic = None
+        if not legs:
+            return
+
+        # Every leg's intrinsic vector in one (legs, grid) evaluation
+        intrinsic = leg_payoffs(
+            self.grid,
+            [leg.strike for leg in legs],
+            np.zeros(len(legs)),
+            np.ones(len(legs)),
+            [leg.contract_type == "call" for leg in legs],
+        )
+        for leg, row in zip(legs, intrinsic):
+            leg.intrinsic = row
+            self.intrinsic_sum += leg.direction * row
+        self.vectors_computed += len(legs)
+
+    def _add_vector(self, leg: Leg) -> None:
+        if leg.contract_type == "call":
+            leg.intrinsic = call_payoff(self.grid, leg.strike, 0.0, 1, 1.0)
+        elif leg.contract_type == "put":
+            leg.intrinsic = put_payoff(self.grid, leg.strike, 0.0, 1, 1.0)
+        else:
+            leg.intrinsic = None
+            return
+        self.vectors_computed += 1
+        self.intrinsic_sum += leg.direction * leg.intrinsic
+
+
+def direction(position: str) -> int:
+    return -1 if position == "sell" else 1
+
+
+def expiry_datetime(expiry_date: Optional[str]) -> Optional[datetime]:
+    """Expiry time of an ISO expiry date"""
+    if not expiry_date:
+        return None
+    return datetime.fromisoformat(expiry_date).replace(
+        hour=EXPIRY_HOUR_UTC, tzinfo=timezone.utc
+    )
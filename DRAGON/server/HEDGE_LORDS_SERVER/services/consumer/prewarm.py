@@ -0,0 +1,210 @@
+import time
+import asyncio
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as Time, timezone
+from typing import Iterable, Optional, Sequence
+from services.common.core.config import (
+    PREWARM_CONCURRENCY,
+    PREWARM_INTERVAL,
+    PREWARM_ITERATIONS,
+    PREWARM_MAX_EXPIRIES,
+    PREWARM_RESOLUTIONS,
+    PREWARM_SYMBOLS,
+)
+from services.common.core.logging import consumer_logger as logger
+from services.common.db.candles import candle_bus, decode_candle_change
+from services.common.db.changes import RESYNC, ChangeBus, ChangeSubscription
+from services.common.exchanges.delta import DeltaExchange
+from services.common.types.enums import Resolution
+from services.consumer.payoff_service import PayoffDiagramConsumer, payoff_consumer
+
+# Simulations run up to noon UTC of the expiry date, like get_monte_carlo
+EXPIRY_TIME = Time(12, tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True, order=True)
+class PrewarmJob:
+    """One simulation to keep warm, ordered nearest expiry first"""
+
+    expiry: date
+    # Position of the resolution in the configured list
+    rank: int
+    symbol: str
+    resolution: Resolution = field(compare=False)
+
+
+class SimulationPrewarmer:
+    """
+    Keeps the simulations of the live expiries in the simulation store, so
+    /expected_values and /risk requests find them warm.
+
+    Every interval seconds the contract catalog is scanned for the nearest
+    max_expiries expiries of each symbol, and a job per expiry and resolution
+    is queued. When the backfill writes candles of a series, the jobs of that
+    series are queued again. Workers take the nearest expiries first and run
+    them through the consumer's get_monte_carlo, the same path (and cache
+    key) as interactive requests. Unchanged simulations are only looked up.
+    """
+
+    def __init__(
+        self,
+        consumer: PayoffDiagramConsumer,
+        exchange: Optional[DeltaExchange] = None,
+        symbols: Sequence[str] = PREWARM_SYMBOLS,
+        resolutions: Sequence[str] = PREWARM_RESOLUTIONS,
+        max_expiries: int = PREWARM_MAX_EXPIRIES,
+        iterations: int = PREWARM_ITERATIONS,
+        interval: float = PREWARM_INTERVAL,
+        concurrency: int = PREWARM_CONCURRENCY,
+        bus: ChangeBus = candle_bus,
+    ) -> None:
+        self.consumer = consumer
+        self.exchange = exchange or DeltaExchange()
+        self.symbols = list(symbols)
+        self.resolutions = [Resolution(resolution) for resolution in resolutions]
+        self.max_expiries = max_expiries
+        self.iterations = iterations
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.bus = bus
+        self.subscription = ChangeSubscription()
+        self.queue: asyncio.PriorityQueue[PrewarmJob] = asyncio.PriorityQueue()
+        self.queued: set[PrewarmJob] = set()
+        # Expiries currently kept warm, per symbol
+        self.expiries: dict[str, list[date]] = {}
+        self.tasks: list[asyncio.Task] = []
+        self.runs = 0
+        self.failures = 0
+        self.last_scan: Optional[float] = None
+
+    def start(self) -> None:
+        if self.tasks or not self.symbols:
+            return
+        self.bus.subscribe(self.subscription)
+        self.tasks = [
+            asyncio.create_task(self.scan_periodically()),
+            asyncio.create_task(self.watch_candles()),
+        ] + [asyncio.create_task(self.work()) for _ in range(self.concurrency)]
+        logger.info(
+            f"PREWARM: Keeping {self.symbols} simulations warm at "
+            f"{[resolution.value for resolution in self.resolutions]}"
+        )
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.bus.unsubscribe(self.subscription)
+        await self.exchange.close()
+
+    def status(self) -> dict:
+        return {
+            "expiries": {
+                symbol: [expiry.isoformat() for expiry in expiries]
+                for symbol, expiries in self.expiries.items()
+            },
+            "queued": len(self.queued),
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_scan": self.last_scan,
+        }
+
+    def enqueue(self, jobs: Iterable[PrewarmJob]) -> int:
+        """Queue jobs that are not queued already, returns how many were added"""
+        added = 0
+        for job in jobs:
+            if job not in self.queued:
+                self.queued.add(job)
+                self.queue.put_nowait(job)
+                added += 1
+        return added
+
+    def jobs(
+        self, symbol: str, resolutions: Optional[Sequence[Resolution]] = None
+    ) -> list[PrewarmJob]:
+        """Jobs of the expiries kept warm for symbol"""
+        return [
+            PrewarmJob(expiry, rank, symbol, resolution)
+            for expiry in self.expiries.get(symbol, ())
+            for rank, resolution in enumerate(self.resolutions)
+            if resolutions is None or resolution in resolutions
+        ]
+
+    async def scan(self, now: Optional[datetime] = None) -> int:
+        """Refresh the live expiries from the catalog and queue their jobs"""
+        now = now or datetime.now(timezone.utc)
+        catalog = await self.exchange.contract_catalog()
+        for symbol in self.symbols:
+            # Catalog underlyings are the first three letters, like filtered_contracts
+            live = [
+                expiry
+                for expiry in catalog.expiries(symbol[:3])
+                if datetime.combine(expiry, EXPIRY_TIME) > now
+            ]
+            self.expiries[symbol] = live[: self.max_expiries]
+        self.last_scan = time.time()
+        return self.enqueue(job for symbol in self.symbols for job in self.jobs(symbol))
+
+    async def scan_periodically(self) -> None:
+        while True:
+            try:
+                added = await self.scan()
+                logger.debug(f"PREWARM: Queued {added} simulations")
+            except Exception as e:
+                logger.error(f"PREWARM: Error scanning the contract catalog: {e}")
+            await asyncio.sleep(self.interval)
+
+    def on_candle_changes(self, changes: set[str]) -> int:
+        """Queue the jobs of the series with new candles"""
+        # The history cache may see the change after the job runs, make sure
+        # the job reads the new candles
+        self.consumer.history.invalidate(changes)
+        if RESYNC in changes:
+            return self.enqueue(
+                job for symbol in self.symbols for job in self.jobs(symbol)
+            )
+
+        jobs = []
+        for change in changes:
+            decoded = decode_candle_change(change)
+            if decoded is None or decoded[0] not in self.expiries:
+                continue
+            symbol, resolution, _ = decoded
+            jobs.extend(self.jobs(symbol, [Resolution(resolution)]))
+        return self.enqueue(jobs)
+
+    async def watch_candles(self) -> None:
+        while True:
+            changes = await self.subscription.get()
+            try:
+                self.on_candle_changes(changes)
+            except Exception as e:
+                logger.error(f"PREWARM: Error handling candle changes: {e}")
+
+    async def work(self) -> None:
+        while True:
+            job = await self.queue.get()
+            self.queued.discard(job)
+            try:
+                await self.run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"PREWARM: Error warming {job}: {e}")
+
+    async def run(self, job: PrewarmJob) -> None:
+        simulation = await self.consumer.get_monte_carlo(
+            job.symbol, job.expiry, job.resolution, self.iterations
+        )
+        self.runs += 1
+        if simulation is None:
+            self.failures += 1
+            logger.warning(
+                f"PREWARM: No simulation for {job.symbol} {job.expiry} "
+                f"{job.resolution.value}"
+            )
+
+
+prewarmer = SimulationPrewarmer(payoff_consumer)
@@ -0,0 +1,177 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Optional, Sequence
+from services.common.core.logging import consumer_logger as logger
+from services.common.math.pricing import SECONDS_PER_YEAR, black_scholes
+from services.common.math.risk import (
+    CONFIDENCE_LEVELS,
+    max_drawdowns,
+    path_pnl,
+    portfolio_greeks,
+    value_at_risk,
+)
+from services.consumer.portfolio import Leg, Portfolio
+from services.simulator.store import StoredSimulation
+
+# Risk reports kept in memory
+MAX_CACHED_REPORTS = 256
+# Simulated candles used for drawdowns, longer simulations are subsampled
+MAX_RISK_STEPS = 64
+
+
+def simulation_id(simulation: StoredSimulation) -> str:
+    """Identity of a simulation's paths, the key alone is reused across reruns"""
+    return f"{simulation.key}:{simulation.data_hash}:{simulation.seed}"
+
+
+def sample_steps(steps: int, max_steps: int) -> np.ndarray:
+    """Evenly spaced step indices, always including the last step"""
+    if steps <= max_steps:
+        return np.arange(steps)
+    return np.unique(np.linspace(0, steps - 1, max_steps).round().astype(int))
+
+
+def risk_report(
+    legs: list[Leg],
+    lot_size: float,
+    spot_price: Optional[float],
+    simulation: StoredSimulation,
+    confidence_levels: Sequence[float] = CONFIDENCE_LEVELS,
+    max_steps: int = MAX_RISK_STEPS,
+) -> dict:
+    """
+    Risk of the legs over a simulation, from one P&L matrix of the sampled
+    path steps: VaR/CVaR and probability of profit of the terminal P&L,
+    drawdowns along the paths and the position Greeks as of the simulation
+    start.
+    """
+    timestamps = simulation.timestamps
+    steps = sample_steps(len(timestamps), max_steps)
+    paths = np.asarray(simulation.paths[steps], dtype=float)
+    times = timestamps[steps]
+    as_of = timestamps[0] - (timestamps.freq or pd.Timedelta(0))
+
+    strikes = np.array([leg.strike for leg in legs])
+    volatilities = np.array([leg.volatility or 0.0 for leg in legs])
+    is_call = np.array([leg.contract_type == "call" for leg in legs])
+    directions = np.array([leg.direction for leg in legs], dtype=float)
+    premiums = np.array([leg.premium for leg in legs])
+    # Legs without a known expiry expire with the simulation
+    expiries = np.array(
+        [pd.Timestamp(leg.expiry or times[-1]).value for leg in legs], dtype=np.int64
+    )
+    seconds_to_expiry = (expiries[None, :] - times.asi8[:, None]) / 1e9
+
+    pnl = path_pnl(
+        paths,
+        seconds_to_expiry,
+        strikes,
+        volatilities,
+        is_call,
+        directions,
+        premiums,
+        lot_size,
+    )
+    terminal = pnl[-1]
+    var, cvar = value_at_risk(terminal, confidence_levels)
+    drawdowns = max_drawdowns(pnl)
+
+    greeks = None
+    if spot_price:
+        time_to_expiry = np.maximum((expiries - as_of.value) / 1e9, 0.0)
+        greeks = portfolio_greeks(
+            black_scholes(
+                spot_price,
+                strikes,
+                time_to_expiry / SECONDS_PER_YEAR,
+                volatilities,
+                is_call,
+            ),
+            directions,
+            lot_size,
+        )
+
+    return {
+        "simulation": simulation.key,
+        "as_of": as_of.isoformat(),
+        "iterations": int(terminal.size),
+        "expected_pnl": float(terminal.mean()),
+        "probability_of_profit": float((terminal > 0).mean()),
+        "value_at_risk": {
+            str(level): float(value) for level, value in zip(confidence_levels, var)
+        },
+        "conditional_value_at_risk": {
+            str(level): float(value) for level, value in zip(confidence_levels, cvar)
+        },
+        "max_drawdown": {
+            "mean": float(drawdowns.mean()),
+            "median": float(np.median(drawdowns)),
+            "percentile_95": float(np.percentile(drawdowns, 95)),
+            "max": float(drawdowns.max()),
+        },
+        "greeks": greeks,
+    }
+
+
+class RiskService:
+    """
+    Portfolio risk against stored simulations.
+
+    Reports are memoized on (portfolio fingerprint, simulation id), so
+    sessions holding the same positions share a report until the market data
+    of a leg or the simulation changes. The least recently used reports are
+    dropped beyond max_entries.
+    """
+
+    def __init__(
+        self, max_entries: int = MAX_CACHED_REPORTS, max_steps: int = MAX_RISK_STEPS
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_steps = max_steps
+        self.reports: OrderedDict[tuple, dict] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def evaluate(
+        self,
+        portfolio: Portfolio,
+        simulation: StoredSimulation,
+        confidence_levels: Sequence[float] = CONFIDENCE_LEVELS,
+    ) -> Optional[dict]:
+        """Risk report of a portfolio, None if it has no option legs"""
+        legs = [
+            leg
+            for leg in portfolio.legs.values()
+            if leg.contract_type in ("call", "put")
+        ]
+        if not legs:
+            return None
+
+        levels = tuple(confidence_levels)
+        key = (portfolio.fingerprint(), simulation_id(simulation), levels)
+        report = self.reports.get(key)
+        if report is not None:
+            self.reports.move_to_end(key)
+            self.hits += 1
+            return report
+
+        self.misses += 1
+        # The legs are snapshotted here, the portfolio keeps changing meanwhile
+        report = await asyncio.to_thread(
+            risk_report,
+            legs,
+            portfolio.lot_size,
+            portfolio.spot_price,
+            simulation,
+            levels,
+            self.max_steps,
+        )
+        self.reports[key] = report
+        while len(self.reports) > self.max_entries:
+            self.reports.popitem(last=False)
+        logger.info(
+            f"RISK: Computed risk of {portfolio.session_id} on {simulation.key}"
+        )
+        return report
@@ -1,24 +1,53 @@
 import math
 import json
+import uuid
 import numpy as np
 
-from fastapi import APIRouter, WebSocket, Depends, HTTPException, Body
-from fastapi.responses import JSONResponse
+from fastapi import (
+    APIRouter,
+    WebSocket,
+    Depends,
+    HTTPException,
+    Body,
+    Header,
+    Query,
+)
+from fastapi.responses import JSONResponse, Response
 from services.consumer.websocket_manager import manager
 from services.common.core.logging import consumer_logger as logger
 from services.consumer.payoff_service import payoff_consumer
-from services.common.types.models import SimulateRequest
+from services.consumer.prewarm import prewarmer
+from services.consumer.portfolio import (
+    DEFAULT_SESSION,
+    MAX_SURFACE_STEPS,
+    SURFACE_STEPS,
+)
+from services.consumer.service import consumer
+from services.common.core.config import STREAM_MIN_INTERVAL
+from services.common.types.models import (
+    RiskRequest,
+    SimulateRequest,
+    StrategyRequest,
+)
 from services.common.db.database import db_session
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 router = APIRouter(prefix="/stream", tags=["stream"])
 
+# Portfolio a request works on, requests without the header share the default one
+SESSION_ID_HEADER = Header(DEFAULT_SESSION, alias="X-Session-Id")
+
 
 @router.websocket("/options")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket, "premiums")
+async def websocket_endpoint(websocket: WebSocket, min_interval: float = 0.0):
+    # Seconds between two deltas sent to this client, at least STREAM_MIN_INTERVAL
+    subscriber = await manager.connect(
+        websocket, "premiums", max(min_interval, STREAM_MIN_INTERVAL)
+    )
     logger.info("CONSUMER: WebSocket client connected for premiums")
+    # Full chain once, the change stream sends deltas from here on
+    await consumer.send_snapshot(subscriber)
 
     try:
         # Keep connection alive
@@ -28,14 +57,23 @@ async def websocket_endpoint(websocket: WebSocket):
             except Exception:
                 break
     finally:
-        await manager.disconnect("premiums")
+        await manager.disconnect(subscriber)
         logger.info("CONSUMER: WebSocket client disconnected from premiums")
 
 
 @router.websocket("/trading")
-async def trading_websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket, "trading")
-    logger.info("CONSUMER: WebSocket client connected for trading/payoff")
+async def trading_websocket_endpoint(
+    websocket: WebSocket, session_id: Optional[str] = None
+):
+    # Clients without a session id get a private portfolio for this connection
+    private_session = session_id is None
+    session_id = session_id or uuid.uuid4().hex
+    subscriber = await manager.connect(websocket, "trading")
+    logger.info(
+        f"CONSUMER: WebSocket client connected for trading/payoff ({session_id})"
+    )
+    manager.send(subscriber, {"type": "session", "session_id": session_id})
+    payoff_consumer.add_subscriber(session_id, subscriber)
 
     try:
         # Keep connection alive and process messages from client
@@ -45,11 +83,11 @@ async def trading_websocket_endpoint(websocket: WebSocket):
                 message = await websocket.receive_text()
 
                 # Process the message using the payoff consumer
-                response = await payoff_consumer.process_message(message)
+                response = await payoff_consumer.process_message(message, session_id)
 
-                # If there's a response, send it back to the client
+                # If there's a response, queue it behind the client's other messages
                 if response:
-                    await websocket.send_json(response)
+                    manager.send(subscriber, response)
 
             except Exception as e:
                 logger.error(
@@ -57,15 +95,29 @@ async def trading_websocket_endpoint(websocket: WebSocket):
                 )
                 break
     finally:
-        await manager.disconnect("trading")
+        payoff_consumer.remove_subscriber(
+            session_id, subscriber, drop_portfolio=private_session
+        )
+        await manager.disconnect(subscriber)
         logger.info("CONSUMER: WebSocket client disconnected from trading")
 
 
+@router.get("/connections")
+async def get_connections():
+    """Queue depth and sent/dropped message counts of each websocket client"""
+    return manager.stats()
+
+
 @router.post("/simulate")
 async def simulate_monte(request: SimulateRequest):
     try:
         await payoff_consumer.get_monte_carlo(
-            request.symbol, request.expiry_date, request.resolution, request.iterations
+            request.symbol,
+            request.expiry_date,
+            request.resolution,
+            request.iterations,
+            request.seed,
+            request.model,
         )
         return JSONResponse(status_code=200, content="Started simulation")
     except Exception as e:
@@ -73,10 +125,16 @@ async def simulate_monte(request: SimulateRequest):
         return JSONResponse(status_code=500, content={"message": f"Error: {str(e)}"})
 
 
+@router.get("/prewarm_status")
+async def prewarm_status():
+    """Expiries kept warm and counters of the simulation pre-warming"""
+    return prewarmer.status()
+
+
 @router.delete("/clear_simulations")
-def clear_simulations():
+def clear_simulations(max_bytes: Optional[int] = None):
     try:
-        payoff_consumer.clear_simulations()
+        payoff_consumer.clear_simulations(max_bytes)
     except Exception as e:
         logger.error(f"CONSUMER: Error clearing simulations: {e}", stack_info=True)
         return JSONResponse(status_code=500, content={"message": f"Error: {str(e)}"})
@@ -86,7 +144,9 @@ def clear_simulations():
     "/expected_values", response_model=Optional[dict[str, dict[str, float]]]
 )  # Hint expected success response
 async def expected_values(
-    request: SimulateRequest, db: AsyncSession = Depends(db_session)
+    request: SimulateRequest,
+    db: AsyncSession = Depends(db_session),
+    session_id: str = SESSION_ID_HEADER,
 ):
     """
     Calculates and returns expected payoff statistics based on Monte Carlo simulation.
@@ -100,6 +160,9 @@ async def expected_values(
             request.resolution,
             db,
             request.iterations,
+            request.seed,
+            session_id,
+            request.model,
         )
 
         # --- Process the response ---
@@ -169,10 +232,67 @@ async def expected_values(
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+@router.post("/risk")
+async def risk(request: RiskRequest, session_id: str = SESSION_ID_HEADER):
+    """
+    VaR/CVaR, probability of profit, drawdowns and Greeks of the session's
+    portfolio over a Monte Carlo simulation, reusing cached simulations.
+    """
+    if not all(0 < level < 1 for level in request.confidence_levels):
+        raise HTTPException(
+            status_code=400, detail="Confidence levels must be between 0 and 1"
+        )
+    report = await payoff_consumer.get_risk(
+        request.symbol,
+        request.expiry_date,
+        request.resolution,
+        request.iterations,
+        request.seed,
+        tuple(request.confidence_levels),
+        session_id,
+        request.model,
+    )
+    if report is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No priced contracts selected or no simulation available.",
+        )
+    return report
+
+
+@router.post("/strategies")
+async def strategies(request: StrategyRequest, session_id: str = SESSION_ID_HEADER):
+    """
+    Spreads, straddles, strangles, butterflies and condors of the expiry's
+    chain, ranked by expected P&L, probability of profit or CVaR over a Monte
+    Carlo simulation, reusing cached simulations.
+    """
+    report = await payoff_consumer.get_strategies(
+        request.symbol,
+        request.expiry_date,
+        request.resolution,
+        request.iterations,
+        request.seed,
+        request.objective,
+        request.structures,
+        request.confidence_level,
+        request.top,
+        request.max_strikes,
+        session_id,
+        request.model,
+    )
+    if report is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No quoted options for the expiry or no simulation available.",
+        )
+    return report
+
+
 @router.get("/selected_contracts")
-async def get_selected_contracts():
+async def get_selected_contracts(session_id: str = SESSION_ID_HEADER):
     try:
-        contracts = payoff_consumer.selected_contracts
+        contracts = payoff_consumer.get_portfolio(session_id).selected_contracts
         return JSONResponse(status_code=200, content=contracts)
     except Exception as e:
         logger.error(
@@ -182,21 +302,39 @@ async def get_selected_contracts():
 
 
 @router.post("/get-graph")
-async def subscribeget_graphsymbol():
-    msg = await payoff_consumer.get_current_payoff_data()
+async def subscribeget_graphsymbol(session_id: str = SESSION_ID_HEADER):
+    msg = await payoff_consumer.get_current_payoff_data(session_id)
     return msg
 
 
+@router.get("/payoff_surface")
+async def get_payoff_surface(
+    steps: int = Query(SURFACE_STEPS, ge=2, le=MAX_SURFACE_STEPS),
+    session_id: str = SESSION_ID_HEADER,
+):
+    """
+    Portfolio value over price and time to the first expiry, in the binary
+    frame format streamed to /trading clients subscribed to surfaces.
+    """
+    surface = await payoff_consumer.get_payoff_surface(session_id, steps)
+    if surface is None:
+        raise HTTPException(status_code=404, detail="No priced contracts selected")
+    return Response(content=surface.frame(), media_type="application/octet-stream")
+
+
 @router.post("/select-option")
-async def select_deselect_option(payload: dict = Body(...)):
+async def select_deselect_option(
+    payload: dict = Body(...), session_id: str = SESSION_ID_HEADER
+):
     # Convert the payload to a JSON string as expected by process_message
     message = json.dumps(payload)
     # Pass the message to the payoff consumer
-    res = await payoff_consumer.process_message(message)
+    res = await payoff_consumer.process_message(message, session_id)
     return res
 
 
 @router.delete("/clear_all_contracts")
-async def clear_all_contracts():
-    payoff_consumer.selected_contracts = {}
+async def clear_all_contracts(session_id: str = SESSION_ID_HEADER):
+    payoff_consumer.get_portfolio(session_id).clear()
+    payoff_consumer.request_update(session_id)
     return None
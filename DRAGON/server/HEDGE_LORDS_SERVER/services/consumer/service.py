@@ -2,64 +2,111 @@ import asyncio
 from datetime import datetime
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from services.consumer.websocket_manager import manager
+from typing import Optional
+from services.consumer.websocket_manager import Subscriber, manager
 from services.common.db.database import get_db_session
+from services.common.db.changes import RESYNC, change_bus
+from services.common.db.chain_state import live_chain
+from services.common.core.config import STREAM_MIN_INTERVAL
 from services.common.core.logging import consumer_logger as logger
 from services.common.types.models import Options, SimpleTicker
 
+# Longest wait before retrying changes that could not be read
+MAX_RETRY_INTERVAL = 30.0
+
 
 class OptionsConsumer:
     def __init__(self):
-        self.polling_task = None
         self.should_stop = False
+        # Last sent ticker of each symbol, as sent to the client
+        self.chain: dict[str, dict] = {}
+        # Keeps a snapshot and a delta from interleaving
+        self.lock = asyncio.Lock()
+        # The producer's in-memory chain, when it runs on this host
+        self.live_chain = live_chain
+        # Failed reads are retried after retry_interval, doubling up to the max
+        self.retry_interval = STREAM_MIN_INTERVAL
+        self.max_retry_interval = MAX_RETRY_INTERVAL
+        manager.set_overflow_handler("premiums", self.resync_subscriber)
 
-    async def get_options_chain(self, db: AsyncSession) -> list[SimpleTicker]:
-        """Get simplified options chain data from the database"""
-        try:
-            # Select only the necessary columns for SimpleTicker
-            stmt = select(
-                Options.symbol,
-                Options.contract_type,
-                Options.strike_price,
-                Options.best_bid,
-                Options.best_ask,
-                Options.spot_price,
-            )
-            result = await db.execute(stmt)
-            rows = result.all()
-
-            # Log the actual rows fetched
-            logger.info(f"CONSUMER: Fetched {len(rows)} rows from database")
-
-            # Create a list of SimpleTicker objects
-            simple_tickers = []
-
-            for row in rows:
-                # Extract data for SimpleTicker
-                ticker = SimpleTicker(
-                    symbol=row.symbol,
-                    contract_type=row.contract_type,
-                    strike_price=float(row.strike_price)
-                    if row.strike_price is not None
-                    else None,
-                    best_bid=float(row.best_bid) if row.best_bid is not None else None,
-                    best_ask=float(row.best_ask) if row.best_ask is not None else None,
-                    spot_price=float(row.spot_price)
-                    if row.spot_price is not None
-                    else None,
-                    expiry_date=self._extract_expiry_date(row.symbol),
-                )
-
-                simple_tickers.append(ticker)
+    async def get_options_chain(
+        self, db: AsyncSession, symbols: Optional[set[str]] = None
+    ) -> list[SimpleTicker]:
+        """
+        Get simplified options chain data from the database, optionally only some
+        symbols. Database errors are raised, an empty list means no rows.
+        """
+        # Select only the necessary columns for SimpleTicker
+        stmt = select(
+            Options.symbol,
+            Options.contract_type,
+            Options.strike_price,
+            Options.best_bid,
+            Options.best_ask,
+            Options.spot_price,
+        )
+        if symbols is not None:
+            stmt = stmt.where(Options.symbol.in_(symbols))
+        result = await db.execute(stmt)
+        rows = result.all()
 
-            logger.debug(
-                f"CONSUMER: Created {len(simple_tickers)} SimpleTicker objects"
+        # Log the actual rows fetched
+        logger.debug(f"CONSUMER: Fetched {len(rows)} rows from database")
+
+        # Create a list of SimpleTicker objects
+        simple_tickers = []
+
+        for row in rows:
+            # Extract data for SimpleTicker
+            ticker = SimpleTicker(
+                symbol=row.symbol,
+                contract_type=row.contract_type,
+                strike_price=float(row.strike_price)
+                if row.strike_price is not None
+                else None,
+                best_bid=float(row.best_bid) if row.best_bid is not None else None,
+                best_ask=float(row.best_ask) if row.best_ask is not None else None,
+                spot_price=float(row.spot_price)
+                if row.spot_price is not None
+                else None,
+                expiry_date=self._extract_expiry_date(row.symbol),
             )
-            return simple_tickers
-        except Exception as e:
-            logger.error(f"CONSUMER: Error fetching options data: {e}")
-            logger.exception(e)
-            return []
+
+            simple_tickers.append(ticker)
+
+        logger.debug(f"CONSUMER: Created {len(simple_tickers)} SimpleTicker objects")
+        return simple_tickers
+
+    def live_options_chain(
+        self, symbols: Optional[set[str]] = None
+    ) -> Optional[list[SimpleTicker]]:
+        """Like get_options_chain, from the producer's chain state. None without one"""
+        rows = self.live_chain.contracts(symbols)
+        if rows is None:
+            return None
+        columns = {
+            "symbol": rows.symbols(),
+            "contract_type": rows.contract_types(),
+            "strike_price": rows.optional("strike"),
+            "best_bid": rows.optional("best_bid"),
+            "best_ask": rows.optional("best_ask"),
+            "spot_price": rows.optional("spot_price"),
+            "expiry_date": rows.expiry_dates(),
+        }
+        return [
+            SimpleTicker(**dict(zip(columns, values)))
+            for values in zip(*columns.values())
+        ]
+
+    async def read_options_chain(
+        self, symbols: Optional[set[str]] = None
+    ) -> list[SimpleTicker]:
+        """The options chain from memory when the producer shares it, else the database"""
+        options_chain = self.live_options_chain(symbols)
+        if options_chain is None:
+            async with get_db_session() as session:
+                options_chain = await self.get_options_chain(session, symbols)
+        return options_chain
 
     def _extract_expiry_date(self, symbol: str) -> str:
         """Extract expiry date from option symbol if possible"""
@@ -78,47 +125,146 @@ class OptionsConsumer:
         except Exception:
             return None
 
-    async def start_polling(self):
-        """Start polling the database for updates"""
-        logger.info("CONSUMER: Starting database polling")
-        self.should_stop = False
+    def apply_changes(
+        self, tickers: list[SimpleTicker], requested: Optional[set[str]] = None
+    ) -> tuple[list[dict], list[str]]:
+        """
+        Update the last sent chain with freshly read tickers.
 
-        while not self.should_stop:
-            try:
-                # Only poll if there is an active connection for premiums
-                if manager.active_connections.get("premiums"):
-                    async with get_db_session() as session:
-                        # Get options chain data
-                        options_chain = await self.get_options_chain(session)
-
-                        # Prepare data to send
-                        data_to_send = [ticker.dict() for ticker in options_chain]
-                        message = {
-                            "timestamp": int(datetime.now().timestamp() * 1000),
-                            "purpose": "prices",
-                            "options_chain": data_to_send,
-                        }
-
-                        # Send data to the premiums connection
-                        try:
-                            await manager.broadcast(message, "premiums")
-                            logger.debug("CONSUMER: Sent options chain to client")
-                        except Exception as e:
-                            logger.error(f"CONSUMER: Error sending to websocket: {e}")
-                            await manager.disconnect("premiums")
+        requested is the set of symbols the tickers were read for, None when the
+        whole table was read. Returns the changed rows and the removed symbols.
+        """
+        rows = {ticker.symbol: ticker.model_dump() for ticker in tickers}
+        candidates = self.chain.keys() if requested is None else requested
+        removed = [
+            symbol
+            for symbol in candidates
+            if symbol in self.chain and symbol not in rows
+        ]
+        for symbol in removed:
+            self.chain.pop(symbol, None)
 
+        changed = []
+        for symbol, row in rows.items():
+            if self.chain.get(symbol) != row:
+                self.chain[symbol] = row
+                changed.append(row)
+        return changed, removed
+
+    def snapshot_message(self) -> dict:
+        return {
+            "timestamp": int(datetime.now().timestamp() * 1000),
+            "purpose": "prices",
+            "options_chain": list(self.chain.values()),
+        }
+
+    def delta_message(self, changed: list[dict], removed: list[str]) -> dict:
+        return {
+            "timestamp": int(datetime.now().timestamp() * 1000),
+            "purpose": "prices_delta",
+            "options_chain": changed,
+            "removed": removed,
+        }
+
+    @staticmethod
+    def merge_deltas(pending: dict, delta: dict) -> dict:
+        """
+        Throttle merge of the premiums channel: the changes of a delta on top
+        of those of the delta still pending for a client
+        """
+        rows = {row["symbol"]: row for row in pending["options_chain"]}
+        for symbol in delta["removed"]:
+            rows.pop(symbol, None)
+        rows.update((row["symbol"], row) for row in delta["options_chain"])
+        removed = dict.fromkeys(pending["removed"] + delta["removed"])
+        return {
+            "timestamp": delta["timestamp"],
+            "purpose": "prices_delta",
+            "options_chain": list(rows.values()),
+            "removed": [symbol for symbol in removed if symbol not in rows],
+        }
+
+    def resync_subscriber(self, subscriber: Subscriber, message: str) -> None:
+        """
+        Overflow policy of the premiums channel: queued deltas of a slow client
+        are replaced by one snapshot, which already contains their changes
+        (and those of the delta pending for it, which clear drops).
+        """
+        subscriber.clear()
+        manager.send(subscriber, self.snapshot_message())
+        logger.debug("CONSUMER: Resynced slow client with a snapshot")
+
+    async def send_snapshot(self, subscriber: Subscriber) -> None:
+        """Send the full options chain to a newly connected client"""
+        async with self.lock:
+            try:
+                options_chain = await self.read_options_chain()
+                # The other clients get whatever changed since their last delta
+                changed, removed = self.apply_changes(options_chain)
+                if changed or removed:
+                    manager.broadcast_throttled(
+                        self.delta_message(changed, removed),
+                        "premiums",
+                        self.merge_deltas,
+                        exclude=subscriber,
+                    )
+                manager.send(subscriber, self.snapshot_message())
+                logger.debug("CONSUMER: Sent options chain snapshot to client")
             except Exception as e:
-                logger.error(f"CONSUMER: Error during polling: {e}")
+                logger.error(f"CONSUMER: Error sending snapshot: {e}")
                 logger.exception(e)
 
-            # Wait before next poll
-            await asyncio.sleep(0.5)  # Poll every 0.5 seconds
+    async def send_changes(self, symbols: set[str]) -> None:
+        """Send the rows of the changed symbols that differ from what was sent"""
+        async with self.lock:
+            requested = None if RESYNC in symbols else symbols
+            options_chain = await self.read_options_chain(requested)
+            changed, removed = self.apply_changes(options_chain, requested)
+            if not changed and not removed:
+                return
 
-        logger.info("CONSUMER: Polling stopped")
+            manager.broadcast_throttled(
+                self.delta_message(changed, removed), "premiums", self.merge_deltas
+            )
+            logger.debug(
+                f"CONSUMER: Sent {len(changed)} changed and {len(removed)} removed tickers"
+            )
+
+    async def start_streaming(self):
+        """Push changed tickers to the client as the producer writes them"""
+        logger.info("CONSUMER: Starting change stream")
+        self.should_stop = False
+        subscription = change_bus.subscribe()
+        backoff = self.retry_interval
+
+        try:
+            while not self.should_stop:
+                # Changes arriving during a read are coalesced by the
+                # subscription, and the deltas of each client by its throttle
+                symbols = await subscription.get()
+                try:
+                    # Clients get a snapshot on connect, changes are only
+                    # tracked while someone is listening
+                    if manager.has_subscribers("premiums"):
+                        await self.send_changes(symbols)
+                    backoff = self.retry_interval
+                except Exception as e:
+                    logger.error(
+                        f"CONSUMER: Error sending changes, retrying in {backoff}s: {e}"
+                    )
+                    logger.exception(e)
+                    # Retry these symbols with the next changes, without
+                    # spinning on the database while it is down
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self.max_retry_interval)
+                    subscription.push(symbols)
+        finally:
+            change_bus.unsubscribe(subscription)
+            logger.info("CONSUMER: Change stream stopped")
 
-    async def stop_polling(self):
-        """Stop the polling process"""
-        logger.info("CONSUMER: Stopping polling")
+    async def stop_streaming(self):
+        """Stop the change stream"""
+        logger.info("CONSUMER: Stopping change stream")
         self.should_stop = True
 
 
@@ -0,0 +1,143 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional, Sequence
+from services.common.core.config import STRATEGY_MAX_STRIKES, STRATEGY_MAX_WING_STEPS
+from services.common.db.chain_state import ChainRows
+from services.common.math.strategies import (
+    STRUCTURES,
+    enumerate_strategies,
+    rank_strategies,
+    score_strategies,
+)
+from services.simulator.store import StoredSimulation
+
+
+@dataclass
+class ExpiryChain:
+    """Options of one expiry with their quotes, missing quotes as NaN"""
+
+    symbols: list[str]
+    strikes: np.ndarray
+    is_call: np.ndarray
+    bids: np.ndarray
+    asks: np.ndarray
+    # Spot price of the latest tick, None when no tick had one
+    spot: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @classmethod
+    def from_rows(cls, rows: ChainRows) -> "ExpiryChain":
+        """From the producer's chain state"""
+        spots = rows.column("spot_price")
+        known = ~np.isnan(spots)
+        spot = spots[known][np.argmax(rows.timestamp[known])] if known.any() else None
+        return cls(
+            symbols=rows.symbols(),
+            strikes=rows.strike.copy(),
+            is_call=rows.is_call,
+            bids=rows.column("best_bid").copy(),
+            asks=rows.column("best_ask").copy(),
+            spot=None if spot is None else float(spot),
+        )
+
+    @classmethod
+    def from_records(cls, records: Sequence) -> "ExpiryChain":
+        """
+        From market_data.options rows of symbol, contract_type, strike_price,
+        best_bid, best_ask, spot_price and timestamp
+        """
+
+        def floats(values) -> np.ndarray:
+            return np.array(
+                [np.nan if value is None else float(value) for value in values]
+            )
+
+        records = [record for record in records if record.strike_price is not None]
+        spots = [
+            (record.timestamp, record.spot_price)
+            for record in records
+            if record.spot_price is not None
+        ]
+        return cls(
+            symbols=[record.symbol for record in records],
+            strikes=floats(record.strike_price for record in records),
+            is_call=np.array(
+                [record.contract_type == "call_options" for record in records],
+                dtype=bool,
+            ),
+            bids=floats(record.best_bid for record in records),
+            asks=floats(record.best_ask for record in records),
+            spot=float(max(spots, key=lambda spot: spot[0])[1]) if spots else None,
+        )
+
+
+def strategy_report(
+    chain: ExpiryChain,
+    simulation: StoredSimulation,
+    objective: str = "expected_value",
+    structures: Sequence[str] = STRUCTURES,
+    confidence_level: float = 0.95,
+    top: int = 20,
+    lot_size: float = 1.0,
+    max_strikes: int = STRATEGY_MAX_STRIKES,
+    max_wing_steps: int = STRATEGY_MAX_WING_STEPS,
+) -> dict:
+    """
+    The top strategies of an expiry's chain over a simulation's terminal
+    prices. Every structure is built from the max_strikes strikes closest to
+    spot (the median terminal price without a spot) and all candidates are
+    scored at once, see score_strategies.
+    """
+    terminal = np.asarray(simulation.final_prices, dtype=float)
+    center = chain.spot if chain.spot is not None else float(np.median(terminal))
+    candidates = enumerate_strategies(
+        chain.strikes,
+        chain.is_call,
+        chain.bids,
+        chain.asks,
+        structures,
+        center,
+        max_strikes,
+        max_wing_steps,
+    )
+    scores = score_strategies(candidates, terminal, lot_size, confidence_level)
+
+    strategies = []
+    for candidate in rank_strategies(scores, objective, top):
+        legs = [
+            {
+                "symbol": chain.symbols[contract],
+                "contract_type": "call" if chain.is_call[contract] else "put",
+                "strike": float(chain.strikes[contract]),
+                "position": "buy" if quantity > 0 else "sell",
+                "quantity": int(abs(quantity)),
+                "premium": float(
+                    chain.asks[contract] if quantity > 0 else chain.bids[contract]
+                ),
+            }
+            for contract, quantity in candidates.legs(candidate)
+        ]
+        strategies.append(
+            {
+                "structure": candidates.structures[candidate],
+                "legs": sorted(legs, key=lambda leg: leg["strike"]),
+                "premium": float(scores.premiums[candidate]),
+                "expected_pnl": float(scores.expected_pnl[candidate]),
+                "probability_of_profit": float(scores.probability_of_profit[candidate]),
+                "conditional_value_at_risk": float(
+                    scores.conditional_value_at_risk[candidate]
+                ),
+            }
+        )
+
+    return {
+        "simulation": simulation.key,
+        "iterations": int(terminal.size),
+        "spot_price": chain.spot,
+        "objective": objective,
+        "confidence_level": confidence_level,
+        "candidates": len(candidates),
+        "strategies": strategies,
+    }
@@ -1,36 +1,301 @@
+import json
+import time
+import asyncio
 from fastapi import WebSocket
-from typing import Optional, Dict
+from typing import Callable, Optional, Dict, Union
+from services.common.core.logging import consumer_logger as logger
+
+# Messages queued per client before the overflow policy kicks in
+MAX_QUEUED_MESSAGES = 32
+# A send that takes longer than this marks the client as stale
+SEND_TIMEOUT = 10.0
+# Idle clients get a heartbeat message at this interval
+HEARTBEAT_INTERVAL = 15.0
+
+# Queued message, text frames are JSON, binary frames are sent as is
+Frame = Union[str, bytes]
+
+
+class Subscriber:
+    """A websocket client of a channel with its own bounded send queue"""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        channel: str,
+        max_queued: int,
+        min_interval: float = 0.0,
+    ) -> None:
+        self.websocket = websocket
+        self.channel = channel
+        self.queue: asyncio.Queue[Frame] = asyncio.Queue(max_queued)
+        self.task: Optional[asyncio.Task] = None
+        self.last_sent = time.monotonic()
+        # Throttled messages are queued at most every min_interval seconds,
+        # those arriving meanwhile are merged into the pending one
+        self.min_interval = min_interval
+        self.last_queued = float("-inf")
+        self.pending: Optional[dict] = None
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+
+    def offer(self, frame: Frame) -> bool:
+        """Queue a serialized message, returns False if the queue is full"""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def drop_oldest(self, frame: Frame) -> None:
+        """Overflow policy for channels where each message is a full state"""
+        self.queue.get_nowait()
+        self.queue.put_nowait(frame)
+        self.dropped += 1
+
+    def clear(self) -> None:
+        """Drop everything queued or pending, e.g. before resending a snapshot"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.cancel_pending()
+
+    def cancel_pending(self) -> None:
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        self.pending = None
+
+    def throttle_wait(self) -> float:
+        """Seconds until a throttled message may be queued, 0 if now"""
+        return max(self.last_queued + self.min_interval - time.monotonic(), 0.0)
+
+
+# Called with the subscriber and the message that did not fit its queue
+OverflowHandler = Callable[[Subscriber, Frame], None]
+# Merges a throttled message into the one pending for a client, oldest first
+MergeHandler = Callable[[dict, dict], dict]
 
 
 class ConnectionManager:
-    def __init__(self):
-        # Store WebSocket connections in a dictionary
-        self.active_connections: Dict[str, Optional[WebSocket]] = {
-            "premiums": None,
-            "trading": None,
+    """
+    Websocket clients per channel name ("premiums", "trading").
+
+    Broadcasts serialize a message once and only enqueue it per client; each
+    client has its own sender task, so a slow browser only delays itself.
+    Throttled sends respect each client's minimum interval between messages,
+    merging what arrives in between.
+    When a client's queue is full the channel's overflow handler decides what
+    to drop, by default the oldest queued message.
+    """
+
+    def __init__(
+        self,
+        max_queued: int = MAX_QUEUED_MESSAGES,
+        send_timeout: float = SEND_TIMEOUT,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+    ) -> None:
+        self.max_queued = max_queued
+        self.send_timeout = send_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.active_connections: Dict[str, set[Subscriber]] = {
+            "premiums": set(),
+            "trading": set(),
         }
+        self.overflow_handlers: Dict[str, OverflowHandler] = {}
+        self.heartbeat_task: Optional[asyncio.Task] = None
+
+    def has_subscribers(self, connection_name: str) -> bool:
+        return bool(self.active_connections.get(connection_name))
+
+    def set_overflow_handler(
+        self, connection_name: str, handler: OverflowHandler
+    ) -> None:
+        self.overflow_handlers[connection_name] = handler
 
-    async def connect(self, websocket: WebSocket, connection_name: str):
+    async def connect(
+        self, websocket: WebSocket, connection_name: str, min_interval: float = 0.0
+    ) -> Subscriber:
         await websocket.accept()
-        # Disconnect any existing connection for the given name
-        if self.active_connections.get(connection_name):
-            await self.disconnect(connection_name)
-        self.active_connections[connection_name] = websocket
-        print(f"Connected to {connection_name} WebSocket.")
-
-    async def disconnect(self, connection_name: str):
-        websocket = self.active_connections.get(connection_name)
-        if websocket:
-            self.active_connections[connection_name] = None
-            print(f"Disconnected from {connection_name} WebSocket.")
-
-    async def broadcast(self, message: dict, connection_name: str):
-        websocket = self.active_connections.get(connection_name)
-        if websocket:
+        subscriber = Subscriber(
+            websocket, connection_name, self.max_queued, min_interval
+        )
+        subscriber.task = asyncio.create_task(self._sender(subscriber))
+        self.active_connections.setdefault(connection_name, set()).add(subscriber)
+        logger.info(
+            f"CONSUMER: Connected to {connection_name} WebSocket "
+            f"({len(self.active_connections[connection_name])} clients)"
+        )
+        return subscriber
+
+    async def disconnect(self, subscriber: Subscriber) -> None:
+        if subscriber.closed:
+            return
+        subscriber.closed = True
+        subscriber.cancel_pending()
+        self.active_connections.get(subscriber.channel, set()).discard(subscriber)
+        if (
+            subscriber.task is not None
+            and subscriber.task is not asyncio.current_task()
+        ):
+            subscriber.task.cancel()
+        try:
+            await subscriber.websocket.close()
+        except Exception:
+            pass
+        logger.info(
+            f"CONSUMER: Disconnected from {subscriber.channel} WebSocket "
+            f"(sent {subscriber.sent}, dropped {subscriber.dropped})"
+        )
+
+    def send(self, subscriber: Subscriber, message: dict) -> None:
+        """Queue a message for one client"""
+        self._offer(subscriber, json.dumps(message))
+
+    def send_bytes(self, subscriber: Subscriber, data: bytes) -> None:
+        """Queue a binary frame for one client"""
+        self._offer(subscriber, data)
+
+    async def broadcast(
+        self,
+        message: dict,
+        connection_name: str,
+        exclude: Optional[Subscriber] = None,
+    ) -> None:
+        """Queue a message for every client of the channel"""
+        subscribers = self.active_connections.get(connection_name)
+        if not subscribers:
+            return
+        text = json.dumps(message)
+        for subscriber in list(subscribers):
+            if subscriber is not exclude:
+                self._offer(subscriber, text)
+
+    def send_throttled(
+        self, subscriber: Subscriber, message: dict, merge: MergeHandler
+    ) -> None:
+        """
+        Queue a message for one client at most every subscriber.min_interval
+        seconds. Within the interval messages are merged into one pending
+        message, queued when the interval has passed.
+        """
+        if not self._hold(subscriber, message, merge):
+            self._queue_throttled(subscriber, json.dumps(message))
+
+    def broadcast_throttled(
+        self,
+        message: dict,
+        connection_name: str,
+        merge: MergeHandler,
+        exclude: Optional[Subscriber] = None,
+    ) -> None:
+        """send_throttled to every client of the channel"""
+        text = None
+        for subscriber in list(self.active_connections.get(connection_name, ())):
+            if subscriber is exclude or self._hold(subscriber, message, merge):
+                continue
+            text = text or json.dumps(message)
+            self._queue_throttled(subscriber, text)
+
+    def _hold(self, subscriber: Subscriber, message: dict, merge: MergeHandler) -> bool:
+        """Keep a throttled message pending, False if it can be queued now"""
+        if subscriber.closed:
+            return True
+        if subscriber.pending is not None:
+            subscriber.pending = merge(subscriber.pending, message)
+            return True
+        wait = subscriber.throttle_wait()
+        if wait <= 0:
+            return False
+        subscriber.pending = message
+        subscriber.flush_handle = asyncio.get_running_loop().call_later(
+            wait, self._flush_pending, subscriber
+        )
+        return True
+
+    def _queue_throttled(self, subscriber: Subscriber, text: str) -> None:
+        subscriber.last_queued = time.monotonic()
+        self._offer(subscriber, text)
+
+    def _flush_pending(self, subscriber: Subscriber) -> None:
+        message = subscriber.pending
+        subscriber.flush_handle = None
+        subscriber.pending = None
+        if message is not None and not subscriber.closed:
+            self._queue_throttled(subscriber, json.dumps(message))
+
+    def _offer(self, subscriber: Subscriber, frame: Frame) -> None:
+        if subscriber.closed or subscriber.offer(frame):
+            return
+        handler = self.overflow_handlers.get(subscriber.channel)
+        if handler is None:
+            subscriber.drop_oldest(frame)
+        else:
+            handler(subscriber, frame)
+
+    async def _sender(self, subscriber: Subscriber) -> None:
+        try:
+            while True:
+                frame = await subscriber.queue.get()
+                if isinstance(frame, bytes):
+                    sending = subscriber.websocket.send_bytes(frame)
+                else:
+                    sending = subscriber.websocket.send_text(frame)
+                await asyncio.wait_for(sending, self.send_timeout)
+                subscriber.sent += 1
+                subscriber.last_sent = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"CONSUMER: Dropping {subscriber.channel} client: {e!r}")
+            await self.disconnect(subscriber)
+
+    def start(self) -> None:
+        if self.heartbeat_task is None or self.heartbeat_task.done():
+            self.heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self) -> None:
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
             try:
-                await websocket.send_json(message)
-            except Exception:
-                await self.disconnect(connection_name)
+                await self.heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self.heartbeat_task = None
+        for subscribers in self.active_connections.values():
+            for subscriber in list(subscribers):
+                await self.disconnect(subscriber)
+
+    async def _heartbeat(self) -> None:
+        """
+        Send a heartbeat to idle clients, so sockets that went away without a
+        close frame fail their send (or time out) and get reaped.
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            text = json.dumps(
+                {"type": "heartbeat", "timestamp": int(time.time() * 1000)}
+            )
+            for subscribers in self.active_connections.values():
+                for subscriber in list(subscribers):
+                    if now - subscriber.last_sent >= self.heartbeat_interval:
+                        subscriber.offer(text)
+
+    def stats(self) -> dict[str, list[dict]]:
+        return {
+            name: [
+                {
+                    "queued": subscriber.queue.qsize(),
+                    "sent": subscriber.sent,
+                    "dropped": subscriber.dropped,
+                }
+                for subscriber in subscribers
+            ]
+            for name, subscribers in self.active_connections.items()
+        }
 
 
 manager = ConnectionManager()
@@ -0,0 +1,263 @@
+import time
+import asyncio
+import httpx
+import numpy as np
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional, Sequence
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.common.core.config import (
+    BACKFILL_CHUNK_CANDLES,
+    BACKFILL_CONCURRENCY,
+    BACKFILL_REQUESTS_PER_SECOND,
+)
+from services.common.core.logging import producer_logger as logger
+from services.common.db.candles import CANDLES_CHANNEL, candle_bus, candle_changes
+from services.common.db.changes import notify_changes
+from services.common.exchanges.delta import DeltaExchange
+from services.common.types.enums import Resolution, ResolutionSeconds
+from services.common.types.models import HistoricalData
+
+# Column order of the rows written to market_data.historical_data
+HISTORY_COLUMNS = (
+    "symbol",
+    "resolution",
+    "time",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+)
+
+# Attempts per chunk for rate limited (429), server side and network errors
+MAX_ATTEMPTS = 3
+
+LOAD_TABLE = "historical_data_load"
+
+CREATE_LOAD_TABLE = text(f"""
+    CREATE TEMPORARY TABLE IF NOT EXISTS {LOAD_TABLE}
+    (LIKE market_data.historical_data) ON COMMIT DROP
+    """)
+
+UPSERT_FROM_LOAD_TABLE = text(f"""
+    INSERT INTO market_data.historical_data ({", ".join(HISTORY_COLUMNS)})
+    SELECT {", ".join(HISTORY_COLUMNS)} FROM {LOAD_TABLE}
+    ON CONFLICT (symbol, resolution, time) DO UPDATE SET
+        open = EXCLUDED.open,
+        high = EXCLUDED.high,
+        low = EXCLUDED.low,
+        close = EXCLUDED.close,
+        volume = EXCLUDED.volume
+    """)
+
+
+class RateLimiter:
+    """Token bucket shared by concurrent requests, waiters are served in order"""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def missing_ranges(
+    existing: np.ndarray, start: int, end: int, step: int
+) -> list[tuple[int, int]]:
+    """
+    Runs of candle open times in [start, end] missing from existing, as
+    inclusive (first, last) epoch seconds. Candles open at multiples of step.
+    """
+    grid = np.arange(start - start % step, end + 1, step, dtype=np.int64)
+    missing = grid[~np.isin(grid, existing)]
+    if missing.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(missing) != step) + 1
+    firsts = missing[np.r_[0, breaks]]
+    lasts = missing[np.r_[breaks - 1, missing.size - 1]]
+    return list(zip(firsts.tolist(), lasts.tolist()))
+
+
+def chunk_ranges(
+    ranges: list[tuple[int, int]], step: int, chunk_candles: int
+) -> list[tuple[int, int]]:
+    """Split ranges into requests of at most chunk_candles candles"""
+    chunks = []
+    for first, last in ranges:
+        for chunk_first in range(first, last + 1, step * chunk_candles):
+            chunks.append(
+                (chunk_first, min(chunk_first + step * (chunk_candles - 1), last))
+            )
+    return chunks
+
+
+def to_decimal(value) -> Optional[Decimal]:
+    return None if value is None else Decimal(str(value))
+
+
+class OHLCVBackfiller:
+    """
+    Incremental OHLCV backfill of market_data.historical_data.
+
+    Only candles missing from the table are requested, plus the latest stored
+    one, which may have been written while still open. Chunks of all symbols
+    are fetched concurrently over the exchange's pooled client, throttled by a
+    shared rate limiter, and each symbol is bulk loaded with COPY into a
+    temporary table and merged with one upsert.
+    """
+
+    def __init__(
+        self,
+        exchange: DeltaExchange,
+        concurrency: int = BACKFILL_CONCURRENCY,
+        requests_per_second: float = BACKFILL_REQUESTS_PER_SECOND,
+        chunk_candles: int = BACKFILL_CHUNK_CANDLES,
+    ) -> None:
+        self.exchange = exchange
+        self.chunk_candles = chunk_candles
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.limiter = RateLimiter(requests_per_second, burst=concurrency)
+
+    async def backfill(
+        self,
+        db: AsyncSession,
+        symbols: Sequence[str],
+        resolution: Resolution,
+        lookback_units: int,
+        now: Optional[datetime] = None,
+    ) -> dict[str, int]:
+        """Load the last lookback_units candles of each symbol, returns candles written"""
+        step = ResolutionSeconds[resolution.name].value
+        now_seconds = int((now or datetime.now(timezone.utc)).timestamp())
+        end = now_seconds - now_seconds % step
+        start = end - (lookback_units - 1) * step
+
+        requests = []
+        for symbol in symbols:
+            existing = await self.existing_times(db, symbol, resolution, start, end)
+            if existing.size:
+                # The latest candle may have been stored before it closed
+                existing = existing[existing != existing.max()]
+            ranges = missing_ranges(existing, start, end, step)
+            chunks = chunk_ranges(ranges, step, self.chunk_candles)
+            logger.info(
+                f"PRODUCER: Backfilling {symbol} {resolution.value}: "
+                f"{len(ranges)} missing ranges in {len(chunks)} requests"
+            )
+            requests.extend((symbol, first, last) for first, last in chunks)
+
+        results = await asyncio.gather(
+            *(
+                self.fetch(symbol, resolution, first, last + step - 1)
+                for symbol, first, last in requests
+            ),
+            return_exceptions=True,
+        )
+
+        rows: dict[str, dict[int, tuple]] = {symbol: {} for symbol in symbols}
+        for (symbol, first, last), result in zip(requests, results):
+            if isinstance(result, BaseException):
+                # The range stays missing and is retried by the next backfill
+                logger.error(
+                    f"PRODUCER: Failed to fetch {symbol} candles {first}-{last}: {result!r}"
+                )
+                continue
+            for candle in result:
+                if first <= candle["time"] <= last:
+                    rows[symbol][candle["time"]] = self.to_row(
+                        symbol, resolution, candle
+                    )
+
+        written = {}
+        for symbol, symbol_rows in rows.items():
+            written[symbol] = await self.write(db, list(symbol_rows.values()))
+        logger.info(f"PRODUCER: Backfill wrote {written} {resolution.value} candles")
+        return written
+
+    async def existing_times(
+        self,
+        db: AsyncSession,
+        symbol: str,
+        resolution: Resolution,
+        start: int,
+        end: int,
+    ) -> np.ndarray:
+        """Open times (epoch seconds) of the stored candles in [start, end]"""
+        query = select(HistoricalData.time).where(
+            HistoricalData.symbol == symbol,
+            HistoricalData.resolution == resolution.value,
+            HistoricalData.time.between(
+                datetime.fromtimestamp(start, timezone.utc),
+                datetime.fromtimestamp(end, timezone.utc),
+            ),
+        )
+        result = await db.execute(query)
+        return np.fromiter(
+            (int(row.timestamp()) for row in result.scalars()), dtype=np.int64
+        )
+
+    async def fetch(
+        self, symbol: str, resolution: Resolution, start: int, end: int
+    ) -> list[dict]:
+        """Fetch one chunk, retrying transient errors with backoff"""
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await self.limiter.acquire()
+            try:
+                async with self.semaphore:
+                    return await self.exchange.fetch_candles(
+                        symbol, resolution, start, end
+                    )
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = isinstance(e, httpx.TransportError) or (
+                    e.response.status_code == 429 or e.response.status_code >= 500
+                )
+                if not retryable or attempt == MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(0.5 * 2**attempt)
+
+    @staticmethod
+    def to_row(symbol: str, resolution: Resolution, candle: dict) -> tuple:
+        return (
+            symbol,
+            resolution.value,
+            datetime.fromtimestamp(candle["time"], timezone.utc),
+            to_decimal(candle.get("open")),
+            to_decimal(candle.get("high")),
+            to_decimal(candle.get("low")),
+            to_decimal(candle.get("close")),
+            to_decimal(candle.get("volume")),
+        )
+
+    async def write(self, db: AsyncSession, rows: list[tuple]) -> int:
+        """COPY rows into a temporary table and upsert them, one transaction"""
+        if not rows:
+            return 0
+        await db.execute(CREATE_LOAD_TABLE)
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            LOAD_TABLE, records=rows, columns=HISTORY_COLUMNS
+        )
+        await db.execute(UPSERT_FROM_LOAD_TABLE)
+        # Cached close series of other processes reload from the oldest new candle
+        changes = candle_changes(rows)
+        await notify_changes(db, changes, CANDLES_CHANNEL)
+        await db.commit()
+        candle_bus.publish(changes)
+        return len(rows)
@@ -0,0 +1,125 @@
+import orjson
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Optional
+from sqlalchemy import BigInteger, Integer, Numeric
+from services.common.types.models import Options
+from services.common.types.enums import OptionsTypes, FuturesTypes
+
+# Table columns that come from a nested object of the ticker message
+NESTED_COLUMNS: dict[str, tuple[str, ...]] = {
+    "quotes": (
+        "best_bid",
+        "best_ask",
+        "bid_size",
+        "ask_size",
+        "bid_iv",
+        "ask_iv",
+        "mark_iv",
+        "impact_mid_price",
+    ),
+    "greeks": ("delta", "gamma", "theta", "vega", "rho"),
+    "price_band": ("upper_limit", "lower_limit"),
+}
+
+# Columns written by the ingestion stage, in table order
+OPTIONS_COLUMNS: tuple[str, ...] = tuple(
+    column.name for column in Options.__table__.columns if column.name != "updated_at"
+)
+COLUMN_INDEX: dict[str, int] = {name: i for i, name in enumerate(OPTIONS_COLUMNS)}
+
+OPTIONS_CONTRACT_TYPES = frozenset(member.value for member in OptionsTypes)
+FUTURES_CONTRACT_TYPES = frozenset(member.value for member in FuturesTypes)
+
+# Mirrors the non-optional fields of OptionsTicker and FuturesTicker
+REQUIRED_COLUMNS = ("symbol", "timestamp", "underlying_asset_symbol", "mark_price")
+OPTIONS_REQUIRED_COLUMNS = REQUIRED_COLUMNS + ("strike_price",)
+FUTURES_REQUIRED_COLUMNS = REQUIRED_COLUMNS + ("mark_basis", "funding_rate")
+
+# Columns that do not exist on the other contract type's model
+OPTIONS_ONLY_COLUMNS = ("strike_price",) + NESTED_COLUMNS["greeks"]
+FUTURES_ONLY_COLUMNS = ("mark_basis", "funding_rate")
+
+
+def to_decimal(value: Any) -> Optional[Decimal]:
+    if isinstance(value, float):
+        # repr gives the shortest string that round-trips, like the exchange sent it
+        value = repr(value)
+    try:
+        return Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_str(value: Any) -> str:
+    return value if isinstance(value, str) else str(value)
+
+
+def column_converter(column) -> Callable[[Any], Any]:
+    if isinstance(column.type, Numeric):
+        return to_decimal
+    if isinstance(column.type, (Integer, BigInteger)):
+        return to_int
+    return to_str
+
+
+class TickDecoder:
+    """
+    Decodes raw v2/ticker messages straight into market_data.options row tuples.
+
+    The flat column mapping is derived once from the Options table, so decoding
+    is a single pass over the columns without Pydantic models or ORM objects.
+    Messages that would fail OptionsTicker/FuturesTicker validation decode to None.
+    """
+
+    def __init__(self) -> None:
+        nested = {
+            column: container
+            for container, columns in NESTED_COLUMNS.items()
+            for column in columns
+        }
+        table_columns = Options.__table__.columns
+        self.fields: list[tuple[Optional[str], str, Callable[[Any], Any]]] = [
+            (nested.get(name), name, column_converter(table_columns[name]))
+            for name in OPTIONS_COLUMNS
+        ]
+        self.options_required = [COLUMN_INDEX[c] for c in OPTIONS_REQUIRED_COLUMNS]
+        self.futures_required = [COLUMN_INDEX[c] for c in FUTURES_REQUIRED_COLUMNS]
+        self.options_excluded = [COLUMN_INDEX[c] for c in FUTURES_ONLY_COLUMNS]
+        self.futures_excluded = [COLUMN_INDEX[c] for c in OPTIONS_ONLY_COLUMNS]
+
+    def decode(self, message: str | bytes) -> Optional[tuple]:
+        """Returns the row tuple in OPTIONS_COLUMNS order, or None to skip the message"""
+        try:
+            data = orjson.loads(message)
+        except orjson.JSONDecodeError:
+            return None
+        if not isinstance(data, dict) or data.get("type") != "v2/ticker":
+            return None
+
+        contract_type = data.get("contract_type")
+        if contract_type in OPTIONS_CONTRACT_TYPES:
+            required, excluded = self.options_required, self.options_excluded
+        elif contract_type in FUTURES_CONTRACT_TYPES:
+            required, excluded = self.futures_required, self.futures_excluded
+        else:
+            return None
+
+        values = []
+        for container, name, convert in self.fields:
+            source = data.get(container) if container else data
+            value = source.get(name) if isinstance(source, dict) else None
+            values.append(None if value is None else convert(value))
+
+        for index in excluded:
+            values[index] = None
+        for index in required:
+            if values[index] is None:
+                return None
+        return tuple(values)
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from services.common.db.database import get_db_session
+from services.common.db.ticks import (
+    downsample_ticks,
+    drop_partitions_before,
+    ensure_partitions,
+)
+from services.common.core.config import (
+    TICK_DOWNSAMPLE_INTERVAL,
+    TICK_HISTORY_PARTITIONS_AHEAD,
+    TICK_HISTORY_RETENTION_DAYS,
+)
+from services.common.core.logging import producer_logger as logger
+
+# Minutes rolled up again on every run, for ticks flushed after their minute
+ROLLUP_OVERLAP = timedelta(minutes=2)
+
+
+class TickHistoryMaintenance:
+    """
+    Upkeep of market_data.options_ticks while the producer streams.
+
+    Every interval seconds the closed minutes since the last run are rolled
+    into one-minute bars, the daily partitions of the next days are created so
+    ticks never land in the default partition, and partitions older than the
+    retention period are dropped (their bars are kept).
+    """
+
+    def __init__(
+        self,
+        interval: float = TICK_DOWNSAMPLE_INTERVAL,
+        retention_days: int = TICK_HISTORY_RETENTION_DAYS,
+        partitions_ahead: int = TICK_HISTORY_PARTITIONS_AHEAD,
+    ) -> None:
+        self.interval = interval
+        self.retention_days = retention_days
+        self.partitions_ahead = partitions_ahead
+        self.rolled_until: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def prepare(self, now: Optional[datetime] = None) -> None:
+        """Create today's and the next partitions, before any tick is written"""
+        today = (now or datetime.now(timezone.utc)).date()
+        try:
+            async with get_db_session() as db:
+                await ensure_partitions(db, today, self.partitions_ahead + 1)
+        except Exception as e:
+            logger.error(f"PRODUCER: Error creating tick history partitions: {e}")
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+
+    def rollup_window(self, now: datetime) -> tuple[datetime, datetime]:
+        """Closed minutes to roll up, from the last run (with overlap) to now"""
+        end = now.replace(second=0, microsecond=0)
+        start = (self.rolled_until or end) - ROLLUP_OVERLAP
+        return start, end
+
+    async def run_once(self, now: Optional[datetime] = None) -> None:
+        now = now or datetime.now(timezone.utc)
+        start, end = self.rollup_window(now)
+        try:
+            async with get_db_session() as db:
+                bars = await downsample_ticks(db, start, end)
+                await ensure_partitions(db, now.date(), self.partitions_ahead + 1)
+                dropped = await drop_partitions_before(
+                    db, now.date() - timedelta(days=self.retention_days)
+                )
+            self.rolled_until = end
+            logger.debug(f"PRODUCER: Rolled {bars} one-minute bars up to {end}")
+            if dropped:
+                logger.info(f"PRODUCER: Dropped expired tick partitions {dropped}")
+        except Exception as e:
+            logger.error(f"PRODUCER: Error maintaining tick history: {e}")
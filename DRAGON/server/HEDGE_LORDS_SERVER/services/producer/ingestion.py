@@ -0,0 +1,266 @@
+import time
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Union
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from services.common.db.database import get_db_session
+from services.common.db.changes import change_bus, notify_changes
+from services.common.db.chain_state import CHAIN_COLUMNS, ChainState
+from services.common.db.ticks import TEXT_COLUMNS, TICK_COLUMNS, copy_ticks
+from services.common.core.logging import producer_logger as logger
+from services.common.types.models import Options, OptionsTicker, FuturesTicker
+from services.producer.decoder import COLUMN_INDEX, NESTED_COLUMNS, OPTIONS_COLUMNS
+
+# Nested fields (quotes, greeks, price band) only overwrite the stored value when
+# the tick carries them, top level fields are always overwritten.
+NULL_PRESERVING_COLUMNS: frozenset[str] = frozenset(
+    column for columns in NESTED_COLUMNS.values() for column in columns
+)
+NULL_PRESERVING_INDEXES: tuple[int, ...] = tuple(
+    COLUMN_INDEX[column]
+    for column in OPTIONS_COLUMNS
+    if column in NULL_PRESERVING_COLUMNS
+)
+SYMBOL_INDEX = COLUMN_INDEX["symbol"]
+
+# asyncpg accepts at most 32767 bind parameters per statement
+MAX_ROWS_PER_STATEMENT = 32767 // len(OPTIONS_COLUMNS)
+
+# Tick history columns (time aside) picked from an options row, numeric ones
+# converted to float for the DOUBLE PRECISION history table
+TICK_FIELDS: tuple[tuple[int, bool], ...] = tuple(
+    (COLUMN_INDEX[column], column not in TEXT_COLUMNS) for column in TICK_COLUMNS[1:]
+)
+TIMESTAMP_INDEX = COLUMN_INDEX["timestamp"]
+
+# Chain state columns picked from an options row
+CHAIN_FIELDS: tuple[int, ...] = tuple(COLUMN_INDEX[column] for column in CHAIN_COLUMNS)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def ticker_to_row(ticker: Union[OptionsTicker, FuturesTicker]) -> tuple:
+    """Flatten a validated ticker into a row tuple in OPTIONS_COLUMNS order"""
+    row: dict[str, Any] = {
+        column: getattr(ticker, column, None)
+        for column in OPTIONS_COLUMNS
+        if column not in NULL_PRESERVING_COLUMNS
+    }
+    row["contract_type"] = ticker.contract_type.value
+    for container, columns in NESTED_COLUMNS.items():
+        nested = getattr(ticker, container, None)
+        for column in columns:
+            row[column] = getattr(nested, column, None) if nested else None
+    return tuple(row[column] for column in OPTIONS_COLUMNS)
+
+
+def tick_history_row(row: tuple) -> tuple:
+    """Options row -> market_data.options_ticks row, in TICK_COLUMNS order"""
+    # Exchange timestamps are epoch microseconds
+    values = [EPOCH + timedelta(microseconds=row[TIMESTAMP_INDEX])]
+    for index, numeric in TICK_FIELDS:
+        value = row[index]
+        values.append(float(value) if numeric and value is not None else value)
+    return tuple(values)
+
+
+def chain_row(row: tuple) -> tuple:
+    """Options row -> ChainState row, in CHAIN_COLUMNS order"""
+    return tuple(row[index] for index in CHAIN_FIELDS)
+
+
+def build_upsert(rows: list[tuple]):
+    """Multi-row INSERT ... ON CONFLICT (symbol) DO UPDATE for market_data.options"""
+    stmt = insert(Options).values([dict(zip(OPTIONS_COLUMNS, row)) for row in rows])
+    table = Options.__table__
+    set_ = {
+        column: (
+            func.coalesce(stmt.excluded[column], table.c[column])
+            if column in NULL_PRESERVING_COLUMNS
+            else stmt.excluded[column]
+        )
+        for column in OPTIONS_COLUMNS
+        if column != "symbol"
+    }
+    set_["updated_at"] = func.now()
+    return stmt.on_conflict_do_update(index_elements=[table.c.symbol], set_=set_)
+
+
+@dataclass
+class IngestionMetrics:
+    """Counters of the ingestion stage"""
+
+    started_at: float = field(default_factory=time.monotonic)
+    messages_received: int = 0
+    messages_coalesced: int = 0
+    messages_dropped: int = 0
+    rows_written: int = 0
+    ticks_recorded: int = 0
+    flushes: int = 0
+    failed_flushes: int = 0
+    last_batch_size: int = 0
+    max_batch_size: int = 0
+    last_flush_latency_ms: float = 0.0
+    max_flush_latency_ms: float = 0.0
+    total_flush_latency_ms: float = 0.0
+
+    def record_flush(self, batch_size: int, latency_ms: float) -> None:
+        self.flushes += 1
+        self.rows_written += batch_size
+        self.last_batch_size = batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.last_flush_latency_ms = latency_ms
+        self.max_flush_latency_ms = max(self.max_flush_latency_ms, latency_ms)
+        self.total_flush_latency_ms += latency_ms
+
+    def snapshot(self) -> dict[str, float]:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            "uptime_seconds": elapsed,
+            "messages_received": self.messages_received,
+            "messages_coalesced": self.messages_coalesced,
+            "messages_dropped": self.messages_dropped,
+            "offered_load_per_second": self.messages_received / elapsed,
+            "rows_written": self.rows_written,
+            "ticks_recorded": self.ticks_recorded,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": self.rows_written / self.flushes if self.flushes else 0.0,
+            "last_flush_latency_ms": self.last_flush_latency_ms,
+            "max_flush_latency_ms": self.max_flush_latency_ms,
+            "avg_flush_latency_ms": (
+                self.total_flush_latency_ms / self.flushes if self.flushes else 0.0
+            ),
+        }
+
+
+class TickerIngestor:
+    """
+    Queue-backed ingestion stage for ticker row tuples (OPTIONS_COLUMNS order).
+
+    Rows are coalesced per symbol (latest wins) for at most flush_interval
+    seconds, or until max_batch_size symbols are pending, and then written with
+    a single multi-row upsert. Every tick of the batch, not only the latest, is
+    appended to the tick history with COPY in the same transaction. The written
+    symbols are published on the change bus and, through NOTIFY in the same
+    transaction, to other processes. With a chain_state, the batch is written
+    there first, so consumers notified of it read it from memory.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 0.1,
+        max_batch_size: int = 500,
+        max_queue_size: int = 50_000,
+        record_history: bool = True,
+        chain_state: Optional[ChainState] = None,
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.max_batch_size = min(max_batch_size, MAX_ROWS_PER_STATEMENT)
+        self.queue: asyncio.Queue[tuple] = asyncio.Queue(max_queue_size)
+        self.pending: dict[str, tuple] = {}
+        self.record_history = record_history
+        self.history: list[tuple] = []
+        self.chain_state = chain_state
+        self.metrics = IngestionMetrics()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.metrics = IngestionMetrics()
+            self.task = asyncio.create_task(self.run())
+            logger.info("PRODUCER: Ticker ingestion started")
+
+    async def stop(self) -> None:
+        """Stop the ingestion loop and flush everything still queued"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self.drain()
+        await self.flush()
+        logger.info("PRODUCER: Ticker ingestion stopped")
+
+    def submit(self, row: tuple) -> None:
+        """Enqueue a row without waiting, dropping it if the queue is full"""
+        self.metrics.messages_received += 1
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.metrics.messages_dropped += 1
+            logger.warning(
+                f"PRODUCER: Ingestion queue full, dropped {row[SYMBOL_INDEX]}"
+            )
+
+    def coalesce(self, row: tuple) -> None:
+        if self.record_history:
+            self.history.append(row)
+        symbol = row[SYMBOL_INDEX]
+        previous = self.pending.get(symbol)
+        if previous is not None:
+            self.metrics.messages_coalesced += 1
+            merged = list(row)
+            for index in NULL_PRESERVING_INDEXES:
+                if merged[index] is None:
+                    merged[index] = previous[index]
+            row = tuple(merged)
+        self.pending[symbol] = row
+
+    def drain(self) -> None:
+        """Move everything already queued into the pending batch"""
+        while not self.queue.empty():
+            self.coalesce(self.queue.get_nowait())
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self.coalesce(await self.queue.get())
+            deadline = loop.time() + self.flush_interval
+            while len(self.pending) < self.max_batch_size:
+                self.drain()
+                timeout = deadline - loop.time()
+                if timeout <= 0 or len(self.pending) >= self.max_batch_size:
+                    break
+                try:
+                    self.coalesce(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+
+        symbols = list(self.pending)
+        rows = list(self.pending.values())
+        history = [tick_history_row(row) for row in self.history]
+        self.pending = {}
+        self.history = []
+        started = time.perf_counter()
+        if self.chain_state is not None:
+            try:
+                self.chain_state.update(chain_row(row) for row in rows)
+            except Exception as e:
+                logger.error(f"PRODUCER: Error updating the chain state: {e}")
+        try:
+            async with get_db_session() as db:
+                for i in range(0, len(rows), MAX_ROWS_PER_STATEMENT):
+                    await db.execute(build_upsert(rows[i : i + MAX_ROWS_PER_STATEMENT]))
+                await copy_ticks(db, history)
+                await notify_changes(db, symbols)
+        except Exception as e:
+            self.metrics.failed_flushes += 1
+            logger.error(f"PRODUCER: Error flushing {len(rows)} tickers: {e}")
+            return
+
+        change_bus.publish(symbols)
+        self.metrics.ticks_recorded += len(history)
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.metrics.record_flush(len(rows), latency_ms)
+        logger.debug(f"PRODUCER: Flushed {len(rows)} tickers in {latency_ms:.1f} ms")
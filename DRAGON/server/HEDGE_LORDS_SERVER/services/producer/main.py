@@ -2,6 +2,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from services.producer.routes import router as producer_router
+from services.producer.routes import producer
 from services.common.db.database import run_startup_migrations
 
 
@@ -10,8 +11,8 @@ async def lifespan(app: FastAPI):
     # Startup: run migrations
     await run_startup_migrations()
     yield
-    # Shutdown: clean up resources if needed
-    pass
+    # Shutdown: stop streaming, flush pending tickers and close the HTTP pool
+    await producer.close()
 
 
 app = FastAPI(
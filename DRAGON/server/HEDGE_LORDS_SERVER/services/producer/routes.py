@@ -34,7 +34,17 @@ async def unsubscribe():
 
 @router.post("/load_ohlcv_data")
 async def load_data(request: LoadOHLCVRequest, db: AsyncSession = Depends(db_session)):
-    await producer.load_ohlcv_data(
-        request.symbol, request.resolution, request.lookback_units, db
+    written = await producer.load_ohlcv_data(
+        request.symbols, request.resolution, request.lookback_units, db
     )
-    return {"message": "Data loading started"}
+    return {"message": "Data loading finished", "candles": written}
+
+
+@router.get("/metrics")
+async def ingestion_metrics():
+    return producer.ingestor.metrics.snapshot()
+
+
+@router.get("/stream_metrics")
+async def stream_metrics():
+    return producer.stream_metrics()
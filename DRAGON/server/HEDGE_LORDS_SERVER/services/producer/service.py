@@ -1,23 +1,30 @@
-import json
-import pandas as pd
-from datetime import date, datetime, timedelta, timezone
+from datetime import date
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from services.common.db.database import get_db_session
+from services.common.db.changes import RESYNC, notify_changes
+from services.common.db.chain_state import ChainState
 from services.common.core.logging import producer_logger as logger
 from services.common.exchanges.delta import DeltaExchange
+from services.producer.backfill import OHLCVBackfiller
+from services.producer.decoder import TickDecoder
+from services.producer.history import TickHistoryMaintenance
+from services.producer.ingestion import TickerIngestor, ticker_to_row
 from decimal import Decimal
-from typing import Union, Any
-from sqlalchemy import select, delete, insert
+from typing import Optional, Union
+from sqlalchemy import select
+from services.common.core.config import (
+    BACKFILL_CHUNK_CANDLES,
+    CHAIN_STATE_CAPACITY,
+    CHAIN_STATE_PATH,
+)
 from services.common.types.models import (
     Options,
     OptionsTicker,
     FuturesTicker,
-    HistoricalData,
 )
 from services.common.types.enums import (
     Resolution,
-    ResolutionSeconds,
     OptionsTypes,
     FuturesTypes,
 )
@@ -29,8 +36,17 @@ class OptionsProducer:
         self.api_secret = api_secret
         self.ws_url = ws_url
         self.api_url = api_url
-        # Create instance of DeltaExchange that will use our message handler
-        self.exchange = None
+        # One adapter for the producer's lifetime, so its connection pool and
+        # contract catalog survive resubscriptions
+        self.exchange = DeltaExchange(self.message_handler)
+        # Batches ticker writes instead of one transaction per message
+        self.ingestor = TickerIngestor()
+        # Raw message -> row tuple without building Pydantic models
+        self.decoder = TickDecoder()
+        # Bars, partitions and retention of the tick history
+        self.history = TickHistoryMaintenance()
+        # Live chain shared with consumers on this host, opened when streaming
+        self.chain_state: Optional[ChainState] = None
 
     async def message_handler(self, message: str) -> None:
         """Handle incoming websocket messages"""
@@ -38,76 +54,72 @@ class OptionsProducer:
             logger.debug(
                 f"PRODUCER: Received message: {message[:100]}..."
             )  # Print first 100 chars
-            async with get_db_session() as db:
-                try:
-                    data = json.loads(message)
-                    logger.debug(f"PRODUCER: Parsed message type: {data.get('type')}")
-                    await self.write_to_db(data, db)
-                except json.JSONDecodeError as e:
-                    logger.error(
-                        f"PRODUCER: JSON decode error: {e}, message: {message[:100]}..."
-                    )
+            row = self.decoder.decode(message)
+            if row is None:
+                logger.debug(f"PRODUCER: Skipping message: {message[:100]}...")
+                return
+            self.ingestor.submit(row)
         except Exception as e:
             logger.error(f"PRODUCER: Error processing message: {e}")
 
-    async def write_to_db(self, message: dict, db: AsyncSession) -> None:
-        """Write message to database using structured models"""
-        logger.debug(f"PRODUCER: Writing to db {message.get('type')}")
-
+    def parse_ticker(self, message: dict) -> Union[OptionsTicker, FuturesTicker, None]:
+        """Validate a ticker message, returns None if it should be skipped"""
         # Only process ticker messages
         if message.get("type") != "v2/ticker":
             logger.warning(f"PRODUCER: Skipping message type: {message.get('type')}")
-            return
+            return None
 
         symbol = message.get("symbol")
         if not symbol:
             logger.warning(f"PRODUCER: Missing symbol: {message}")
-            return
-
+            return None
+
+        # Convert string values to appropriate types
+        self.prepare_numeric_values(message)
+
+        # Add default values for required fields if missing
+        required_fields = [
+            "open",
+            "high",
+            "low",
+            "close",
+            "volume",
+            "turnover",
+            "turnover_usd",
+            "size",
+            "product_id",
+            "mark_change_24h",
+        ]
+        for field in required_fields:
+            if field not in message:
+                message[field] = None
+
+        # Ensure price_band exists
+        if "price_band" not in message:
+            message["price_band"] = {"lower_limit": None, "upper_limit": None}
+
+        contract_type = message.get("contract_type")
+        if any(contract_type == member.value for member in OptionsTypes):
+            # This is an option
+            return OptionsTicker(**message)
+        elif any(contract_type == member.value for member in FuturesTypes):
+            # This is a future
+            return FuturesTicker(**message)
+
+        logger.warning(f"PRODUCER: Unknown contract type: {contract_type}")
+        return None
+
+    def write_to_db(self, message: dict) -> None:
+        """Queue a ticker message for the next batched database write"""
+        logger.debug(f"PRODUCER: Writing to db {message.get('type')}")
         try:
-            # Convert string values to appropriate types
-            self.prepare_numeric_values(message)
-
-            # Add default values for required fields if missing
-            required_fields = [
-                "open",
-                "high",
-                "low",
-                "close",
-                "volume",
-                "turnover",
-                "turnover_usd",
-                "size",
-                "product_id",
-                "mark_change_24h",
-            ]
-            for field in required_fields:
-                if field not in message:
-                    message[field] = None
-
-            # Ensure price_band exists
-            if "price_band" not in message:
-                message["price_band"] = {"lower_limit": None, "upper_limit": None}
-
-            contract_type = message.get("contract_type")
-            if any(contract_type == member.value for member in OptionsTypes):
-                # This is an option
-                ticker_data = OptionsTicker(**message)
-            elif any(contract_type == member.value for member in FuturesTypes):
-                # This is a future
-                ticker_data = FuturesTicker(**message)
-            else:
-                logger.warning(f"PRODUCER: Unknown contract type: {contract_type}")
+            ticker_data = self.parse_ticker(message)
+            if ticker_data is None:
                 return
-
-            await self.save_ticker_to_db(ticker_data, db)
-
-            logger.info(f"PRODUCER: Saved data for symbol: {symbol}")
+            self.ingestor.submit(ticker_to_row(ticker_data))
+            logger.debug(f"PRODUCER: Queued data for symbol: {ticker_data.symbol}")
         except Exception as e:
-            logger.error(
-                f"PRODUCER: Error writing to database: {e}, message: {message}"
-            )
-            await db.rollback()
+            logger.error(f"PRODUCER: Error queueing ticker: {e}, message: {message}")
 
     async def start_streaming(self, symbol: str, expiry_date: date):
         """Start streaming data for given symbol and expiry"""
@@ -116,11 +128,14 @@ class OptionsProducer:
         )
         await self.stop_streaming()
 
-        # Clear the database table before starting new stream
+        # Clear the chain state and the database table before starting new stream
+        self.open_chain_state()
         await self.clear_database()
 
-        # Create DeltaExchange instance with our message handler
-        self.exchange = DeltaExchange(self.message_handler)
+        await self.history.prepare()
+        self.ingestor.start()
+        self.history.start()
+
         await self.exchange.connect()
 
         # Subscribe to the symbol with expiry date
@@ -129,103 +144,74 @@ class OptionsProducer:
 
     async def stop_streaming(self):
         """Stop current streaming session"""
-        if self.exchange:
+        if self.exchange.stream:
             # Unsubscribe from current feed
             await self.exchange.unsubscribe()
             # Disconnect from websocket
             await self.exchange.disconnect()
             logger.info("PRODUCER: Streaming stopped successfully")
+        # Write whatever is still pending
+        await self.ingestor.stop()
+        await self.history.stop()
+
+    def stream_metrics(self) -> dict:
+        """Counters of the websocket session, empty when not streaming"""
+        if not self.exchange.stream:
+            return {}
+        return self.exchange.stream.metrics.snapshot()
+
+    async def close(self):
+        """Stop streaming and release the exchange's HTTP connections"""
+        await self.stop_streaming()
+        await self.exchange.close()
+        if self.chain_state is not None:
+            # Consumers go back to reading Postgres
+            self.chain_state.close(retire_file=True)
+            self.chain_state = self.ingestor.chain_state = None
 
     async def load_ohlcv_data(
         self,
-        symbol: str,
+        symbols: list[str],
         resolution: Resolution,
         lookback_units: int,
         db: AsyncSession,
-        request_split: int = 1000,
-    ) -> None:
-        """Load OHLCV data from Delta Exchange API"""
-        if self.exchange is None:
-            logger.error("PRODUCER: DeltaExchange instance is not initialized")
-            return
-
+        request_split: int = BACKFILL_CHUNK_CANDLES,
+    ) -> dict[str, int]:
+        """
+        Backfill the last lookback_units OHLCV candles of each symbol from the
+        Delta Exchange API, fetching only candles missing from the table.
+        Returns the number of candles written per symbol.
+        """
         try:
-            requests = self.calculate_requests(
-                symbol, resolution, lookback_units, request_split
-            )
-            dfs: list[pd.DataFrame] = []
-            for request in requests:
-                dfs.append(
-                    await self.exchange.get_historical_data(
-                        coin=request["symbol"],
-                        resolution=request["resolution"],
-                        start_date=request["start_date"],
-                        end_date=request["end_date"],
-                        set_index=True,
-                    )
-                )
-            df = (
-                pd.concat(dfs, ignore_index=False)
-                .sort_index(ascending=True)
-                .reset_index(drop=False)
-            )
-            delete_stmt = delete(HistoricalData)  # No WHERE clause = delete all
-            await db.execute(delete_stmt)
-            if not df.empty:
-                records_to_insert = df[
-                    ["symbol", "time", "open", "high", "low", "close", "volume"]
-                ].to_dict(orient="records")
-                insert_stmt = insert(HistoricalData).values(records_to_insert)
-                await db.execute(insert_stmt)
-            await db.commit()
-
+            backfiller = OHLCVBackfiller(self.exchange, chunk_candles=request_split)
+            return await backfiller.backfill(db, symbols, resolution, lookback_units)
         except Exception as e:
             logger.error(f"PRODUCER: Error loading OHLCV data: {e}")
+            return {}
 
     # HELPER METHODS
-    @staticmethod
-    def calculate_requests(
-        symbol: str, resolution: Resolution, lookback_units: int, request_split: int
-    ) -> list[dict[str, Any]]:
-        """Calculate requests for loading historical data"""
-        resolution_seconds = ResolutionSeconds.__members__.get(resolution.name)
-        if resolution_seconds is None:
-            raise ValueError(f"Invalid resolution: {resolution}")
-
-        # split into multiple requests if lookback_units > 1000
-        end_time = datetime.now(timezone.utc)
-        start_time = end_time - timedelta(
-            seconds=resolution_seconds.value * (lookback_units % request_split)
-        )
-        requests: list[dict[str, Any]] = [
-            {
-                "symbol": symbol,
-                "resolution": resolution,
-                "start_date": start_time,
-                "end_date": end_time,
-            }
-        ]
-        if lookback_units > request_split:
-            for i in range(0, lookback_units // request_split):
-                end_time = start_time
-                start_time = end_time - timedelta(
-                    seconds=resolution_seconds.value * request_split
-                )
-                requests.append(
-                    {
-                        "symbol": symbol,
-                        "resolution": resolution,
-                        "start_date": start_time,
-                        "end_date": end_time,
-                    }
+    def open_chain_state(self) -> None:
+        """Create the shared chain state, or clear it when it is already open"""
+        if not CHAIN_STATE_PATH:
+            return
+        try:
+            if self.chain_state is None:
+                self.chain_state = ChainState.create(
+                    CHAIN_STATE_PATH, CHAIN_STATE_CAPACITY
                 )
-        return requests
+            else:
+                self.chain_state.clear()
+        except (OSError, ValueError) as e:
+            logger.error(f"PRODUCER: Error opening the chain state: {e}")
+            self.chain_state = None
+        self.ingestor.chain_state = self.chain_state
 
     async def clear_database(self):
         """Clear all data from the options table"""
         try:
             async with get_db_session() as db:
                 await db.execute(text("TRUNCATE TABLE market_data.options"))
+                await notify_changes(db, [RESYNC])
                 await db.commit()
                 logger.info("PRODUCER: Database table cleared successfully")
         except Exception as e:
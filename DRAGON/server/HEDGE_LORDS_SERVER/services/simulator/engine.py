@@ -0,0 +1,134 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from typing import Any
+from concurrent.futures import ProcessPoolExecutor
+from services.common.core.config import SIMULATION_WORKERS, SIMULATION_CHUNK_SIZE
+from services.common.core.logging import simulator_logger as logger
+from services.common.math.cpu_monte import simulate
+from services.common.math.return_models import get_return_model
+from services.common.math.rng import make_generator, new_seed, spawn_seeds
+from services.common.types.enums import SimulationModel
+
+
+def simulate_block(
+    closes: np.ndarray,
+    candles: int,
+    iterations: int,
+    seed_sequence: np.random.SeedSequence,
+    model: SimulationModel = SimulationModel.LAPLACE,
+    params: Any = None,
+) -> np.ndarray:
+    """Run one block of iterations. Executed inside a pool worker process."""
+    return simulate(
+        pd.Series(closes),
+        candles,
+        iterations,
+        rng=make_generator(seed_sequence),
+        model=model,
+        params=params,
+    )
+
+
+class SimulationEngine:
+    """
+    In-process Monte Carlo engine backed by a process pool.
+
+    The work is split into blocks of ``chunk_size`` iterations which are
+    submitted to the pool independently, so cancelling the awaiting task
+    drops every block that has not started yet.
+
+    Block i draws from the i-th child of the run's SeedSequence and the blocks
+    are concatenated in order, so for a given seed and chunk_size the result
+    does not depend on the number of workers or on scheduling.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = SIMULATION_WORKERS,
+        chunk_size: int = SIMULATION_CHUNK_SIZE,
+    ) -> None:
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = max(1, chunk_size)
+        self.executor: ProcessPoolExecutor | None = None
+
+    def start(self) -> None:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            logger.info(
+                f"SIMULATOR: Started process pool with {self.max_workers} workers"
+            )
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            logger.info("SIMULATOR: Process pool shut down")
+
+    def split_iterations(self, iterations: int) -> list[int]:
+        """Split the iteration count into blocks of at most chunk_size"""
+        full_blocks, remainder = divmod(iterations, self.chunk_size)
+        blocks = [self.chunk_size] * full_blocks
+        if remainder:
+            blocks.append(remainder)
+        return blocks
+
+    async def run(
+        self,
+        closes: np.ndarray,
+        candles: int,
+        iterations: int,
+        seed: int | None = None,
+        model: SimulationModel = SimulationModel.LAPLACE,
+        params: Any = None,
+    ) -> np.ndarray:
+        """
+        Simulate price paths from a close series.
+
+        Args:
+            closes: Historical close prices, oldest first.
+            candles: Number of candles to simulate up to expiry.
+            iterations: Number of simulated paths.
+            seed: Seed of the run, drawn from OS entropy if None.
+            model: Return model of the log returns.
+            params: Parameters of the model, calibrated here once if None
+                rather than in every block.
+
+        Returns:
+            Array of shape (candles, iterations) with the simulated prices.
+        """
+        if candles < 1 or iterations < 1:
+            raise ValueError(
+                f"candles and iterations must be positive, got {candles}, {iterations}"
+            )
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        closes = np.ascontiguousarray(closes, dtype=float)
+        blocks = self.split_iterations(iterations)
+        seed = seed if seed is not None else new_seed()
+        if params is None:
+            # Calibrating GARCH or bootstrap models takes ~100 ms, off the loop
+            params = await asyncio.to_thread(get_return_model(model).calibrate, closes)
+        futures = [
+            loop.run_in_executor(
+                self.executor,
+                simulate_block,
+                closes,
+                candles,
+                block,
+                seed_sequence,
+                model,
+                params,
+            )
+            for block, seed_sequence in zip(blocks, spawn_seeds(seed, len(blocks)))
+        ]
+        try:
+            results = await asyncio.gather(*futures)
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            logger.info("SIMULATOR: Simulation cancelled")
+            raise
+
+        return np.hstack(results)
@@ -0,0 +1,203 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from services.common.core.config import SIMULATION_CACHE_MAX_BYTES
+from services.common.core.logging import simulator_logger as logger
+from services.common.types.enums import Resolution, SimulationModel
+
+MANIFEST_SUFFIX = ".json"
+DATA_SUFFIX = ".npy"
+
+
+@dataclass
+class StoredSimulation:
+    """Simulated price paths, memory-mapped from the store, with their metadata"""
+
+    key: str
+    paths: np.ndarray  # (candles, iterations)
+    timestamps: pd.DatetimeIndex
+    data_hash: str
+    seed: int
+
+    @property
+    def final_prices(self) -> np.ndarray:
+        return self.paths[-1]
+
+
+def hash_prices(prices: pd.Series) -> str:
+    """Fingerprint of the close series a simulation was calibrated on"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(prices.to_numpy(dtype=float)).tobytes())
+    digest.update(np.asarray(prices.index.asi8).tobytes())
+    return digest.hexdigest()
+
+
+class SimulationStore:
+    """
+    Directory of simulations stored as .npy matrices with a JSON manifest each.
+
+    Reads are memory-mapped, so a cache hit costs opening two files. The
+    manifest is written last and acts as the commit marker of an entry; its
+    modification time is refreshed on every hit and used as the last access
+    time for least-recently-used eviction once the matrices exceed max_bytes.
+    """
+
+    def __init__(
+        self, directory: str, max_bytes: int = SIMULATION_CACHE_MAX_BYTES
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(
+        symbol: str,
+        expiry_datetime: datetime,
+        resolution: Resolution,
+        iterations: int,
+        seed: Optional[int] = None,
+        model: SimulationModel = SimulationModel.LAPLACE,
+    ) -> str:
+        """Generate the cache key of a simulation."""
+        seed_part = f"_{seed}" if seed is not None else ""
+        # Keys of the default model keep their original form
+        model_part = f"_{model.value}" if model != SimulationModel.LAPLACE else ""
+        return f"sim_{symbol}_{expiry_datetime.strftime('%Y%m%d')}_{resolution.name}_{iterations}{seed_part}{model_part}"
+
+    def get(self, key: str, data_hash: Optional[str] = None) -> StoredSimulation | None:
+        """
+        Load a stored simulation.
+
+        Returns None if the key is unknown or, when data_hash is given, if the
+        simulation was run on different historical data.
+        """
+        manifest_path = self._path(key, MANIFEST_SUFFIX)
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+            if data_hash is not None and manifest["data_hash"] != data_hash:
+                logger.info(f"SIMULATOR: Stored simulation {key} is stale")
+                return None
+            paths = np.load(self._path(key, DATA_SUFFIX), mmap_mode="r")
+            os.utime(manifest_path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"SIMULATOR: Unreadable stored simulation {key}: {e}")
+            return None
+
+        return StoredSimulation(
+            key=key,
+            paths=paths,
+            timestamps=pd.date_range(
+                start=pd.Timestamp(manifest["start"]),
+                periods=manifest["periods"],
+                freq=pd.Timedelta(seconds=manifest["freq_seconds"]),
+            ),
+            data_hash=manifest["data_hash"],
+            seed=manifest["seed"],
+        )
+
+    def put(
+        self,
+        key: str,
+        paths: np.ndarray,
+        timestamps: pd.DatetimeIndex,
+        data_hash: str,
+        seed: int,
+    ) -> StoredSimulation:
+        """Store a simulation, then evict old entries if over budget"""
+        if len(timestamps) != paths.shape[0]:
+            raise ValueError(
+                f"{len(timestamps)} timestamps for {paths.shape[0]} simulated candles"
+            )
+
+        os.makedirs(self.directory, exist_ok=True)
+        data_path = self._path(key, DATA_SUFFIX)
+        manifest_path = self._path(key, MANIFEST_SUFFIX)
+        freq_seconds = (
+            (timestamps[1] - timestamps[0]).total_seconds()
+            if len(timestamps) > 1
+            else 0.0
+        )
+        manifest = {
+            "key": key,
+            "shape": list(paths.shape),
+            "dtype": str(paths.dtype),
+            "start": timestamps[0].isoformat(),
+            "periods": len(timestamps),
+            "freq_seconds": freq_seconds,
+            "data_hash": data_hash,
+            "seed": seed,
+            "created_at": datetime.now().isoformat(),
+        }
+
+        # Write to temporary files and rename, so readers never see half an entry
+        with open(data_path + ".tmp", "wb") as file:
+            np.save(file, paths)
+        os.replace(data_path + ".tmp", data_path)
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+        self.evict()
+        return StoredSimulation(
+            key=key,
+            paths=paths,
+            timestamps=timestamps,
+            data_hash=data_hash,
+            seed=seed,
+        )
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Delete least recently used entries until the store fits in max_bytes"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for key, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= max_bytes:
+                break
+            self.remove(key)
+            total -= size
+            removed += 1
+
+        if removed:
+            logger.info(f"SIMULATOR: Evicted {removed} stored simulations")
+        return removed
+
+    def clear(self) -> None:
+        """Delete all stored simulations"""
+        self.evict(max_bytes=0)
+
+    def remove(self, key: str) -> None:
+        for suffix in (MANIFEST_SUFFIX, DATA_SUFFIX):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def entries(self) -> list[tuple[str, int, float]]:
+        """List (key, size in bytes, last access time) of the stored simulations"""
+        if not os.path.isdir(self.directory):
+            return []
+
+        entries = []
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith(MANIFEST_SUFFIX):
+                continue
+            key = file_name[: -len(MANIFEST_SUFFIX)]
+            try:
+                last_access = os.path.getmtime(self._path(key, MANIFEST_SUFFIX))
+                size = os.path.getsize(self._path(key, DATA_SUFFIX))
+            except FileNotFoundError:
+                continue
+            entries.append((key, size, last_access))
+        return entries
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key + suffix)
@@ -0,0 +1,109 @@
+"""
+Compares the validated ticker path with TickDecoder.
+
+    python -m tests.benchmarks.bench_tick_decoder
+"""
+
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("DB_USER", "bench")
+os.environ.setdefault("DB_PASSWORD", "bench")
+os.environ.setdefault("REMOTE_DB_HOST", "localhost")
+os.environ.setdefault("DB_NAME", "bench")
+
+from services.producer.decoder import TickDecoder  # noqa: E402
+from services.producer.ingestion import ticker_to_row  # noqa: E402
+from services.producer.service import OptionsProducer  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000)
+
+
+def make_messages(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        strike = 80000 + 1000 * (i % 40)
+        mark = rng.uniform(10, 5000)
+        messages.append(
+            json.dumps(
+                {
+                    "type": "v2/ticker",
+                    "symbol": f"{'C' if i % 2 else 'P'}-BTC-{strike}-310525",
+                    "timestamp": 1748000000000000 + i,
+                    "contract_type": "call_options" if i % 2 else "put_options",
+                    "underlying_asset_symbol": "BTC",
+                    "product_id": 10000 + i % 80,
+                    "mark_price": f"{mark:.2f}",
+                    "spot_price": f"{rng.uniform(85000, 95000):.2f}",
+                    "strike_price": str(strike),
+                    "oi": "12.5",
+                    "oi_contracts": "12500",
+                    "turnover_usd": rng.uniform(0, 1e6),
+                    "quotes": {
+                        "best_bid": f"{mark * 0.99:.2f}",
+                        "best_ask": f"{mark * 1.01:.2f}",
+                        "bid_size": "100",
+                        "ask_size": "120",
+                        "mark_iv": f"{rng.uniform(0.3, 0.9):.4f}",
+                    },
+                    "greeks": {
+                        "delta": f"{rng.uniform(-1, 1):.4f}",
+                        "gamma": "0.00002",
+                        "theta": "-12.5",
+                        "vega": "35.1",
+                        "rho": "4.2",
+                    },
+                    "price_band": {"lower_limit": "0.1", "upper_limit": "9000"},
+                }
+            )
+        )
+    return messages
+
+
+def validated_path(producer: OptionsProducer, messages: list[str]) -> int:
+    rows = 0
+    for message in messages:
+        ticker = producer.parse_ticker(json.loads(message))
+        if ticker is not None:
+            ticker_to_row(ticker)
+            rows += 1
+    return rows
+
+
+def decoder_path(decoder: TickDecoder, messages: list[str]) -> int:
+    rows = 0
+    for message in messages:
+        if decoder.decode(message) is not None:
+            rows += 1
+    return rows
+
+
+def timed(function, *args) -> float:
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    producer = OptionsProducer("key", "secret", "ws://localhost", "http://localhost")
+    decoder = TickDecoder()
+
+    print(
+        f"{'messages':>10} {'validated msg/s':>16} {'decoder msg/s':>14} {'speedup':>8}"
+    )
+    for size in SIZES:
+        messages = make_messages(size)
+        validated = timed(validated_path, producer, messages)
+        decoded = timed(decoder_path, decoder, messages)
+        print(
+            f"{size:>10} {size / validated:>16,.0f} {size / decoded:>14,.0f} "
+            f"{validated / decoded:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
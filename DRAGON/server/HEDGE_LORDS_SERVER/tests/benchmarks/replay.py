@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, Sequence
+
+import numpy as np
+
+# Websocket messages recorded from the v2/ticker channel, one per line, with
+# the subscription acknowledgement and heartbeats of the stream
+RECORDED_TICKERS = Path(__file__).parent / "data" / "tickers.jsonl"
+
+
+def load_recorded(path: Path = RECORDED_TICKERS) -> list[str]:
+    with open(path) as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def recorded_tickers(count: int, path: Path = RECORDED_TICKERS) -> list[str]:
+    """
+    count ticker messages cycling through the recording. Every pass over the
+    recording moves the timestamps forward, so repeated symbols are new ticks.
+    """
+    recording = [json.loads(message) for message in load_recorded(path)]
+    tickers = [message for message in recording if message["type"] == "v2/ticker"]
+    span = tickers[-1]["timestamp"] - tickers[0]["timestamp"] + 1
+    messages = []
+    for index in range(count):
+        passes, position = divmod(index, len(tickers))
+        message = dict(tickers[position])
+        message["timestamp"] += passes * span
+        messages.append(json.dumps(message))
+    return messages
+
+
+@dataclass
+class ReplayStats:
+    """When each message was due and when its handler returned, perf_counter"""
+
+    scheduled: np.ndarray
+    handled: np.ndarray
+
+    @property
+    def rate(self) -> float:
+        """Messages handled per second"""
+        elapsed = self.handled[-1] - self.scheduled[0]
+        return self.scheduled.size / elapsed if elapsed > 0 else float("inf")
+
+    @property
+    def latencies(self) -> np.ndarray:
+        return self.handled - self.scheduled
+
+    def summary(self, latencies: Optional[np.ndarray] = None) -> dict[str, float]:
+        """Rate and latency percentiles (ms), for benchmark extra_info"""
+        latencies = self.latencies if latencies is None else latencies
+        p50, p99, worst = np.percentile(latencies, [50, 99, 100]) * 1000
+        return {
+            "messages": int(self.scheduled.size),
+            "rate": round(self.rate),
+            "p50_ms": round(p50, 3),
+            "p99_ms": round(p99, 3),
+            "max_ms": round(worst, 3),
+        }
+
+
+async def replay(
+    messages: Sequence[Any],
+    rate: Optional[float],
+    handler: Callable[[Any], Awaitable[None]],
+) -> ReplayStats:
+    """
+    Feed messages to handler at rate messages per second, or back to back if
+    rate is None. Message i is due at start + i / rate; every due message is
+    handled in order and the loop then sleeps until the next one, so a handler
+    that cannot keep up shows as growing latency instead of a lower rate.
+    """
+    count = len(messages)
+    start = time.perf_counter()
+    scheduled = (
+        np.full(count, start)
+        if rate is None
+        else start + np.arange(count, dtype=float) / rate
+    )
+    handled = np.empty(count)
+    for index, message in enumerate(messages):
+        delay = scheduled[index] - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await handler(message)
+        handled[index] = time.perf_counter()
+    return ReplayStats(scheduled, handled)
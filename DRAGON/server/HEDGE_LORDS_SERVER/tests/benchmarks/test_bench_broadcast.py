@@ -0,0 +1,122 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+import pytest
+
+from services.consumer.websocket_manager import ConnectionManager
+from tests.benchmarks.replay import replay
+
+pytest.importorskip("pytest_benchmark")
+
+
+class RecordingWebSocket:
+    """Accepts every frame at once and records when it arrived"""
+
+    def __init__(self) -> None:
+        self.frames: list[tuple[float, str]] = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        self.frames.append((time.perf_counter(), text))
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.frames.append((time.perf_counter(), data))
+
+    async def close(self) -> None:
+        pass
+
+
+def premiums_message(sequence: int, contracts: int = 80) -> dict:
+    """A premiums snapshot shaped like the consumer's broadcasts"""
+    return {
+        "type": "premiums",
+        "sequence": sequence,
+        "data": [
+            {
+                "symbol": f"C-BTC-{80000 + 1000 * i}-310525",
+                "mark_price": 1500.0 + i,
+                "best_bid": 1490.0 + i,
+                "best_ask": 1510.0 + i,
+                "mark_iv": 0.55,
+            }
+            for i in range(contracts)
+        ],
+    }
+
+
+async def connect_clients(manager: ConnectionManager, clients: int) -> list:
+    sockets = [RecordingWebSocket() for _ in range(clients)]
+    for socket in sockets:
+        await manager.connect(socket, "premiums")
+    return sockets
+
+
+@pytest.mark.parametrize("clients", [10, 100, 1000])
+def test_broadcast_fan_out(benchmark, loop, clients):
+    """One snapshot serialized and delivered to every client"""
+    manager = ConnectionManager()
+    sockets = loop.run_until_complete(connect_clients(manager, clients))
+    message = premiums_message(0)
+
+    async def deliver():
+        expected = len(sockets[-1].frames) + 1
+        await manager.broadcast(message, "premiums")
+        while len(sockets[-1].frames) < expected:
+            await asyncio.sleep(0)
+
+    benchmark(lambda: loop.run_until_complete(deliver()))
+    loop.run_until_complete(manager.stop())
+
+    assert all(socket.frames for socket in sockets)
+
+
+def last_sequence(socket: RecordingWebSocket) -> int:
+    return json.loads(socket.frames[-1][1])["sequence"] if socket.frames else -1
+
+
+@pytest.mark.parametrize("rate", [20, 100])
+def test_broadcast_replay(benchmark, loop, rate):
+    """
+    Snapshots broadcast to 100 clients at a fixed rate for half a second. The
+    latency is from when a snapshot was due to when a client's socket got it.
+    Fails if any client queue overflowed, i.e. the fan-out fell behind.
+    """
+    clients, count = 100, rate // 2
+    messages = [premiums_message(n) for n in range(count)]
+
+    def run():
+        manager = ConnectionManager()
+
+        async def scenario():
+            sockets = await connect_clients(manager, clients)
+            stats = await replay(
+                messages, rate, lambda message: manager.broadcast(message, "premiums")
+            )
+            # The newest snapshot is never dropped, every client ends with it
+            while any(last_sequence(socket) < count - 1 for socket in sockets):
+                await asyncio.sleep(0.001)
+            dropped = sum(
+                subscriber.dropped
+                for subscriber in manager.active_connections["premiums"]
+            )
+            await manager.stop()
+            return stats, sockets, dropped
+
+        return loop.run_until_complete(scenario())
+
+    stats, sockets, dropped = benchmark.pedantic(run, rounds=3)
+    latencies = np.array(
+        [
+            at - stats.scheduled[json.loads(text)["sequence"]]
+            for socket in sockets
+            for at, text in socket.frames
+        ]
+    )
+    benchmark.extra_info.update(stats.summary(latencies), dropped=dropped)
+
+    assert dropped == 0
+    assert latencies.size == clients * count
@@ -0,0 +1,72 @@
+from datetime import date
+
+import pytest
+
+from services.common.db.chain_state import ChainState, LiveChain
+from services.consumer.service import OptionsConsumer
+from services.producer.decoder import TickDecoder
+from services.producer.ingestion import chain_row
+
+pytest.importorskip("pytest_benchmark")
+
+EXPIRY = date(2025, 5, 31)
+# Contracts in the recording
+CONTRACTS = 40
+
+
+@pytest.fixture(scope="module")
+def rows(tickers) -> list[tuple]:
+    """Latest row of each recorded contract, as the ingestor flushes them"""
+    decoder = TickDecoder()
+    latest = {}
+    for message in tickers:
+        row = chain_row(decoder.decode(message))
+        latest[row[0]] = row
+    return list(latest.values())
+
+
+@pytest.fixture(scope="module")
+def state(tmp_path_factory, rows):
+    path = str(tmp_path_factory.mktemp("chain") / "chain")
+    writer = ChainState.create(path, capacity=4096)
+    writer.update(rows)
+    reader = ChainState.attach(path)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def test_update(benchmark, state, rows):
+    writer, _ = state
+
+    assert benchmark(writer.update, rows) == CONTRACTS
+
+
+def test_snapshot(benchmark, state):
+    _, reader = state
+
+    assert len(benchmark(reader.snapshot)) == CONTRACTS
+
+
+def test_at_the_money(benchmark, state):
+    _, reader = state
+
+    assert len(benchmark(reader.at_the_money, "BTC", EXPIRY)) in (1, 2)
+
+
+def test_strike_range(benchmark, state):
+    _, reader = state
+
+    rows = benchmark(reader.strike_range, "BTC", EXPIRY, 90_000, 100_000)
+
+    assert rows.strike.min() >= 90_000 and rows.strike.max() <= 100_000
+
+
+def test_consumer_chain(benchmark, state):
+    """The premiums chain as the consumer builds it on every change"""
+    writer, _ = state
+    consumer = OptionsConsumer()
+    consumer.live_chain = LiveChain(writer.path)
+
+    assert len(benchmark(consumer.live_options_chain)) == CONTRACTS
+    consumer.live_chain.close()
@@ -0,0 +1,95 @@
+import json
+import warnings
+
+import pytest
+from sqlalchemy import exc, func, select
+
+from services.common.types.models import Options
+from services.producer.decoder import TickDecoder
+from services.producer.service import OptionsProducer
+from tests.benchmarks.bench_tick_decoder import decoder_path, validated_path
+from tests.benchmarks.replay import recorded_tickers, replay
+
+pytest.importorskip("pytest_benchmark")
+
+# Seconds of recorded traffic replayed per rate
+REPLAY_SECONDS = 0.5
+# Contracts in the recording
+CONTRACTS = 40
+# Messages per second of the unthrottled replay's message count
+MAX_RATE = 20_000
+
+
+@pytest.fixture
+def producer() -> OptionsProducer:
+    return OptionsProducer("key", "secret", "ws://localhost", "http://localhost")
+
+
+def test_prepare_numeric_values(benchmark, producer, tickers):
+    def fresh_messages():
+        # prepare_numeric_values converts in place, every round needs new dicts
+        return ([json.loads(message) for message in tickers],), {}
+
+    def prepare(messages):
+        for message in messages:
+            producer.prepare_numeric_values(message)
+
+    benchmark.pedantic(prepare, setup=fresh_messages, rounds=50)
+
+
+def test_validated_ticker_path(benchmark, producer, tickers):
+    rows = benchmark(validated_path, producer, tickers)
+
+    assert rows == len(tickers)
+
+
+def test_decoder_path(benchmark, tickers):
+    rows = benchmark(decoder_path, TickDecoder(), tickers)
+
+    assert rows == len(tickers)
+
+
+def test_save_ticker_to_db(benchmark, loop, session_factory, producer, tickers):
+    parsed = [producer.parse_ticker(json.loads(message)) for message in tickers]
+
+    async def save_all():
+        async with session_factory() as db:
+            for ticker in parsed:
+                await producer.save_ticker_to_db(ticker, db)
+
+    async def count():
+        async with session_factory() as db:
+            return await db.scalar(select(func.count()).select_from(Options))
+
+    with warnings.catch_warnings():
+        # SQLite stores Numeric columns as floats and warns about Decimals
+        warnings.simplefilter("ignore", exc.SAWarning)
+        benchmark.pedantic(lambda: loop.run_until_complete(save_all()), rounds=5)
+
+    assert loop.run_until_complete(count()) >= CONTRACTS
+
+
+@pytest.mark.parametrize("rate", [1_000, 5_000, None], ids=["1k", "5k", "max"])
+def test_ticker_replay(benchmark, loop, producer, rate):
+    """
+    Recorded tickers through the websocket handler (decode and enqueue) and
+    the ingestor's coalescing, at a fixed message rate. Unthrottled, measures
+    the highest rate. The achieved rate is recorded in extra_info, slowdowns
+    are caught by --benchmark-compare-fail rather than a wall-clock threshold.
+    """
+    messages = recorded_tickers(int((rate or MAX_RATE) * REPLAY_SECONDS))
+
+    async def handle(message):
+        await producer.message_handler(message)
+        producer.ingestor.drain()
+
+    def run():
+        producer.ingestor.pending.clear()
+        producer.ingestor.history.clear()
+        return loop.run_until_complete(replay(messages, rate, handle))
+
+    stats = benchmark.pedantic(run, rounds=3)
+    benchmark.extra_info.update(stats.summary())
+
+    assert producer.ingestor.metrics.messages_dropped == 0
+    assert len(producer.ingestor.pending) == CONTRACTS
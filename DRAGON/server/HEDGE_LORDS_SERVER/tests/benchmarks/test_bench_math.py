@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.common.math.cpu_monte import simulate
+from services.common.math.options_contracts import leg_payoffs, portfolio_payoff
+from services.common.math.return_models import get_return_model
+from services.common.math.risk import path_pnl
+from services.common.types.enums import SimulationModel
+
+pytest.importorskip("pytest_benchmark")
+
+# A week of hourly candles, the usual request
+CANDLES = 168
+PATHS = 20_000
+
+
+@pytest.fixture(scope="module")
+def closes() -> pd.Series:
+    returns = np.random.default_rng(0).laplace(0, 0.006, 2000)
+    return pd.Series(90_000 * np.exp(np.cumsum(returns)))
+
+
+@pytest.fixture(scope="module")
+def strangle() -> dict:
+    """Long strangle plus a short call, the shape of a typical payoff request"""
+    return {
+        "strikes": np.array([85_000.0, 95_000.0, 100_000.0]),
+        "premiums": np.array([1200.0, 1100.0, 450.0]),
+        "directions": np.array([1, 1, -1]),
+        "is_call": np.array([False, True, True]),
+    }
+
+
+@pytest.mark.parametrize("model", list(SimulationModel), ids=lambda m: m.value)
+def test_simulate_terminal(benchmark, closes, model):
+    params = get_return_model(model).calibrate(closes.to_numpy())
+    rng = np.random.default_rng(1)
+
+    prices = benchmark(
+        simulate,
+        closes,
+        CANDLES,
+        PATHS,
+        "terminal",
+        rng=rng,
+        model=model,
+        params=params,
+    )
+
+    assert prices.shape == (PATHS,)
+
+
+@pytest.mark.parametrize(
+    "model", [SimulationModel.LAPLACE, SimulationModel.GARCH], ids=lambda m: m.value
+)
+def test_simulate_full_paths(benchmark, closes, model):
+    params = get_return_model(model).calibrate(closes.to_numpy())
+    rng = np.random.default_rng(2)
+
+    paths = benchmark(
+        simulate, closes, CANDLES, 5_000, rng=rng, model=model, params=params
+    )
+
+    assert paths.shape == (CANDLES, 5_000)
+
+
+@pytest.mark.parametrize(
+    "model", [SimulationModel.GARCH, SimulationModel.MERTON], ids=lambda m: m.value
+)
+def test_calibrate(benchmark, closes, model):
+    benchmark(get_return_model(model).calibrate, closes.to_numpy())
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32], ids=["f64", "f32"])
+def test_portfolio_payoff(benchmark, strangle, dtype):
+    prices = np.random.default_rng(3).uniform(70_000, 110_000, 200_000)
+
+    payoff = benchmark(portfolio_payoff, prices, dtype=dtype, **strangle)
+
+    assert payoff.shape == prices.shape
+
+
+def test_leg_payoffs_on_a_diagram_grid(benchmark, strangle):
+    grid = np.linspace(70_000, 110_000, 2_000)
+
+    payoffs = benchmark(leg_payoffs, grid, **strangle)
+
+    assert payoffs.shape == (3, grid.size)
+
+
+def test_path_pnl(benchmark, strangle):
+    steps, paths = 48, 2_000
+    rng = np.random.default_rng(4)
+    prices = 90_000 * np.exp(np.cumsum(rng.normal(0, 0.005, (steps, paths)), axis=0))
+    seconds = np.linspace(48 * 3600, 0, steps)[:, None].repeat(3, axis=1)
+
+    pnl = benchmark(
+        path_pnl,
+        prices,
+        seconds,
+        strangle["strikes"],
+        np.array([0.55, 0.5, 0.5]),
+        strangle["is_call"],
+        strangle["directions"],
+        strangle["premiums"],
+    )
+
+    assert pnl.shape == (steps, paths)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from services.common.math.strategies import enumerate_strategies, score_strategies
+
+pytest.importorskip("pytest_benchmark")
+
+SPOT = 90_000.0
+# A daily BTC expiry lists about 40 strikes
+STRIKES = np.arange(70_000.0, 111_000.0, 1_000.0)
+PATHS = 10_000
+
+
+@pytest.fixture(scope="module")
+def chain() -> dict:
+    strikes = np.repeat(STRIKES, 2)
+    is_call = np.tile([True, False], STRIKES.size)
+    mid = np.maximum(np.where(is_call, SPOT - strikes, strikes - SPOT), 0) + 500
+    return {
+        "strikes": strikes,
+        "is_call": is_call,
+        "bids": mid * 0.97,
+        "asks": mid * 1.03,
+    }
+
+
+@pytest.fixture(scope="module")
+def terminal() -> np.ndarray:
+    return SPOT * np.exp(np.random.default_rng(0).normal(0, 0.05, PATHS))
+
+
+def test_enumerate_strategies(benchmark, chain):
+    candidates = benchmark(enumerate_strategies, **chain, center=SPOT, max_strikes=24)
+
+    assert len(candidates) > 3000
+
+
+def test_score_strategies(benchmark, chain, terminal):
+    """Thousands of candidates against the terminal prices of a simulation"""
+    candidates = enumerate_strategies(**chain, center=SPOT, max_strikes=24)
+
+    scores = benchmark(score_strategies, candidates, terminal)
+
+    assert scores.expected_pnl.size == len(candidates)
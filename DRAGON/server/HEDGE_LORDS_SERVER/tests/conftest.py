@@ -0,0 +1,12 @@
+import os
+
+# services.common.db.database builds its engine at import time, so it needs a
+# syntactically valid URL even when the tests never connect.
+for name, value in {
+    "DB_USER": "hedge_lords",
+    "DB_PASSWORD": "hedge_lords",
+    "REMOTE_DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "hedge_lords",
+}.items():
+    os.environ.setdefault(name, value)
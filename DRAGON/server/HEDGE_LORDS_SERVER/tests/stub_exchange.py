@@ -0,0 +1,77 @@
+"""Local HTTP/1.1 stand-in for the Delta Exchange REST API, for tests"""
+
+import asyncio
+import json
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+class StubExchangeServer:
+    """
+    Serves /v2/products and /v2/history/candles on 127.0.0.1 with keep-alive,
+    recording every request and counting the TCP connections opened.
+    Usable as an async context manager inside the test's event loop.
+    """
+
+    def __init__(self, products: list[str], candles: Optional[list[dict]] = None):
+        self.products = products
+        self.candles = candles or []
+        self.status = 200
+        self.requests: list[tuple[str, dict]] = []
+        self.connections = 0
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def __aenter__(self) -> "StubExchangeServer":
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    def requests_to(self, path: str) -> int:
+        return sum(1 for request_path, _ in self.requests if request_path == path)
+
+    def respond(self, path: str, query: dict) -> tuple[int, dict]:
+        if self.status != 200:
+            return self.status, {"success": False, "error": "stub failure"}
+        if path == "/v2/products":
+            result = [{"symbol": symbol} for symbol in self.products]
+        elif path == "/v2/history/candles":
+            start, end = int(query["start"][0]), int(query["end"][0])
+            result = [c for c in self.candles if start <= c["time"] <= end]
+        else:
+            return 404, {"success": False, "error": "not found"}
+        return 200, {"success": True, "result": result}
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        try:
+            while request_line := await reader.readline():
+                # Headers are read and ignored, the stub only serves GETs
+                while (await reader.readline()) not in (b"\r\n", b""):
+                    pass
+                target = urlsplit(request_line.split()[1].decode())
+                query = parse_qs(target.query)
+                self.requests.append((target.path, query))
+
+                status, payload = self.respond(target.path, query)
+                body = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} STUB\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    "Connection: keep-alive\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
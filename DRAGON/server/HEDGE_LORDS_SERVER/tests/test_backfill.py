@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import httpx
+import numpy as np
+import pytest
+
+from services.common.types.enums import Resolution
+from services.common.types.models import LoadOHLCVRequest
+from services.producer import backfill
+from services.producer.backfill import (
+    OHLCVBackfiller,
+    RateLimiter,
+    chunk_ranges,
+    missing_ranges,
+)
+
+STEP = 60
+
+
+class FlakyExchange:
+    def __init__(self, failures: int, status_code: int = 503) -> None:
+        self.failures = failures
+        self.status_code = status_code
+        self.calls = 0
+
+    async def fetch_candles(self, coin, resolution, start, end):
+        self.calls += 1
+        if self.calls <= self.failures:
+            request = httpx.Request("GET", "https://example.invalid/history/candles")
+            raise httpx.HTTPStatusError(
+                "error",
+                request=request,
+                response=httpx.Response(self.status_code, request=request),
+            )
+        return [{"time": start, "close": 1.0}]
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    async def sleep(_):
+        pass
+
+    monkeypatch.setattr(backfill.asyncio, "sleep", sleep)
+
+
+def test_missing_ranges_finds_head_gaps_and_tail():
+    existing = np.array([120, 180, 360, 420], dtype=np.int64)
+
+    assert missing_ranges(existing, 0, 600, STEP) == [
+        (0, 60),
+        (240, 300),
+        (480, 600),
+    ]
+
+
+def test_missing_ranges_empty_when_complete():
+    existing = np.arange(0, 601, STEP, dtype=np.int64)
+
+    assert missing_ranges(existing, 0, 600, STEP) == []
+
+
+def test_chunk_ranges_limits_candles_per_request():
+    chunks = chunk_ranges([(0, 540), (900, 960)], STEP, 4)
+
+    assert chunks == [(0, 180), (240, 420), (480, 540), (900, 960)]
+
+
+def test_fetch_retries_server_errors(no_backoff):
+    exchange = FlakyExchange(failures=2)
+    backfiller = OHLCVBackfiller(exchange, requests_per_second=1000)
+
+    candles = asyncio.run(backfiller.fetch("BTCUSD", Resolution.MINUTE_1, 0, 59))
+
+    assert candles == [{"time": 0, "close": 1.0}]
+    assert exchange.calls == 3
+
+
+def test_fetch_does_not_retry_client_errors(no_backoff):
+    exchange = FlakyExchange(failures=1, status_code=400)
+    backfiller = OHLCVBackfiller(exchange, requests_per_second=1000)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(backfiller.fetch("BTCUSD", Resolution.MINUTE_1, 0, 59))
+    assert exchange.calls == 1
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=50, burst=1)
+
+    async def acquire_all():
+        for _ in range(6):
+            await limiter.acquire()
+
+    started = time.monotonic()
+    asyncio.run(acquire_all())
+
+    # The first token is available immediately, the other five take 20 ms each
+    assert time.monotonic() - started >= 0.09
+
+
+def test_load_request_accepts_one_or_many_symbols():
+    single = LoadOHLCVRequest(symbol="BTCUSD", resolution="1h", lookback_units=10)
+    many = LoadOHLCVRequest(
+        symbols=["BTCUSD", "ETHUSD"], resolution="1h", lookback_units=10
+    )
+
+    assert single.symbols == ["BTCUSD"]
+    assert many.symbols == ["BTCUSD", "ETHUSD"]
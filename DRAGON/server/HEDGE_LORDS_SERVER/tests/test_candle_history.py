@@ -0,0 +1,203 @@
+import asyncio
+import struct
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.common.db.candles import (
+    COPY_SIGNATURE,
+    HistoricalCloseCache,
+    candle_changes,
+    decode_candle_change,
+    encode_candle_change,
+    parse_binary_closes,
+)
+from services.common.db.changes import RESYNC, ChangeBus
+from services.common.types.enums import Resolution
+from services.simulator.store import hash_prices
+
+POSTGRES_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+START = datetime(2025, 5, 1, tzinfo=timezone.utc)
+
+
+def binary_copy(rows, extension: bytes = b"") -> bytes:
+    """Binary COPY output of (timestamptz, float8) rows, as Postgres sends it"""
+    data = COPY_SIGNATURE + struct.pack(">iI", 0, len(extension)) + extension
+    for time, close in rows:
+        micros = (time - POSTGRES_EPOCH) // timedelta(microseconds=1)
+        data += struct.pack(">hiqid", 2, 8, micros, 8, close)
+    return data + struct.pack(">h", -1)
+
+
+def test_parse_binary_closes():
+    rows = [(START + timedelta(hours=n), 90_000.5 + n) for n in range(3)]
+
+    times, closes = parse_binary_closes(binary_copy(rows, extension=b"ext"))
+
+    assert times.dtype == "datetime64[us]" and closes.dtype == np.float64
+    assert times.tolist() == [time.replace(tzinfo=None) for time, _ in rows]
+    assert closes.tolist() == [90_000.5, 90_001.5, 90_002.5]
+
+
+def test_parse_binary_closes_of_an_empty_series():
+    times, closes = parse_binary_closes(binary_copy([]))
+
+    assert times.size == 0 and closes.size == 0
+
+
+def test_parse_binary_closes_rejects_nulls():
+    data = bytearray(binary_copy([(START, 1.0)]))
+    # Turn the close into a NULL (length -1) of the same width
+    data[-12:-8] = struct.pack(">i", -1)
+
+    with pytest.raises(ValueError):
+        parse_binary_closes(bytes(data))
+
+
+def test_candle_changes_start_at_the_oldest_candle_of_each_series():
+    rows = [
+        ("BTCUSD", "1h", START + timedelta(hours=2), None),
+        ("BTCUSD", "1h", START, None),
+        ("ETHUSD", "1h", START + timedelta(hours=1), None),
+    ]
+
+    changes = candle_changes(rows)
+
+    assert changes == [
+        encode_candle_change("BTCUSD", Resolution.HOUR_1, START),
+        encode_candle_change("ETHUSD", Resolution.HOUR_1, START + timedelta(hours=1)),
+    ]
+    assert decode_candle_change(changes[0]) == (
+        "BTCUSD",
+        "1h",
+        np.datetime64("2025-05-01T00:00:00", "us"),
+    )
+    assert decode_candle_change("BTCUSD|1h") is None
+
+
+class TableCache(HistoricalCloseCache):
+    """Serves series from an in-memory table and records every read"""
+
+    def __init__(self, table: dict, **kwargs) -> None:
+        super().__init__(bus=ChangeBus(), **kwargs)
+        self.table = table
+        self.reads: list[tuple] = []
+
+    async def fetch(self, symbol, resolution, since=None):
+        self.reads.append((symbol, resolution.value, since))
+        rows = sorted(self.table.get((symbol, resolution.value), {}).items())
+        if since is not None:
+            rows = [(time, close) for time, close in rows if time >= since]
+        times = np.array([time for time, _ in rows], dtype="datetime64[us]")
+        return times, np.array([close for _, close in rows], dtype=float)
+
+
+def hourly(closes, start: int = 0) -> dict:
+    first = np.datetime64("2025-05-01T00:00:00", "us")
+    return {
+        first + np.timedelta64(start + n, "h"): close for n, close in enumerate(closes)
+    }
+
+
+def test_cache_reads_a_series_once():
+    cache = TableCache({("BTCUSD", "1h"): hourly([1.0, 2.0, 3.0])})
+
+    async def scenario():
+        return await asyncio.gather(
+            *(cache.get("BTCUSD", Resolution.HOUR_1) for _ in range(3))
+        )
+
+    series = asyncio.run(scenario())
+
+    assert cache.reads == [("BTCUSD", "1h", None)]
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert all(s.tolist() == [1.0, 2.0, 3.0] for s in series)
+    assert str(series[0].index.tz) == "UTC"
+
+
+def test_series_matches_the_previous_loader():
+    cache = TableCache({("BTCUSD", "1h"): hourly([1.0, 2.0])})
+    times = [START, START + timedelta(hours=1)]
+    previous = pd.Series(
+        np.asarray([1.0, 2.0]), index=pd.DatetimeIndex(times).tz_convert(timezone.utc)
+    )
+
+    series = asyncio.run(cache.get("BTCUSD", Resolution.HOUR_1))
+
+    pd.testing.assert_series_equal(series, previous)
+    assert hash_prices(series) == hash_prices(previous)
+
+
+def test_changes_reload_only_the_written_candles():
+    table = {
+        ("BTCUSD", "1h"): hourly([1.0, 2.0, 3.0]),
+        ("ETHUSD", "1h"): hourly([10.0]),
+    }
+    cache = TableCache(table)
+
+    async def scenario():
+        await cache.get("BTCUSD", Resolution.HOUR_1)
+        await cache.get("ETHUSD", Resolution.HOUR_1)
+        # The backfill rewrote the last candle and appended two
+        table["BTCUSD", "1h"].update(hourly([3.5, 4.0, 5.0], start=2))
+        cache.invalidate(
+            [
+                encode_candle_change(
+                    "BTCUSD", Resolution.HOUR_1, START + timedelta(hours=3)
+                ),
+                encode_candle_change(
+                    "BTCUSD", Resolution.HOUR_1, START + timedelta(hours=2)
+                ),
+                encode_candle_change("SOLUSD", Resolution.HOUR_1, START),
+            ]
+        )
+        btc = await cache.get("BTCUSD", Resolution.HOUR_1)
+        eth = await cache.get("ETHUSD", Resolution.HOUR_1)
+        return btc, eth
+
+    btc, eth = asyncio.run(scenario())
+
+    assert btc.tolist() == [1.0, 2.0, 3.5, 4.0, 5.0]
+    assert btc.index.is_monotonic_increasing
+    assert eth.tolist() == [10.0]
+    assert cache.reads[2] == (
+        "BTCUSD",
+        "1h",
+        np.datetime64("2025-05-01T02:00:00", "us"),
+    )
+    assert len(cache.reads) == 3
+
+
+def test_resync_reloads_every_series():
+    table = {("BTCUSD", "1h"): hourly([1.0, 2.0])}
+    cache = TableCache(table)
+
+    async def scenario():
+        await cache.get("BTCUSD", Resolution.HOUR_1)
+        table["BTCUSD", "1h"] = hourly([7.0])
+        cache.bus.subscribe(cache.subscription)
+        cache.task = asyncio.create_task(cache.run())
+        cache.bus.publish([RESYNC])
+        await asyncio.sleep(0)
+        series = await cache.get("BTCUSD", Resolution.HOUR_1)
+        await cache.stop()
+        return series
+
+    assert asyncio.run(scenario()).tolist() == [7.0]
+    assert cache.reads[-1] == ("BTCUSD", "1h", None)
+
+
+def test_least_recently_used_series_are_dropped():
+    table = {(symbol, "1h"): hourly([1.0]) for symbol in ("A", "B", "C")}
+    cache = TableCache(table, max_series=2)
+
+    async def scenario():
+        for symbol in ("A", "B", "A", "C", "A"):
+            await cache.get(symbol, Resolution.HOUR_1)
+
+    asyncio.run(scenario())
+
+    assert list(cache.series) == [("C", "1h"), ("A", "1h")]
+    assert [read[0] for read in cache.reads] == ["A", "B", "C"]
@@ -0,0 +1,211 @@
+import asyncio
+import multiprocessing
+from datetime import date
+
+import numpy as np
+import pytest
+
+from services.common.db.chain_state import (
+    CHAIN_COLUMNS,
+    ChainState,
+    LiveChain,
+)
+from services.consumer.payoff_service import PayoffDiagramConsumer
+from services.consumer.service import OptionsConsumer
+
+EXPIRY = date(2025, 5, 31)
+
+
+def chain_row(symbol: str, **values) -> tuple:
+    """ChainState row of a contract, the contract type taken from the symbol"""
+    values.setdefault("timestamp", 1748000000000000)
+    if "contract_type" not in values:
+        values["contract_type"] = {"C": "call_options", "P": "put_options"}.get(
+            symbol[0], "perpetual_futures"
+        )
+    return (symbol,) + tuple(values.get(column) for column in CHAIN_COLUMNS[1:])
+
+
+CHAIN = [
+    chain_row(f"{side}-BTC-{strike}-310525", spot_price=90_400.0, best_bid=bid)
+    for strike, bid in ((89_000, 1_500.0), (90_000, 900.0), (91_000, 400.0))
+    for side in ("P", "C")
+] + [chain_row("BTCUSD", spot_price=90_400.0, mark_price=90_410.0)]
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    return str(tmp_path / "chain")
+
+
+@pytest.fixture
+def writer(path):
+    state = ChainState.create(path, capacity=16)
+    yield state
+    state.close()
+
+
+def test_readers_see_the_producers_updates(path, writer):
+    writer.update(CHAIN)
+    reader = ChainState.attach(path)
+
+    rows = reader.snapshot()
+
+    assert rows.symbols() == [row[0] for row in CHAIN]
+    assert rows.expiry_dates() == ["2025-05-31"] * 6 + [None]
+    assert rows.optional("strike")[:2] == [89_000.0, 89_000.0]
+    assert rows.optional("strike")[-1] is None
+    assert rows.optional("best_bid")[:2] == [1_500.0, 1_500.0]
+    assert rows.contract_types()[-1] == "perpetual_futures"
+    assert reader.contracts(["C-BTC-90000-310525", "unknown"]).symbols() == [
+        "C-BTC-90000-310525"
+    ]
+
+
+def test_ticks_without_quotes_keep_the_previous_ones(path, writer):
+    writer.update([chain_row("C-BTC-90000-310525", best_bid=900.0, delta=0.5)])
+    writer.update([chain_row("C-BTC-90000-310525", spot_price=90_500.0)])
+
+    rows = ChainState.attach(path).snapshot()
+
+    assert rows.column("best_bid").tolist() == [900.0]
+    assert rows.column("delta").tolist() == [0.5]
+    assert rows.column("spot_price").tolist() == [90_500.0]
+    # Top level columns are overwritten, like the upsert does
+    assert np.isnan(rows.column("mark_price")).all()
+
+
+def test_strike_lookups(path, writer):
+    writer.update(CHAIN)
+    reader = ChainState.attach(path)
+
+    chain = reader.expiry_chain("BTC", EXPIRY)
+    atm = reader.at_the_money("BTC", EXPIRY)
+
+    assert chain.strike.tolist() == [89_000.0] * 2 + [90_000.0] * 2 + [91_000.0] * 2
+    assert chain.is_call.tolist() == [True, False] * 3
+    assert atm.symbols() == ["C-BTC-90000-310525", "P-BTC-90000-310525"]
+    assert reader.at_the_money("BTC", EXPIRY, spot=90_600.0).strike[0] == 91_000.0
+    assert reader.strike_range("BTC", EXPIRY, 89_500, 91_000).strike.tolist() == (
+        [90_000.0] * 2 + [91_000.0] * 2
+    )
+    assert len(reader.expiry_chain("ETH", EXPIRY)) == 0
+    assert len(reader.at_the_money("BTC", date(2025, 6, 1))) == 0
+
+
+def test_readers_follow_a_cleared_and_a_replaced_state(path, writer):
+    writer.update(CHAIN)
+    live = LiveChain(path)
+    assert len(live.contracts()) == len(CHAIN)
+
+    writer.clear()
+    writer.update([chain_row("C-ETH-2500-310525")])
+    assert live.contracts().symbols() == ["C-ETH-2500-310525"]
+    assert live.get().expiry_chain("ETH", EXPIRY).symbols() == ["C-ETH-2500-310525"]
+
+    # A new producer with another capacity replaces the file
+    replacement = ChainState.create(path, capacity=32)
+    replacement.update([chain_row("P-ETH-2500-310525")])
+    assert live.contracts().symbols() == ["P-ETH-2500-310525"]
+
+    replacement.close(retire_file=True)
+    assert live.contracts() is None
+    live.close()
+
+
+def test_busy_or_full_states_are_not_read(path):
+    writer = ChainState.create(path, capacity=2)
+    reader = ChainState.attach(path)
+
+    with writer.writing():
+        assert reader.snapshot() is None
+    assert len(reader.snapshot()) == 0
+
+    writer.update(CHAIN[:3])
+    assert reader.snapshot() is None
+
+    writer.clear()
+    writer.update(CHAIN[:2])
+    assert len(reader.snapshot()) == 2
+    writer.close()
+
+
+def produce(path: str, started, stop) -> None:
+    """Producer process rewriting the chain, every contract and column at the same tick"""
+    writer = ChainState.create(path, capacity=16)
+    symbols = [row[0] for row in CHAIN]
+    tick = 0
+    while not stop.is_set():
+        tick += 1
+        values = dict.fromkeys(CHAIN_COLUMNS[3:], float(tick))
+        writer.update(
+            [chain_row(symbol, timestamp=tick, **values) for symbol in symbols]
+        )
+        started.set()
+    writer.close()
+
+
+def test_reads_never_see_half_an_update(path, writer):
+    context = multiprocessing.get_context("spawn")
+    started, stop = context.Event(), context.Event()
+    producer = context.Process(target=produce, args=(path, started, stop))
+    producer.start()
+    reader = ChainState.attach(path)
+    torn = reads = 0
+    try:
+        assert started.wait(30)
+        while reads < 2_000:
+            rows = reader.snapshot()
+            if rows is None or len(rows) < len(CHAIN):
+                continue
+            reads += 1
+            torn += len(set(rows.values.ravel()) | set(rows.timestamp)) != 1
+    finally:
+        stop.set()
+        producer.join()
+
+    assert torn == 0
+
+
+def test_consumer_reads_the_chain_from_memory(path, writer):
+    writer.update(CHAIN)
+    consumer = OptionsConsumer()
+    consumer.live_chain = LiveChain(path)
+
+    tickers = asyncio.run(consumer.read_options_chain({"C-BTC-90000-310525"}))
+
+    assert [ticker.model_dump() for ticker in tickers] == [
+        {
+            "symbol": "C-BTC-90000-310525",
+            "contract_type": "call_options",
+            "strike_price": 90_000.0,
+            "best_bid": 900.0,
+            "best_ask": None,
+            "spot_price": 90_400.0,
+            "expiry_date": "2025-05-31",
+        }
+    ]
+    assert len(consumer.live_options_chain()) == len(CHAIN)
+    consumer.live_chain.close()
+
+
+def test_payoff_reads_selected_contracts_from_memory(path, writer):
+    writer.update(CHAIN)
+    payoff = PayoffDiagramConsumer()
+    payoff.live_chain = LiveChain(path)
+    portfolio = payoff.get_portfolio()
+    portfolio.selected_contracts = {
+        "C-BTC-91000-310525": "sell",
+        "P-BTC-89000-310525": "buy",
+        "BTCUSD": "buy",
+    }
+
+    contracts = payoff.live_selected_contracts(portfolio)
+
+    # By strike, without the perpetual
+    assert [(c.symbol, c.contract_type, c.position.value) for c in contracts] == [
+        ("P-BTC-89000-310525", "put", "buy"),
+        ("C-BTC-91000-310525", "call", "sell"),
+    ]
+    assert contracts[0].expiry_date == "2025-05-31"
+    payoff.live_chain.close()
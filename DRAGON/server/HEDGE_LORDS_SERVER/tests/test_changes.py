@@ -0,0 +1,127 @@
+import asyncio
+
+import numpy as np
+
+from services.common.db.changes import (
+    MAX_PAYLOAD_BYTES,
+    ChangeBus,
+    decode_symbols,
+    encode_symbols,
+)
+from services.common.types.models import SimpleTicker
+from services.consumer import service
+from services.consumer.service import OptionsConsumer
+
+
+def make_ticker(symbol: str, best_bid: float = 100.0) -> SimpleTicker:
+    return SimpleTicker(
+        symbol=symbol,
+        contract_type="call_options",
+        strike_price=90000.0,
+        best_bid=best_bid,
+        best_ask=best_bid + 10,
+        spot_price=89000.0,
+        expiry_date="2025-05-31",
+    )
+
+
+def test_symbols_are_split_into_bounded_payloads():
+    symbols = [f"C-BTC-{strike}-310525" for strike in range(1000)]
+    payloads = encode_symbols(symbols)
+
+    assert len(payloads) > 1
+    assert all(len(payload.encode()) <= MAX_PAYLOAD_BYTES for payload in payloads)
+    assert set().union(*map(decode_symbols, payloads)) == set(symbols)
+
+
+def test_subscription_coalesces_repeated_changes():
+    async def scenario():
+        bus = ChangeBus()
+        subscription = bus.subscribe()
+        bus.publish(["A", "B"])
+        bus.publish(["A"])
+        first = await subscription.get()
+        bus.unsubscribe(subscription)
+        bus.publish(["C"])
+        return first, subscription.pending
+
+    first, pending = asyncio.run(scenario())
+
+    assert first == {"A", "B"}
+    assert pending == set()
+
+
+def test_apply_changes_returns_only_differences():
+    consumer = OptionsConsumer()
+    changed, removed = consumer.apply_changes([make_ticker("A"), make_ticker("B")])
+    assert [row["symbol"] for row in changed] == ["A", "B"]
+    assert removed == []
+
+    changed, removed = consumer.apply_changes(
+        [make_ticker("A"), make_ticker("B", best_bid=101.0)], {"A", "B", "X"}
+    )
+    assert [row["symbol"] for row in changed] == ["B"]
+    assert removed == []
+
+    # A requested symbol without a row was deleted
+    changed, removed = consumer.apply_changes([], {"A"})
+    assert changed == []
+    assert removed == ["A"]
+    assert list(consumer.chain) == ["B"]
+
+    # A full read removes everything it did not return
+    changed, removed = consumer.apply_changes([make_ticker("C")])
+    assert removed == ["B"]
+    assert list(consumer.chain) == ["C"]
+
+
+def test_merged_deltas_keep_the_latest_rows_and_removals():
+    consumer = OptionsConsumer()
+    first = consumer.delta_message(
+        [make_ticker("A").model_dump(), make_ticker("B").model_dump()], ["X", "Y"]
+    )
+    second = consumer.delta_message(
+        [make_ticker("A", best_bid=101.0).model_dump(), make_ticker("X").model_dump()],
+        ["B"],
+    )
+
+    merged = consumer.merge_deltas(first, second)
+
+    assert [(row["symbol"], row["best_bid"]) for row in merged["options_chain"]] == [
+        ("A", 101.0),
+        ("X", 100.0),
+    ]
+    # X came back, B went away
+    assert merged["removed"] == ["Y", "B"]
+    assert merged["timestamp"] == second["timestamp"]
+
+
+def test_failed_reads_are_retried_with_backoff(monkeypatch):
+    consumer = OptionsConsumer()
+    consumer.retry_interval = 0.02
+    consumer.max_retry_interval = 0.08
+    attempts = []
+
+    async def read_options_chain(symbols=None):
+        attempts.append(asyncio.get_running_loop().time())
+        raise ConnectionRefusedError("database down")
+
+    consumer.read_options_chain = read_options_chain
+    monkeypatch.setattr(service.manager, "has_subscribers", lambda name: True)
+
+    async def scenario():
+        stream = asyncio.create_task(consumer.start_streaming())
+        await asyncio.sleep(0)
+        service.change_bus.publish(["A"])
+        await asyncio.sleep(0.3)
+        await consumer.stop_streaming()
+        stream.cancel()
+        await asyncio.gather(stream, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+    gaps = np.diff(attempts)
+    # 0.02, 0.04, then 0.08 at most, instead of a busy loop
+    assert 4 <= len(attempts) <= 6
+    assert gaps[0] >= 0.02 and gaps[1] >= 0.04
+    assert np.all(gaps >= 0.02) and gaps.max() < 0.1
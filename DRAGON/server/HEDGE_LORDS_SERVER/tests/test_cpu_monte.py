@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.common.math.cpu_monte import log_return_params, simulate
+
+
+@pytest.fixture
+def prices() -> pd.Series:
+    rng = np.random.default_rng(0)
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, 500))))
+
+
+def test_full_paths_match_step_by_step_recurrence(prices):
+    candles, iterations = 40, 25
+    drift, stdev = log_return_params(prices)
+
+    shocks = np.random.default_rng(1).laplace(size=(candles - 1, iterations))
+    expected = np.empty((candles, iterations))
+    expected[0] = prices.iloc[-1]
+    for t in range(1, candles):
+        expected[t] = expected[t - 1] * np.exp(drift + stdev * shocks[t - 1])
+
+    paths = simulate(prices, candles, iterations, rng=np.random.default_rng(1))
+
+    np.testing.assert_allclose(paths, expected, rtol=1e-10)
+
+
+def test_full_paths_are_chunked_over_iterations(prices):
+    paths = simulate(prices, 30, 100, max_block_elements=29 * 7)
+
+    assert paths.shape == (30, 100)
+    assert np.all(paths[0] == prices.iloc[-1])
+    assert np.all(np.isfinite(paths))
+
+
+def test_terminal_mode_matches_full_paths_distribution(prices):
+    candles, iterations = 30, 40000
+
+    rng = np.random.default_rng(2)
+    full_final = simulate(prices, candles, iterations, rng=rng)[-1]
+    terminal = simulate(prices, candles, iterations, mode="terminal", rng=rng)
+
+    assert terminal.shape == (iterations,)
+    quantiles = [0.05, 0.25, 0.5, 0.75, 0.95]
+    np.testing.assert_allclose(
+        np.quantile(terminal, quantiles), np.quantile(full_final, quantiles), rtol=5e-3
+    )
+    assert terminal.std() == pytest.approx(full_final.std(), rel=0.03)
+
+
+def test_single_candle_returns_last_price(prices):
+    assert np.all(simulate(prices, 1, 10) == prices.iloc[-1])
+    assert np.all(simulate(prices, 1, 10, mode="terminal") == prices.iloc[-1])
+
+
+def test_unknown_mode_raises(prices):
+    with pytest.raises(ValueError):
+        simulate(prices, 10, 10, mode="weekly")
+
+
+def test_same_generator_seed_reproduces_paths(prices):
+    first = simulate(prices, 20, 10, rng=np.random.default_rng(7))
+    second = simulate(prices, 20, 10, rng=np.random.default_rng(7))
+    other = simulate(prices, 20, 10, rng=np.random.default_rng(8))
+
+    np.testing.assert_array_equal(first, second)
+    assert not np.array_equal(first, other)
@@ -0,0 +1,83 @@
+import json
+from decimal import Decimal
+
+from services.producer.decoder import COLUMN_INDEX, OPTIONS_COLUMNS, TickDecoder
+from services.producer.ingestion import ticker_to_row
+from services.producer.service import OptionsProducer
+
+
+def make_message(**overrides) -> dict:
+    message = {
+        "type": "v2/ticker",
+        "symbol": "C-BTC-90000-310525",
+        "timestamp": 1748000000000000,
+        "contract_type": "call_options",
+        "underlying_asset_symbol": "BTC",
+        "product_id": 12345,
+        "mark_price": "1500.5",
+        "spot_price": "89000.12",
+        "strike_price": "90000",
+        "oi_contracts": "42",
+        "turnover_usd": 1234.5,
+        "quotes": {"best_bid": "1490", "best_ask": "1510", "mark_iv": "0.52"},
+        "greeks": {"delta": "0.45", "gamma": "0.00002"},
+        "price_band": {"lower_limit": "1.5", "upper_limit": "3000"},
+    }
+    message.update(overrides)
+    return message
+
+
+def decode(**overrides):
+    return TickDecoder().decode(json.dumps(make_message(**overrides)))
+
+
+def test_decode_returns_row_in_column_order():
+    row = dict(zip(OPTIONS_COLUMNS, decode()))
+
+    assert row["symbol"] == "C-BTC-90000-310525"
+    assert row["mark_price"] == Decimal("1500.5")
+    assert row["turnover_usd"] == Decimal("1234.5")
+    assert row["oi_contracts"] == 42
+    assert row["best_ask"] == Decimal("1510")
+    assert row["upper_limit"] == Decimal("3000")
+    assert row["vega"] is None
+
+
+def test_decode_matches_validated_path():
+    producer = OptionsProducer("key", "secret", "ws://localhost", "http://localhost")
+    for message in (
+        make_message(),
+        make_message(quotes=None, greeks=None),
+        make_message(
+            symbol="BTCUSD",
+            contract_type="perpetual_futures",
+            mark_basis="0.1",
+            funding_rate="0.0001",
+            strike_price=None,
+            greeks=None,
+        ),
+    ):
+        expected = ticker_to_row(producer.parse_ticker(json.loads(json.dumps(message))))
+
+        assert TickDecoder().decode(json.dumps(message)) == expected
+
+
+def test_decode_skips_invalid_messages():
+    assert TickDecoder().decode(b"not json") is None
+    assert decode(type="subscriptions") is None
+    assert decode(contract_type="spot") is None
+    assert decode(mark_price=None) is None
+    assert decode(strike_price="not a number") is None
+
+
+def test_decode_nulls_columns_of_other_contract_type():
+    row = decode(
+        symbol="BTCUSD",
+        contract_type="perpetual_futures",
+        mark_basis="0.1",
+        funding_rate="0.0001",
+    )
+
+    assert row[COLUMN_INDEX["funding_rate"]] == Decimal("0.0001")
+    assert row[COLUMN_INDEX["strike_price"]] is None
+    assert row[COLUMN_INDEX["delta"]] is None
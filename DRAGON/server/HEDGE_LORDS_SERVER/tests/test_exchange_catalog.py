@@ -0,0 +1,122 @@
+import asyncio
+from datetime import date
+
+from services.common.exchanges.catalog import ContractCatalog, parse_option_symbol
+from services.common.exchanges.delta import DeltaExchange
+from services.common.types.enums import Resolution
+from tests.stub_exchange import StubExchangeServer
+
+PRODUCTS = [
+    "C-BTC-90000-310525",
+    "P-BTC-85000-310525",
+    "C-BTC-95000-070625",
+    "C-ETH-2500-310525",
+    "BTCUSD",
+]
+
+
+async def noop(message: str) -> None:
+    pass
+
+
+def make_exchange(server: StubExchangeServer, ttl: float = 60) -> DeltaExchange:
+    exchange = DeltaExchange(noop, catalog_ttl=ttl)
+    exchange.base_url = server.url
+    return exchange
+
+
+def test_parse_option_symbol():
+    option = parse_option_symbol("P-BTC-85000-310525")
+
+    assert option.contract_type == "put"
+    assert option.underlying == "BTC"
+    assert option.strike == 85000.0
+    assert option.expiry == date(2025, 5, 31)
+    assert parse_option_symbol("BTCUSD") is None
+    assert parse_option_symbol("C-BTC-90000-310225") is None
+
+
+def test_catalog_indexes_by_underlying_and_expiry():
+    catalog = ContractCatalog.from_symbols(PRODUCTS, loaded_at=0.0)
+
+    assert catalog.contracts("BTC", date(2025, 5, 31)) == (
+        "C-BTC-90000-310525",
+        "P-BTC-85000-310525",
+    )
+    assert catalog.contracts("BTC", date(2025, 6, 1)) == ()
+    assert catalog.expiry("C-BTC-95000-070625") == date(2025, 6, 7)
+    assert catalog.expiries("BTC") == [date(2025, 5, 31), date(2025, 6, 7)]
+    assert "BTCUSD" not in catalog.symbols
+    assert catalog.is_fresh(59.0, 60) and not catalog.is_fresh(60.0, 60)
+
+
+def test_catalog_is_fetched_once_per_ttl_over_one_connection():
+    async def scenario():
+        async with StubExchangeServer(PRODUCTS) as server:
+            async with make_exchange(server) as exchange:
+                # Concurrent callers share the one fetch in flight
+                results = await asyncio.gather(
+                    *(
+                        exchange.filtered_contracts("BTCUSD", date(2025, 5, 31))
+                        for _ in range(10)
+                    )
+                )
+                results[0].append("BTCUSD")
+                again = await exchange.filtered_contracts("BTCUSD", date(2025, 5, 31))
+
+                await exchange.fetch_candles("BTCUSD", Resolution.HOUR_1, 0, 3600)
+                await exchange.fetch_candles("BTCUSD", Resolution.HOUR_1, 0, 3600)
+            return server, again
+
+    server, again = asyncio.run(scenario())
+
+    # Callers get copies, the cached catalog is never mutated
+    assert again == ["C-BTC-90000-310525", "P-BTC-85000-310525"]
+    assert server.requests_to("/v2/products") == 1
+    assert server.requests_to("/v2/history/candles") == 2
+    assert server.connections == 1
+
+
+def test_catalog_refreshes_after_ttl_and_survives_failures():
+    async def scenario():
+        async with StubExchangeServer(PRODUCTS[:1]) as server:
+            async with make_exchange(server, ttl=0) as exchange:
+                first = await exchange.all_options_contracts
+                server.products = PRODUCTS
+                second = await exchange.all_options_contracts
+                server.status = 503
+                stale = await exchange.all_options_contracts
+            return server, first, second, stale
+
+    server, first, second, stale = asyncio.run(scenario())
+
+    assert first == ["C-BTC-90000-310525"]
+    assert len(second) == 4
+    assert stale == second
+    assert server.requests_to("/v2/products") == 3
+
+
+def test_unreachable_exchange_gives_an_empty_catalog():
+    async def scenario():
+        async with StubExchangeServer(PRODUCTS) as server:
+            server.status = 500
+            async with make_exchange(server) as exchange:
+                return await exchange.filtered_contracts("BTCUSD", date(2025, 5, 31))
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_close_releases_the_pool():
+    async def scenario():
+        async with StubExchangeServer(PRODUCTS) as server:
+            exchange = make_exchange(server)
+            await exchange.contract_catalog()
+            client = exchange.http
+            await exchange.close()
+            return client, exchange
+
+    client, exchange = asyncio.run(scenario())
+
+    assert client.is_closed and exchange.http is None
+    # The catalog outlives the connections, a new client is made on demand
+    assert exchange.catalog is not None
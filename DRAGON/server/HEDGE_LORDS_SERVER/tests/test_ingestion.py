@@ -0,0 +1,105 @@
+import asyncio
+from decimal import Decimal
+
+from sqlalchemy.dialects import postgresql
+
+from services.common.types.models import OptionsTicker
+from services.producer.ingestion import (
+    OPTIONS_COLUMNS,
+    TickerIngestor,
+    build_upsert,
+    chain_row,
+    ticker_to_row,
+)
+from services.common.db.chain_state import CHAIN_COLUMNS
+
+
+def make_ticker(symbol: str = "C-BTC-90000-310525", **overrides) -> OptionsTicker:
+    message = {
+        "symbol": symbol,
+        "timestamp": 1748000000000000,
+        "type": "v2/ticker",
+        "contract_type": "call_options",
+        "underlying_asset_symbol": "BTC",
+        "mark_price": Decimal("1500.5"),
+        "strike_price": Decimal("90000"),
+        "quotes": {"best_bid": Decimal("1490"), "best_ask": Decimal("1510")},
+        "greeks": {"delta": Decimal("0.45")},
+    }
+    message.update(overrides)
+    return OptionsTicker(**message)
+
+
+def test_ticker_to_row_flattens_nested_fields():
+    row = dict(zip(OPTIONS_COLUMNS, ticker_to_row(make_ticker())))
+
+    assert len(row) == len(OPTIONS_COLUMNS)
+    assert row["contract_type"] == "call_options"
+    assert row["best_ask"] == Decimal("1510")
+    assert row["delta"] == Decimal("0.45")
+    assert row["gamma"] is None
+    assert row["mark_basis"] is None
+
+
+def test_chain_row_picks_the_chain_state_columns():
+    row = dict(zip(CHAIN_COLUMNS, chain_row(ticker_to_row(make_ticker()))))
+
+    assert row["symbol"] == "C-BTC-90000-310525"
+    assert row["contract_type"] == "call_options"
+    assert row["timestamp"] == 1748000000000000
+    assert row["best_bid"] == Decimal("1490")
+    assert row["delta"] == Decimal("0.45")
+    assert row["spot_price"] is None
+
+
+def test_upsert_keeps_stored_quotes_when_tick_has_none():
+    sql = str(
+        build_upsert([ticker_to_row(make_ticker())]).compile(
+            dialect=postgresql.dialect()
+        )
+    )
+
+    assert "ON CONFLICT (symbol) DO UPDATE" in sql
+    assert "best_bid = coalesce(excluded.best_bid, market_data.options.best_bid)" in sql
+    assert "mark_price = excluded.mark_price" in sql
+
+
+def test_coalesce_is_latest_wins_per_symbol():
+    ingestor = TickerIngestor()
+    ingestor.coalesce(ticker_to_row(make_ticker(mark_price=Decimal("1"))))
+    ingestor.coalesce(
+        ticker_to_row(make_ticker(mark_price=Decimal("2"), quotes=None, greeks=None))
+    )
+    ingestor.coalesce(ticker_to_row(make_ticker("P-BTC-90000-310525")))
+
+    assert len(ingestor.pending) == 2
+    row = dict(zip(OPTIONS_COLUMNS, ingestor.pending["C-BTC-90000-310525"]))
+    assert row["mark_price"] == Decimal("2")
+    assert row["best_ask"] == Decimal("1510")
+    assert ingestor.metrics.messages_coalesced == 1
+
+
+def test_run_flushes_one_batch_per_window():
+    batches = []
+
+    class RecordingIngestor(TickerIngestor):
+        async def flush(self):
+            if self.pending:
+                batches.append(sorted(self.pending))
+                self.pending = {}
+
+    async def scenario():
+        ingestor = RecordingIngestor(flush_interval=0.05)
+        ingestor.start()
+        for _ in range(3):
+            for symbol in ("C-BTC-1-310525", "P-BTC-1-310525"):
+                ingestor.submit(ticker_to_row(make_ticker(symbol)))
+        await asyncio.sleep(0.2)
+        await ingestor.stop()
+        return ingestor
+
+    ingestor = asyncio.run(scenario())
+
+    assert batches == [["C-BTC-1-310525", "P-BTC-1-310525"]]
+    assert ingestor.metrics.messages_received == 6
+    assert ingestor.metrics.snapshot()["offered_load_per_second"] > 0
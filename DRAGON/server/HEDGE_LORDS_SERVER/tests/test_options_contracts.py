@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from services.common.math.options_contracts import (
+    call_payoff,
+    leg_payoffs,
+    piecewise_payoff,
+    portfolio_payoff,
+    put_payoff,
+)
+
+
+@pytest.fixture
+def legs():
+    rng = np.random.default_rng(0)
+    count = 20
+    return (
+        rng.uniform(80000, 100000, count),
+        rng.uniform(10, 500, count),
+        rng.choice([1, -1], count),
+        rng.random(count) < 0.5,
+    )
+
+
+@pytest.fixture
+def prices() -> np.ndarray:
+    return np.random.default_rng(1).uniform(70000, 110000, 10_000)
+
+
+def loop_payoff(prices, strikes, premiums, directions, is_call, lot_size):
+    total = np.zeros_like(prices)
+    for strike, premium, direction, call in zip(strikes, premiums, directions, is_call):
+        payoff = call_payoff if call else put_payoff
+        total += payoff(prices, strike, premium, direction, lot_size)
+    return total
+
+
+def test_portfolio_payoff_matches_per_leg_loop(legs, prices):
+    expected = loop_payoff(prices, *legs, 0.1)
+
+    np.testing.assert_allclose(portfolio_payoff(prices, *legs, 0.1), expected)
+    np.testing.assert_allclose(
+        portfolio_payoff(prices, *legs, 0.1, max_block_elements=1000), expected
+    )
+
+
+def test_float32_mode(legs, prices):
+    payoff = portfolio_payoff(prices, *legs, 0.1, dtype=np.float32)
+
+    assert payoff.dtype == np.float32
+    expected = loop_payoff(prices, *legs, 0.1)
+    np.testing.assert_allclose(payoff, expected, atol=1e-5 * np.abs(expected).max())
+
+
+def test_leg_payoffs_rows_are_single_leg_payoffs(legs, prices):
+    strikes, premiums, directions, is_call = legs
+    matrix = leg_payoffs(prices, *legs, lot_sizes=2.0)
+
+    assert matrix.shape == (len(strikes), len(prices))
+    np.testing.assert_allclose(
+        matrix[0],
+        (call_payoff if is_call[0] else put_payoff)(
+            prices, strikes[0], premiums[0], directions[0], 2.0
+        ),
+    )
+
+
+def test_portfolio_payoff_without_legs(prices):
+    assert not portfolio_payoff(prices, [], [], [], []).any()
+
+
+def test_piecewise_payoff_is_exact(legs, prices):
+    payoff = piecewise_payoff(*legs, lot_sizes=0.5)
+
+    np.testing.assert_allclose(
+        payoff(prices), portfolio_payoff(prices, *legs, lot_sizes=0.5), atol=1e-6
+    )
+    assert payoff.kinks.size == 20
+
+
+def test_piecewise_payoff_of_a_long_straddle():
+    # Strike 100, premiums 6 and 4: breakevens 90 and 110, unbounded profit
+    payoff = piecewise_payoff([100, 100], [6, 4], [1, 1], [True, False])
+
+    np.testing.assert_allclose(payoff.breakevens(), [90, 110])
+    assert (payoff.left_slope, payoff.right_slope) == (-1.0, 1.0)
+    assert payoff.max_profit() is None
+    assert payoff.max_loss() == -10.0
+
+
+def test_piecewise_payoff_of_an_iron_condor():
+    # Short 95/105 strangle, long 90/110 wings, 3 net credit
+    payoff = piecewise_payoff(
+        [90, 95, 105, 110],
+        [1, 2.5, 2.5, 1],
+        [1, -1, -1, 1],
+        [False, False, True, True],
+    )
+
+    np.testing.assert_allclose(payoff.breakevens(), [92, 108])
+    assert payoff.max_profit() == pytest.approx(3.0)
+    assert payoff.max_loss() == pytest.approx(-2.0)
+    x, y = payoff.points(80, 120)
+    np.testing.assert_allclose(x, [80, 90, 95, 105, 110, 120])
+    np.testing.assert_allclose(y, [-2, -2, 3, 3, -2, -2])
+
+
+def test_piecewise_payoff_bounds_start_at_price_zero():
+    # A short put loses at most its strike less the premium
+    payoff = piecewise_payoff([100], [5], [-1], [False], lot_sizes=2)
+
+    assert payoff.max_loss() == pytest.approx(-190.0)
+    assert payoff.max_profit() == pytest.approx(10.0)
+    np.testing.assert_allclose(payoff.breakevens(), [95])
+    # A flat payoff at zero breaks even everywhere, reported at its vertices
+    flat = piecewise_payoff([100, 100], [0, 0], [1, -1], [True, True])
+    np.testing.assert_allclose(flat.breakevens(), [0, 100])
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import struct
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from services.common.math.options_contracts import call_payoff, put_payoff
+from services.common.types.models import SelectedTicker
+from services.consumer.payoff_service import PayoffDiagramConsumer
+from services.consumer.portfolio import Portfolio
+
+NOW = datetime(2025, 5, 21, 12, 0, tzinfo=timezone.utc)
+
+
+def make_ticker(
+    symbol: str, best_ask: float = 100.0, mark_iv: float = 0.5
+) -> SelectedTicker:
+    contract_type, _, strike, _ = symbol.split("-")
+    return SelectedTicker(
+        symbol=symbol,
+        contract_type="call" if contract_type == "C" else "put",
+        strike_price=float(strike),
+        best_bid=best_ask - 10,
+        best_ask=best_ask,
+        spot_price=90000.0,
+        expiry_date="2025-05-31",
+        position="buy",
+        mark_iv=mark_iv,
+    )
+
+
+def full_payoff(portfolio: Portfolio, tickers: list[SelectedTicker]) -> np.ndarray:
+    """Payoff recomputed from scratch for every leg"""
+    strikes = [t.strike_price for t in tickers]
+    pct = portfolio.price_range_percentage
+    x = np.linspace(min(strikes) * (1 - pct), max(strikes) * (1 + pct), 500)
+    y = np.zeros_like(x)
+    for t in tickers:
+        payoff = call_payoff if t.contract_type == "call" else put_payoff
+        sign = -1 if portfolio.selected_contracts[t.symbol] == "sell" else 1
+        y += payoff(x, t.strike_price, t.best_ask, sign, portfolio.lot_size)
+    return y
+
+
+def test_incremental_payoff_matches_full_recomputation():
+    portfolio = Portfolio("test")
+    tickers = {
+        symbol: make_ticker(symbol)
+        for symbol in ("C-BTC-90000-310525", "P-BTC-88000-310525", "C-BTC-89000-310525")
+    }
+
+    for symbol in tickers:
+        portfolio.select(symbol, "buy")
+    portfolio.update_legs(list(tickers.values()))
+    portfolio.select("C-BTC-89000-310525", "sell")
+    tickers["P-BTC-88000-310525"] = make_ticker("P-BTC-88000-310525", 150.0)
+    portfolio.update_legs(list(tickers.values()))
+    portfolio.lot_size = 0.5
+
+    np.testing.assert_allclose(
+        portfolio.payoff_points().y, full_payoff(portfolio, list(tickers.values()))
+    )
+
+    portfolio.deselect("C-BTC-89000-310525")
+    del tickers["C-BTC-89000-310525"]
+    np.testing.assert_allclose(
+        portfolio.payoff_points().y, full_payoff(portfolio, list(tickers.values()))
+    )
+
+
+def test_payoff_kinks_draw_the_sampled_diagram():
+    portfolio = make_portfolio()
+    portfolio.select("C-BTC-92000-310525", "sell")
+    portfolio.update_legs(
+        [
+            make_ticker("C-BTC-90000-310525"),
+            make_ticker("P-BTC-88000-310525"),
+            make_ticker("C-BTC-92000-310525", 40.0),
+        ]
+    )
+
+    kinks = portfolio.payoff_kinks()
+    sampled = portfolio.payoff_points()
+
+    assert kinks.x == [88000 * 0.9, 88000, 90000, 92000, 92000 * 1.1]
+    np.testing.assert_allclose(np.interp(sampled.x, kinks.x, kinks.y), sampled.y)
+    # Long call and short put below 92000, capped by the short call above
+    assert kinks.right_slope == 0.0 and kinks.left_slope == 1.0
+    assert kinks.max_profit == pytest.approx(max(sampled.y))
+    # The short put's loss is bounded by a price of 0
+    assert kinks.max_loss == pytest.approx(kinks.y[1] - 88000)
+    assert len(kinks.breakevens) == 1
+    assert Portfolio("empty").payoff_kinks().x == []
+
+
+def test_only_changed_legs_are_recomputed():
+    portfolio = Portfolio("test")
+    tickers = [make_ticker("C-BTC-90000-310525"), make_ticker("P-BTC-88000-310525")]
+    for ticker in tickers:
+        portfolio.select(ticker.symbol, "buy")
+    portfolio.update_legs(tickers)
+    computed = portfolio.vectors_computed
+
+    # Premium ticks and flipping a leg reuse the cached vectors
+    portfolio.update_legs([make_ticker(t.symbol, 120.0) for t in tickers])
+    portfolio.select("C-BTC-90000-310525", "sell")
+    assert portfolio.vectors_computed == computed
+
+    # A leg inside the strike range costs one vector
+    portfolio.select("C-BTC-89000-310525", "buy")
+    portfolio.update_legs(tickers + [make_ticker("C-BTC-89000-310525")])
+    assert portfolio.vectors_computed == computed + 1
+
+
+def test_sessions_have_separate_portfolios():
+    consumer = PayoffDiagramConsumer()
+
+    async def select(session_id: str, symbol: str):
+        message = json.dumps({"type": "select_contract", "symbol": symbol})
+        return await consumer.process_message(message, session_id)
+
+    first = asyncio.run(select("a", "C-BTC-90000-310525"))
+    second = asyncio.run(select("b", "P-BTC-88000-310525"))
+
+    assert first["selected_contracts"] == {"C-BTC-90000-310525": "buy"}
+    assert second["selected_contracts"] == {"P-BTC-88000-310525": "buy"}
+    assert consumer.changed_sessions({"session:a"}) == []
+    consumer.session_subscribers["a"] = set()
+    assert consumer.changed_sessions({"C-BTC-90000-310525"}) == ["a"]
+    assert consumer.changed_sessions({"P-BTC-88000-310525"}) == []
+
+
+def make_portfolio() -> Portfolio:
+    portfolio = Portfolio("test")
+    tickers = [make_ticker("C-BTC-90000-310525"), make_ticker("P-BTC-88000-310525")]
+    portfolio.select(tickers[0].symbol, "buy")
+    portfolio.select(tickers[1].symbol, "sell")
+    portfolio.update_legs(tickers)
+    return portfolio
+
+
+def test_payoff_surface_ends_with_the_expiry_payoff():
+    portfolio = make_portfolio()
+
+    surface = portfolio.payoff_surface(steps=5, now=NOW)
+
+    assert surface.values.shape == (5, portfolio.num_price_points)
+    assert surface.values.dtype == np.float32
+    np.testing.assert_allclose(surface.days, [0, 2.5, 5, 7.5, 10])
+    np.testing.assert_allclose(
+        surface.values[-1], portfolio.payoff_points().y, rtol=1e-6, atol=1e-2
+    )
+    # Before expiry the long call and short put still carry time value
+    assert not np.allclose(surface.values[0], surface.values[-1])
+
+
+def test_payoff_surface_is_cached_per_version():
+    portfolio = make_portfolio()
+    surface = portfolio.payoff_surface(steps=5, now=NOW)
+
+    # Unchanged market data keeps the version
+    portfolio.update_legs(
+        [make_ticker("C-BTC-90000-310525"), make_ticker("P-BTC-88000-310525")]
+    )
+    assert portfolio.payoff_surface(steps=5, now=NOW) is surface
+
+    portfolio.lot_size = 2.0
+    assert portfolio.payoff_surface(steps=5, now=NOW) is not surface
+
+
+def test_payoff_surface_frame_layout():
+    portfolio = make_portfolio()
+    surface = portfolio.payoff_surface(steps=3, now=NOW)
+
+    frame = surface.frame()
+    (header_length,) = struct.unpack_from("<I", frame)
+    header = json.loads(frame[4 : 4 + header_length])
+    arrays = np.frombuffer(frame, "<f4", offset=4 + header_length)
+
+    assert (4 + header_length) % 4 == 0
+    assert header["type"] == "payoff_surface"
+    assert header["version"] == portfolio.version
+    prices, days = header["prices"], header["days"]
+    np.testing.assert_array_equal(arrays[:prices], surface.prices)
+    np.testing.assert_array_equal(arrays[prices : prices + days], surface.days)
+    np.testing.assert_array_equal(
+        arrays[prices + days :].reshape(days, prices), surface.values
+    )
@@ -0,0 +1,174 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+from services.common.db.candles import encode_candle_change
+from services.common.db.changes import RESYNC, ChangeBus
+from services.common.exchanges.catalog import ContractCatalog
+from services.common.types.enums import Resolution
+from services.consumer.prewarm import PrewarmJob, SimulationPrewarmer
+
+NOW = datetime(2025, 5, 30, 13, tzinfo=timezone.utc)
+
+
+class FakeHistory:
+    def __init__(self) -> None:
+        self.invalidated: list[set[str]] = []
+
+    def invalidate(self, changes) -> None:
+        self.invalidated.append(set(changes))
+
+
+class FakeConsumer:
+    def __init__(self) -> None:
+        self.history = FakeHistory()
+        self.calls: list[tuple] = []
+
+    async def get_monte_carlo(self, symbol, expiry_date, resolution, iterations):
+        self.calls.append((symbol, expiry_date, resolution, iterations))
+        return None if expiry_date == date(2025, 6, 27) else object()
+
+
+class FakeExchange:
+    def __init__(self, symbols) -> None:
+        self.catalog = ContractCatalog.from_symbols(symbols, loaded_at=0)
+        self.closed = False
+
+    async def contract_catalog(self, refresh: bool = False) -> ContractCatalog:
+        return self.catalog
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def contracts(expiries) -> list[str]:
+    return [
+        f"{side}-{underlying}-{strike}-{expiry:%d%m%y}"
+        for side in ("C", "P")
+        for underlying, strike in (("BTC", 90000), ("ETH", 2500))
+        for expiry in expiries
+    ]
+
+
+CATALOG = contracts(
+    [
+        date(2025, 5, 30),
+        date(2025, 5, 31),
+        date(2025, 6, 1),
+        date(2025, 6, 6),
+        date(2025, 6, 27),
+    ]
+)
+
+
+def make_prewarmer(catalog=CATALOG, **kwargs) -> SimulationPrewarmer:
+    options = dict(
+        symbols=["BTCUSD", "ETHUSD"],
+        resolutions=["1h", "4h"],
+        max_expiries=3,
+        iterations=5000,
+        bus=ChangeBus(),
+    )
+    options.update(kwargs)
+    return SimulationPrewarmer(FakeConsumer(), FakeExchange(catalog), **options)
+
+
+def test_scan_queues_the_nearest_live_expiries():
+    prewarmer = make_prewarmer()
+
+    added = asyncio.run(prewarmer.scan(NOW))
+
+    # The expiry of the 30th passed at noon
+    assert prewarmer.expiries["BTCUSD"] == [
+        date(2025, 5, 31),
+        date(2025, 6, 1),
+        date(2025, 6, 6),
+    ]
+    assert added == 2 * 3 * 2
+    assert asyncio.run(prewarmer.scan(NOW)) == 0
+    assert prewarmer.queue.get_nowait() == PrewarmJob(
+        date(2025, 5, 31), 0, "BTCUSD", Resolution.HOUR_1
+    )
+
+
+def test_workers_warm_nearest_expiries_first():
+    prewarmer = make_prewarmer(symbols=["BTCUSD"], max_expiries=5)
+
+    async def scenario():
+        await prewarmer.scan(NOW)
+        worker = asyncio.create_task(prewarmer.work())
+        while prewarmer.queued:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        worker.cancel()
+
+    asyncio.run(scenario())
+    calls = prewarmer.consumer.calls
+
+    assert [call[1] for call in calls] == sorted(call[1] for call in calls)
+    assert calls[0] == ("BTCUSD", date(2025, 5, 31), Resolution.HOUR_1, 5000)
+    assert calls[1][2] == Resolution.HOUR_4
+    assert len(calls) == 4 * 2
+    # The 27 June runs found no simulation
+    assert prewarmer.status()["runs"] == 8
+    assert prewarmer.status()["failures"] == 2
+
+
+def test_new_candles_requeue_their_series():
+    prewarmer = make_prewarmer()
+    asyncio.run(prewarmer.scan(NOW))
+    while not prewarmer.queue.empty():
+        prewarmer.queued.discard(prewarmer.queue.get_nowait())
+
+    changes = {
+        encode_candle_change("ETHUSD", Resolution.HOUR_4, NOW),
+        encode_candle_change("SOLUSD", Resolution.HOUR_1, NOW),
+    }
+    added = prewarmer.on_candle_changes(changes)
+
+    assert added == 3
+    assert {(job.symbol, job.resolution) for job in prewarmer.queued} == {
+        ("ETHUSD", Resolution.HOUR_4)
+    }
+    assert prewarmer.consumer.history.invalidated == [changes]
+    assert prewarmer.on_candle_changes({RESYNC}) == 2 * 3 * 2 - 3
+
+
+def test_candle_changes_reach_the_prewarmer_through_the_bus():
+    # Scanned against the clock, so the expiries are the next days
+    today = datetime.now(timezone.utc).date()
+    prewarmer = make_prewarmer(
+        contracts([today + timedelta(days=days) for days in range(1, 4)]),
+        interval=3600,
+    )
+
+    async def scenario():
+        prewarmer.start()
+        while prewarmer.last_scan is None:
+            await asyncio.sleep(0)
+        while prewarmer.queued:
+            await asyncio.sleep(0)
+        runs = len(prewarmer.consumer.calls)
+        prewarmer.bus.publish([encode_candle_change("BTCUSD", Resolution.HOUR_1, NOW)])
+        while len(prewarmer.consumer.calls) < runs + 3:
+            await asyncio.sleep(0)
+        await prewarmer.stop()
+        return runs
+
+    runs = asyncio.run(scenario())
+
+    assert prewarmer.exchange.closed and not prewarmer.tasks
+    assert [call[2] for call in prewarmer.consumer.calls[runs:]] == [
+        Resolution.HOUR_1
+    ] * 3
+
+
+def test_prewarming_is_off_without_symbols():
+    prewarmer = make_prewarmer(symbols=[])
+
+    async def scenario():
+        prewarmer.start()
+        await prewarmer.stop()
+
+    asyncio.run(scenario())
+
+    assert prewarmer.consumer.calls == []
@@ -0,0 +1,159 @@
+import math
+
+import numpy as np
+import pytest
+
+from services.common.math.pricing import (
+    black76,
+    black_scholes,
+    black_scholes_price,
+    implied_volatility,
+    norm_cdf,
+    reprice_chain,
+    years_to_expiry,
+)
+
+SPOT, STRIKE, T, VOL, RATE, YIELD = 90000.0, 95000.0, 0.1, 0.6, 0.03, 0.01
+
+
+@pytest.fixture
+def chain():
+    rng = np.random.default_rng(0)
+    count = 2000
+    return (
+        rng.uniform(70000, 115000, count),
+        rng.uniform(2 / 365, 0.5, count),
+        rng.uniform(0.3, 1.2, count),
+        rng.random(count) < 0.5,
+    )
+
+
+def central_difference(price, h):
+    return (price(h) - price(-h)) / (2 * h)
+
+
+def test_norm_cdf_matches_erfc():
+    x = np.linspace(-30, 30, 10_001)
+    expected = [0.5 * math.erfc(-value / math.sqrt(2)) for value in x]
+
+    np.testing.assert_allclose(norm_cdf(x), expected, rtol=1e-12, atol=1e-16)
+
+
+def test_black_scholes_reference_value():
+    # Hull's textbook example: S=K=100, T=1, r=5%, sigma=20%
+    assert black_scholes(100, 100, 1, 0.2, True, 0.05).price == pytest.approx(
+        10.450584, abs=1e-6
+    )
+
+
+def test_put_call_parity(chain):
+    strikes, times, vols, _ = chain
+    call = black_scholes(SPOT, strikes, times, vols, True, RATE, YIELD)
+    put = black_scholes(SPOT, strikes, times, vols, False, RATE, YIELD)
+
+    forward = SPOT * np.exp(-YIELD * times) - strikes * np.exp(-RATE * times)
+    np.testing.assert_allclose(call.price - put.price, forward, atol=1e-6)
+    np.testing.assert_allclose(call.delta - put.delta, np.exp(-YIELD * times))
+
+
+def test_price_only_path_matches_black_scholes(chain):
+    strikes, times, vols, is_call = chain
+    times = np.where(np.arange(len(times)) % 10, times, 0.0)
+
+    np.testing.assert_allclose(
+        black_scholes_price(SPOT, strikes, times, vols, is_call, RATE),
+        black_scholes(SPOT, strikes, times, vols, is_call, RATE).price,
+        rtol=1e-10,
+        atol=1e-8,
+    )
+
+
+@pytest.mark.parametrize("is_call", [True, False])
+def test_black_scholes_greeks_match_finite_differences(is_call):
+    def price(spot=SPOT, time=T, vol=VOL, rate=RATE):
+        return black_scholes(spot, STRIKE, time, vol, is_call, rate, YIELD).price
+
+    greeks = black_scholes(SPOT, STRIKE, T, VOL, is_call, RATE, YIELD)
+
+    assert greeks.delta == pytest.approx(
+        central_difference(lambda h: price(spot=SPOT + h), 1.0), rel=1e-6
+    )
+    assert greeks.gamma == pytest.approx(
+        price(spot=SPOT + 1) - 2 * price() + price(spot=SPOT - 1), rel=1e-4
+    )
+    assert greeks.vega == pytest.approx(
+        central_difference(lambda h: price(vol=VOL + h), 1e-4) / 100, rel=1e-6
+    )
+    assert greeks.theta == pytest.approx(
+        -central_difference(lambda h: price(time=T + h), 1e-5) / 365, rel=1e-6
+    )
+    assert greeks.rho == pytest.approx(
+        central_difference(lambda h: price(rate=RATE + h), 1e-5) / 100, rel=1e-6
+    )
+
+
+@pytest.mark.parametrize("is_call", [True, False])
+def test_black76_greeks_match_finite_differences(is_call):
+    def price(forward=SPOT, time=T, rate=RATE):
+        return black76(forward, STRIKE, time, VOL, is_call, rate).price
+
+    greeks = black76(SPOT, STRIKE, T, VOL, is_call, RATE)
+
+    assert greeks.delta == pytest.approx(
+        central_difference(lambda h: price(forward=SPOT + h), 1.0), rel=1e-6
+    )
+    assert greeks.theta == pytest.approx(
+        -central_difference(lambda h: price(time=T + h), 1e-5) / 365, rel=1e-6
+    )
+    assert greeks.rho == pytest.approx(
+        central_difference(lambda h: price(rate=RATE + h), 1e-5) / 100, rel=1e-6
+    )
+
+
+def test_expired_options_are_worth_intrinsic_value():
+    greeks = black_scholes(100, [90, 110, 90, 110], 0, 0.5, [True, True, False, False])
+
+    np.testing.assert_array_equal(greeks.price, [10, 0, 0, 10])
+    np.testing.assert_array_equal(greeks.delta, [1, 0, 0, -1])
+    np.testing.assert_array_equal(greeks.gamma, 0)
+
+
+@pytest.mark.parametrize("model", ["black_scholes", "black76"])
+def test_implied_volatility_round_trip(chain, model):
+    strikes, times, vols, is_call = chain
+    pricer = black76 if model == "black76" else black_scholes
+    greeks = pricer(SPOT, strikes, times, vols, is_call, RATE)
+    # Volatility is only identifiable where the price depends on it
+    identifiable = greeks.vega > 1e-3 * SPOT / 100
+
+    solved = implied_volatility(
+        greeks.price, SPOT, strikes, times, is_call, RATE, model=model
+    )
+
+    assert identifiable.mean() > 0.9
+    np.testing.assert_allclose(solved[identifiable], vols[identifiable], atol=1e-6)
+
+
+def test_implied_volatility_rejects_arbitrage_prices():
+    solved = implied_volatility([4.0, 150.0, 10.45], 100, 100, [1, 1, 0], True, 0.05)
+
+    assert np.isnan(solved).all()
+
+
+def test_reprice_chain_applies_shocks(chain):
+    strikes, times, vols, is_call = chain
+
+    shocked = reprice_chain(SPOT, strikes, times, vols, is_call, 0.1, 0.05)
+
+    expected = black_scholes(SPOT * 1.1, strikes, times, vols + 0.05, is_call)
+    np.testing.assert_array_equal(shocked.price, expected.price)
+
+
+def test_years_to_expiry():
+    now = np.datetime64("2025-05-01T12:00:00")
+    expiries = np.array(
+        ["2025-05-02T12:00:00", "2026-05-01T12:00:00", "2025-04-30T12:00:00"],
+        dtype="datetime64[s]",
+    )
+
+    np.testing.assert_allclose(years_to_expiry(expiries, now), [1 / 365, 1, 0])
@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.common.math.cpu_monte import simulate
+from services.common.math.return_models import (
+    RETURN_MODELS,
+    CalibrationCache,
+    GARCHModel,
+    GBMModel,
+    MertonModel,
+    log_returns,
+)
+from services.common.types.enums import Resolution, SimulationModel
+from services.common.types.models import SimulateRequest
+from services.simulator.store import SimulationStore
+
+
+def closes_from(returns: np.ndarray) -> np.ndarray:
+    return 100 * np.exp(np.concatenate([[0.0], np.cumsum(returns)]))
+
+
+@pytest.fixture
+def closes() -> np.ndarray:
+    return closes_from(np.random.default_rng(0).normal(0.0002, 0.01, 1000))
+
+
+@pytest.mark.parametrize("model", list(SimulationModel))
+def test_every_model_calibrates_and_simulates(closes, model):
+    paths = simulate(
+        pd.Series(closes), 30, 200, rng=np.random.default_rng(1), model=model
+    )
+    terminal = simulate(
+        pd.Series(closes),
+        30,
+        200,
+        mode="terminal",
+        rng=np.random.default_rng(1),
+        model=model.value,
+    )
+
+    assert paths.shape == (30, 200) and terminal.shape == (200,)
+    assert np.all(paths[0] == closes[-1])
+    assert np.all(np.isfinite(paths)) and np.all(np.isfinite(terminal))
+
+
+def test_gbm_recovers_drift_and_volatility(closes):
+    params = GBMModel().calibrate(closes)
+
+    assert params.drift == pytest.approx(0.0002, abs=1e-3)
+    assert params.volatility == pytest.approx(0.01, rel=0.05)
+
+
+def test_bootstrap_draws_historical_returns(closes):
+    model = RETURN_MODELS[SimulationModel.BOOTSTRAP]
+    params = model.calibrate(closes)
+
+    sample = model.sample(params, 50, 20, np.random.default_rng(2))
+
+    assert np.isin(sample, log_returns(closes)).all()
+
+
+def test_garch_recovers_volatility_clustering():
+    rng = np.random.default_rng(3)
+    omega, alpha, beta = 2e-6, 0.1, 0.85
+    variance = omega / (1 - alpha - beta)
+    returns = np.empty(4000)
+    for t in range(returns.size):
+        returns[t] = np.sqrt(variance) * rng.standard_normal()
+        variance = omega + alpha * returns[t] ** 2 + beta * variance
+
+    params = GARCHModel().calibrate(closes_from(returns))
+
+    assert params.alpha == pytest.approx(alpha, abs=0.04)
+    assert params.alpha + params.beta == pytest.approx(alpha + beta, abs=0.03)
+    assert params.variance > 0
+
+
+def test_merton_separates_jumps_from_diffusion():
+    rng = np.random.default_rng(4)
+    returns = rng.normal(0, 0.01, 5000)
+    jumps = rng.random(5000) < 0.02
+    returns[jumps] += rng.normal(-0.08, 0.02, jumps.sum())
+
+    params = MertonModel().calibrate(closes_from(returns))
+
+    assert params.jump_intensity == pytest.approx(0.02, abs=0.005)
+    assert params.jump_mean == pytest.approx(-0.08, abs=0.01)
+    assert params.volatility == pytest.approx(0.01, rel=0.05)
+
+
+def test_merton_terminal_matches_full_paths():
+    rng = np.random.default_rng(5)
+    returns = rng.normal(0, 0.01, 3000)
+    returns[rng.random(3000) < 0.03] -= 0.06
+    prices = pd.Series(closes_from(returns))
+
+    full = simulate(prices, 40, 40_000, rng=rng, model="merton")[-1]
+    terminal = simulate(prices, 40, 40_000, mode="terminal", rng=rng, model="merton")
+
+    quantiles = [0.05, 0.25, 0.5, 0.75, 0.95]
+    np.testing.assert_allclose(
+        np.quantile(terminal, quantiles), np.quantile(full, quantiles), rtol=5e-3
+    )
+
+
+def test_calibrations_are_cached_per_data_and_model(closes):
+    cache = CalibrationCache(max_entries=2)
+    key = ("BTCUSD", Resolution.HOUR_1, "hash")
+
+    first = cache.calibrate(key, SimulationModel.GARCH, closes)
+    assert cache.calibrate(key, "garch", closes) is first
+    cache.calibrate(key, SimulationModel.GBM, closes)
+    cache.calibrate(("BTCUSD", Resolution.HOUR_1, "other"), "gbm", closes)
+
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert (key, SimulationModel.GARCH) not in cache.entries
+
+
+def test_calibration_cache_is_shared_by_threads(closes):
+    cache = CalibrationCache(max_entries=4)
+    keys = [(("BTCUSD", Resolution.HOUR_1, str(i % 8)), "gbm") for i in range(400)]
+
+    # Prewarmer workers and requests hit, insert and evict at the same time
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        params = list(executor.map(lambda args: cache.calibrate(*args, closes), keys))
+
+    assert {value.volatility for value in params} == {params[0].volatility}
+    assert cache.hits + cache.misses == len(keys)
+    assert len(cache.entries) <= 4
+
+
+def test_model_is_part_of_the_request_and_the_key():
+    request = SimulateRequest(
+        symbol="BTCUSD",
+        expiry_date="2025-05-31",
+        resolution="1h",
+        iterations=100,
+        model="garch",
+    )
+    expiry = datetime(2025, 5, 31, 12)
+
+    assert request.model == SimulationModel.GARCH
+    assert SimulateRequest(**request.model_dump(exclude={"model"})).model == (
+        SimulationModel.LAPLACE
+    )
+    assert SimulationStore.make_key(
+        "BTCUSD", expiry, Resolution.HOUR_1, 100
+    ) == SimulationStore.make_key(
+        "BTCUSD", expiry, Resolution.HOUR_1, 100, model=SimulationModel.LAPLACE
+    )
+    assert SimulationStore.make_key(
+        "BTCUSD", expiry, Resolution.HOUR_1, 100, 7, SimulationModel.GARCH
+    ).endswith("_100_7_garch")
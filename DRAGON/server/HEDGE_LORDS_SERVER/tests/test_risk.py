@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.common.math.options_contracts import portfolio_payoff
+from services.common.math.risk import max_drawdowns, value_at_risk
+from services.consumer.portfolio import Leg, Portfolio
+from services.consumer.risk_service import RiskService, risk_report, sample_steps
+from services.simulator.store import StoredSimulation
+
+EXPIRY = datetime(2025, 5, 31, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def simulation() -> StoredSimulation:
+    steps, iterations = 240, 5000
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0, 0.004, (steps, iterations))
+    paths = 90000 * np.exp(np.cumsum(returns, axis=0))
+    timestamps = pd.date_range(end=EXPIRY, periods=steps, freq=pd.Timedelta(hours=1))
+    return StoredSimulation("sim", paths, timestamps, "hash", 1)
+
+
+def make_legs() -> list[Leg]:
+    return [
+        Leg("call", 90000.0, 1, 1500.0, 0.5, EXPIRY),
+        Leg("call", 95000.0, -1, 400.0, 0.5, EXPIRY),
+        Leg("put", 85000.0, 1, 300.0, 0.6, EXPIRY),
+    ]
+
+
+def make_portfolio() -> Portfolio:
+    portfolio = Portfolio("risk")
+    for number, leg in enumerate(make_legs()):
+        portfolio.legs[str(number)] = leg
+    portfolio.spot_price = 90000.0
+    return portfolio
+
+
+def test_value_at_risk_matches_sorted_tail():
+    pnl = np.random.default_rng(1).normal(0, 100, 10_000)
+
+    var, cvar = value_at_risk(pnl, (0.95, 0.99))
+
+    ordered = np.sort(pnl)
+    assert var[0] == -ordered[499]
+    assert cvar[1] == pytest.approx(-ordered[:100].mean())
+    assert np.all(cvar >= var)
+
+
+def test_max_drawdowns_measure_from_entry_and_peaks():
+    pnl = np.array([[10.0, -5.0], [4.0, -20.0], [12.0, 3.0]])
+
+    np.testing.assert_allclose(max_drawdowns(pnl), [6.0, 20.0])
+
+
+def test_sample_steps_keep_the_last_step():
+    steps = sample_steps(1000, 64)
+
+    assert len(steps) == 64 and steps[0] == 0 and steps[-1] == 999
+
+
+def test_terminal_pnl_is_the_expiry_payoff(simulation):
+    legs = make_legs()
+
+    report = risk_report(legs, 0.5, 90000.0, simulation, (0.95,), max_steps=16)
+
+    payoff = portfolio_payoff(
+        simulation.final_prices,
+        [leg.strike for leg in legs],
+        [leg.premium for leg in legs],
+        [leg.direction for leg in legs],
+        [leg.contract_type == "call" for leg in legs],
+        0.5,
+    )
+    assert report["expected_pnl"] == pytest.approx(payoff.mean())
+    assert report["probability_of_profit"] == pytest.approx((payoff > 0).mean())
+    assert report["value_at_risk"]["0.95"] == pytest.approx(
+        -np.sort(payoff)[int(0.05 * payoff.size) - 1]
+    )
+    assert report["max_drawdown"]["max"] >= report["max_drawdown"]["mean"] > 0
+    assert set(report["greeks"]) == {"delta", "gamma", "vega", "theta", "rho"}
+
+
+def test_reports_are_memoized_on_portfolio_and_simulation(simulation):
+    service = RiskService()
+    portfolio = make_portfolio()
+
+    async def evaluate():
+        return await service.evaluate(portfolio, simulation)
+
+    first = asyncio.run(evaluate())
+    assert asyncio.run(evaluate()) is first
+
+    # Another session with the same positions shares the report
+    other = make_portfolio()
+    assert asyncio.run(service.evaluate(other, simulation)) is first
+
+    portfolio.lot_size = 2.0
+    second = asyncio.run(evaluate())
+    assert second is not first
+    assert second["expected_pnl"] == pytest.approx(2 * first["expected_pnl"])
+    assert (service.hits, service.misses) == (2, 2)
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from services.common.math.return_models import get_return_model
+from services.simulator import engine as engine_module
+from services.simulator.engine import SimulationEngine
+
+
+@pytest.fixture
+def closes() -> np.ndarray:
+    return 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, 500)))
+
+
+@pytest.fixture
+def engine():
+    engine = SimulationEngine(max_workers=2, chunk_size=300)
+    yield engine
+    engine.shutdown()
+
+
+def test_split_iterations(engine):
+    assert engine.split_iterations(1000) == [300, 300, 300, 100]
+    assert engine.split_iterations(300) == [300]
+
+
+def test_run_returns_paths(engine, closes):
+    paths = asyncio.run(engine.run(closes, candles=50, iterations=1000))
+
+    assert paths.shape == (50, 1000)
+    assert np.all(paths[0] == closes[-1])
+    assert np.all(paths > 0)
+
+
+def test_run_rejects_empty_horizon(engine, closes):
+    with pytest.raises(ValueError):
+        asyncio.run(engine.run(closes, candles=0, iterations=10))
+
+
+def test_run_can_be_cancelled(engine, closes):
+    async def cancel_run():
+        task = asyncio.create_task(engine.run(closes, candles=2000, iterations=30000))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_run())
+
+
+def test_seeded_run_does_not_depend_on_worker_count(closes):
+    single = SimulationEngine(max_workers=1, chunk_size=300)
+    multi = SimulationEngine(max_workers=3, chunk_size=300)
+    try:
+        first = asyncio.run(single.run(closes, 30, 1000, seed=42))
+        second = asyncio.run(multi.run(closes, 30, 1000, seed=42))
+        other = asyncio.run(multi.run(closes, 30, 1000, seed=43))
+    finally:
+        single.shutdown()
+        multi.shutdown()
+
+    np.testing.assert_array_equal(first, second)
+    assert not np.array_equal(first, other)
+
+
+def test_run_calibrates_off_the_event_loop(engine, closes, monkeypatch):
+    threads = []
+
+    class RecordingModel:
+        def __init__(self, model):
+            self.model = get_return_model(model)
+
+        def calibrate(self, closes):
+            threads.append(threading.current_thread())
+            return self.model.calibrate(closes)
+
+    monkeypatch.setattr(engine_module, "get_return_model", RecordingModel)
+
+    paths = asyncio.run(engine.run(closes, candles=10, iterations=100))
+
+    assert paths.shape == (10, 100)
+    assert threads and threads[0] is not threading.main_thread()
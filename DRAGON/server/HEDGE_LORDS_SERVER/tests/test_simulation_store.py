@@ -0,0 +1,71 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.simulator.store import SimulationStore, hash_prices
+
+
+@pytest.fixture
+def store(tmp_path) -> SimulationStore:
+    return SimulationStore(str(tmp_path), max_bytes=10**9)
+
+
+def make_simulation(candles: int = 24, iterations: int = 100):
+    timestamps = pd.date_range("2025-05-01 13:00", periods=candles, freq="1h", tz="UTC")
+    paths = np.random.default_rng(0).random((candles, iterations))
+    return paths, timestamps
+
+
+def test_round_trip_is_memory_mapped(store):
+    paths, timestamps = make_simulation()
+    store.put("sim_a", paths, timestamps, "hash", 7)
+
+    stored = store.get("sim_a")
+
+    assert isinstance(stored.paths, np.memmap)
+    np.testing.assert_array_equal(stored.paths, paths)
+    np.testing.assert_array_equal(stored.final_prices, paths[-1])
+    assert stored.timestamps.equals(timestamps)
+    assert stored.seed == 7
+
+
+def test_missing_and_stale_entries(store):
+    paths, timestamps = make_simulation()
+    store.put("sim_a", paths, timestamps, "hash", 7)
+
+    assert store.get("sim_b") is None
+    assert store.get("sim_a", data_hash="other") is None
+    assert store.get("sim_a", data_hash="hash") is not None
+
+
+def test_evicts_least_recently_used(store):
+    paths, timestamps = make_simulation()
+    for i, key in enumerate(["old", "used", "new"]):
+        store.put(key, paths, timestamps, "hash", i)
+        past = time.time() - 100 + i
+        os.utime(os.path.join(store.directory, key + ".json"), (past, past))
+    store.get("used")
+
+    store.evict(max_bytes=2 * paths.nbytes + 1000)
+
+    assert store.get("old") is None
+    assert store.get("used") is not None
+    assert store.get("new") is not None
+
+    store.clear()
+    assert store.entries() == []
+
+
+def test_hash_depends_on_values_and_times():
+    prices = pd.Series(
+        [1.0, 2.0], index=pd.date_range("2025-01-01", periods=2, tz="UTC")
+    )
+    shifted = prices.copy()
+    shifted.index = shifted.index + pd.Timedelta(minutes=1)
+
+    assert hash_prices(prices) == hash_prices(prices.copy())
+    assert hash_prices(prices) != hash_prices(prices * 2)
+    assert hash_prices(prices) != hash_prices(shifted)
@@ -0,0 +1,251 @@
+import asyncio
+from collections import Counter
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.common.db.chain_state import CHAIN_COLUMNS, ChainState, LiveChain
+from services.common.math.options_contracts import portfolio_payoff
+from services.common.math.risk import value_at_risk
+from services.common.math.strategies import (
+    enumerate_strategies,
+    rank_strategies,
+    score_strategies,
+)
+from services.common.types.enums import (
+    Resolution,
+    StrategyObjective,
+    StrategyStructure,
+)
+from services.consumer.payoff_service import PayoffDiagramConsumer
+from services.consumer.strategy_service import ExpiryChain
+from services.simulator.store import StoredSimulation
+
+EXPIRY = date(2025, 5, 31)
+SPOT = 90_000.0
+STRIKES = np.arange(86_000.0, 95_000.0, 1_000.0)
+
+
+def quotes(strikes: np.ndarray, is_call: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Bids and asks around intrinsic value plus some time value"""
+    mid = np.maximum(np.where(is_call, SPOT - strikes, strikes - SPOT), 0) + 600
+    return mid - 20, mid + 20
+
+
+def make_chain() -> tuple[np.ndarray, ...]:
+    strikes = np.repeat(STRIKES, 2)
+    is_call = np.tile([True, False], STRIKES.size)
+    bids, asks = quotes(strikes, is_call)
+    return strikes, is_call, bids, asks
+
+
+@pytest.fixture
+def terminal() -> np.ndarray:
+    return SPOT * np.exp(np.random.default_rng(0).normal(0, 0.03, 10_000))
+
+
+def expand_legs(candidates, candidate, bids, asks) -> dict:
+    """A candidate as portfolio_payoff arguments, one leg per contract"""
+    legs = [
+        (contract, np.sign(quantity))
+        for contract, quantity in candidates.legs(candidate)
+        for _ in range(int(abs(quantity)))
+    ]
+    return {
+        "strikes": [candidates.strikes[contract] for contract, _ in legs],
+        "premiums": [
+            asks[contract] if side > 0 else bids[contract] for contract, side in legs
+        ],
+        "directions": [side for _, side in legs],
+        "is_call": [candidates.is_call[contract] for contract, _ in legs],
+    }
+
+
+def test_enumeration_covers_the_structures():
+    strikes, is_call, bids, asks = make_chain()
+
+    candidates = enumerate_strategies(strikes, is_call, bids, asks, max_wing_steps=2)
+
+    pairs = STRIKES.size * (STRIKES.size - 1) // 2
+    counts = Counter(candidates.structures)
+    assert counts["bull_call_spread"] == counts["bear_put_spread"] == pairs
+    assert counts["long_straddle"] == counts["short_straddle"] == STRIKES.size
+    assert counts["long_strangle"] == pairs
+    # Bodies with a wing either side, 1 or 2 strikes away
+    assert counts["long_call_butterfly"] == (STRIKES.size - 2) + (STRIKES.size - 4)
+    assert counts["iron_condor"] == sum(
+        1
+        for low in range(STRIKES.size)
+        for high in range(low + 1, STRIKES.size)
+        for wing in (1, 2)
+        if low - wing >= 0 and high + wing < STRIKES.size
+    )
+    butterfly = np.flatnonzero(candidates.structures == "long_call_butterfly")[0]
+    assert [quantity for _, quantity in candidates.legs(butterfly)] == [1, -2, 1]
+    assert candidates.premiums[butterfly] == pytest.approx(
+        asks[0] - 2 * bids[2] + asks[4]
+    )
+
+
+def test_untradable_legs_and_far_strikes_are_left_out():
+    strikes, is_call, bids, asks = make_chain()
+    # Nobody bids for the 90000 call, it can only be bought
+    bids[np.flatnonzero((strikes == 90_000) & is_call)] = np.nan
+
+    candidates = enumerate_strategies(
+        strikes,
+        is_call,
+        bids,
+        asks,
+        ["straddle", "vertical"],
+        center=SPOT,
+        max_strikes=3,
+    )
+
+    used = {
+        float(candidates.strikes[contract])
+        for candidate in range(len(candidates))
+        for contract, _ in candidates.legs(candidate)
+    }
+    assert used == {89_000.0, 90_000.0, 91_000.0}
+    counts = Counter(candidates.structures)
+    assert counts["long_straddle"] == 3 and counts["short_straddle"] == 2
+    # Spreads selling the 90000 call, lower leg of a bear spread or upper of a bull
+    assert counts["bull_call_spread"] == 2 and counts["bear_call_spread"] == 2
+
+
+def test_batched_scores_match_each_strategy_alone(terminal):
+    strikes, is_call, bids, asks = make_chain()
+    candidates = enumerate_strategies(strikes, is_call, bids, asks)
+
+    # Small blocks, the scores must not depend on them
+    scores = score_strategies(
+        candidates, terminal, 0.01, 0.95, np.float64, max_block_elements=30_000
+    )
+    fast = score_strategies(candidates, terminal, 0.01, 0.95)
+
+    for candidate in range(0, len(candidates), 37):
+        pnl = portfolio_payoff(
+            terminal, **expand_legs(candidates, candidate, bids, asks), lot_sizes=0.01
+        )
+        _, cvar = value_at_risk(pnl, (0.95,))
+        assert scores.expected_pnl[candidate] == pytest.approx(pnl.mean())
+        assert scores.probability_of_profit[candidate] == (pnl > 0).mean()
+        assert scores.conditional_value_at_risk[candidate] == pytest.approx(cvar[0])
+    np.testing.assert_allclose(fast.expected_pnl, scores.expected_pnl)
+    np.testing.assert_allclose(
+        fast.conditional_value_at_risk, scores.conditional_value_at_risk, atol=1e-3
+    )
+
+
+def test_rankings_follow_the_objective(terminal):
+    strikes, is_call, bids, asks = make_chain()
+    candidates = enumerate_strategies(strikes, is_call, bids, asks)
+    scores = score_strategies(candidates, terminal)
+
+    best_value = rank_strategies(scores, "expected_value", 5)
+    best_odds = rank_strategies(scores, "probability_of_profit", 5)
+    safest = rank_strategies(scores, "cvar", 5)
+
+    assert np.all(np.diff(scores.expected_pnl[best_value]) <= 0)
+    assert scores.expected_pnl[best_value[0]] == scores.expected_pnl.max()
+    assert scores.probability_of_profit[best_odds[0]] == (
+        scores.probability_of_profit.max()
+    )
+    assert np.all(np.diff(scores.conditional_value_at_risk[safest]) >= 0)
+    with pytest.raises(ValueError):
+        rank_strategies(scores, "sharpe", 5)
+
+
+def test_expiry_chain_from_database_rows():
+    rows = [
+        SimpleNamespace(
+            symbol="C-BTC-90000-310525",
+            contract_type="call_options",
+            strike_price=90_000,
+            best_bid=900,
+            best_ask=None,
+            spot_price=90_100,
+            timestamp=2,
+        ),
+        SimpleNamespace(
+            symbol="P-BTC-90000-310525",
+            contract_type="put_options",
+            strike_price=90_000,
+            best_bid=None,
+            best_ask=700,
+            spot_price=90_400,
+            timestamp=3,
+        ),
+    ]
+
+    chain = ExpiryChain.from_records(rows)
+
+    assert chain.is_call.tolist() == [True, False]
+    assert np.isnan(chain.asks[0]) and chain.bids[0] == 900.0
+    assert chain.spot == 90_400.0
+
+
+def test_optimizer_scores_the_live_chain(tmp_path, terminal):
+    strikes, is_call, bids, asks = make_chain()
+    writer = ChainState.create(str(tmp_path / "chain"), capacity=64)
+    writer.update(
+        [
+            ("{}-BTC-{:.0f}-310525".format("C" if call else "P", strike),)
+            + ("call_options" if call else "put_options", 1)
+            + tuple(
+                {"spot_price": SPOT, "best_bid": bid, "best_ask": ask}.get(column)
+                for column in CHAIN_COLUMNS[3:]
+            )
+            for strike, call, bid, ask in zip(strikes, is_call, bids, asks)
+        ]
+    )
+    payoff = PayoffDiagramConsumer()
+    payoff.live_chain = LiveChain(writer.path)
+    payoff.get_portfolio("desk").lot_size = 0.01
+    timestamps = pd.date_range(
+        end=datetime(2025, 5, 31, 12, tzinfo=timezone.utc), periods=2, freq="1h"
+    )
+    simulation = StoredSimulation(
+        "sim", np.vstack([terminal, terminal]), timestamps, "hash", 1
+    )
+
+    async def get_monte_carlo(*args):
+        return simulation
+
+    payoff.get_monte_carlo = get_monte_carlo
+    report = asyncio.run(
+        payoff.get_strategies(
+            "BTCUSD",
+            EXPIRY,
+            Resolution.HOUR_1,
+            objective=StrategyObjective.PROBABILITY_OF_PROFIT,
+            structures=[StrategyStructure.IRON_CONDOR],
+            top=3,
+            session_id="desk",
+        )
+    )
+    payoff.live_chain.close()
+    writer.close()
+
+    assert report["spot_price"] == SPOT and report["iterations"] == terminal.size
+    best = report["strategies"][0]
+    assert best["structure"] in ("iron_condor", "reverse_iron_condor")
+    assert [leg["contract_type"] for leg in best["legs"]] == ["put"] * 2 + ["call"] * 2
+    assert best["legs"][0]["symbol"].startswith("P-BTC-")
+    pnl = portfolio_payoff(
+        terminal,
+        [leg["strike"] for leg in best["legs"]],
+        [leg["premium"] for leg in best["legs"]],
+        [1 if leg["position"] == "buy" else -1 for leg in best["legs"]],
+        [leg["contract_type"] == "call" for leg in best["legs"]],
+        0.01,
+    )
+    assert best["expected_pnl"] == pytest.approx(pnl.mean())
+    assert best["probability_of_profit"] == (pnl > 0).mean()
+    assert [s["probability_of_profit"] for s in report["strategies"]] == sorted(
+        (s["probability_of_profit"] for s in report["strategies"]), reverse=True
+    )
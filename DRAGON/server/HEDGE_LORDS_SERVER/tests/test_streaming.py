@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.common.math.cpu_monte import simulate_statistics
+from services.common.math.streaming import QuantileSketch, RunningMoments
+
+
+@pytest.fixture
+def values() -> np.ndarray:
+    return np.random.default_rng(0).lognormal(0, 0.5, 200_000)
+
+
+def test_running_moments_match_numpy(values):
+    moments = RunningMoments()
+    for block in np.array_split(values, 7):
+        moments.update(block)
+
+    assert moments.count == values.size
+    assert moments.mean == pytest.approx(values.mean())
+    assert moments.variance == pytest.approx(values.var(ddof=1))
+    assert moments.min == values.min()
+    assert moments.max == values.max()
+
+
+def test_quantile_sketch_is_accurate_and_bounded(values):
+    sketch = QuantileSketch(compression=500)
+    for block in np.array_split(values, 20):
+        sketch.update(block)
+
+    quantiles = np.array([0.01, 0.05, 0.5, 0.95, 0.99])
+    np.testing.assert_allclose(
+        sketch.quantile(quantiles), np.quantile(values, quantiles), rtol=2e-3
+    )
+    assert sketch.count == values.size
+    assert sketch.weights.size <= 500
+    assert sketch.quantile(0.0) == values.min()
+    assert sketch.quantile(1.0) == values.max()
+
+
+def test_empty_sketch_returns_nan():
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_simulate_statistics_in_blocks():
+    prices = pd.Series(
+        100 * np.exp(np.cumsum(np.random.default_rng(1).normal(0, 0.01, 500)))
+    )
+
+    stats = simulate_statistics(prices, 100, 50_000, block_size=7_000)
+
+    assert stats.count == 50_000
+    assert stats.min <= stats.quantiles[0.05] < stats.quantiles[0.5]
+    assert stats.quantiles[0.5] < stats.quantiles[0.95] <= stats.max
+    assert stats.mean == pytest.approx(prices.iloc[-1], rel=0.1)
+
+
+def test_simulate_statistics_is_reproducible_with_seed():
+    prices = pd.Series(np.linspace(100, 110, 200))
+
+    first = simulate_statistics(prices, 50, 30_000, block_size=4_000, seed=11)
+    second = simulate_statistics(prices, 50, 30_000, block_size=4_000, seed=11)
+
+    assert first == second
+    assert first.seed == 11
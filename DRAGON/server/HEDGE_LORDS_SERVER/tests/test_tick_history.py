@@ -0,0 +1,89 @@
+import io
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy.dialects import postgresql
+
+from services.common.db.ticks import (
+    DOWNSAMPLE_TICKS,
+    TICK_COLUMNS,
+    parse_columns,
+    partition_day,
+    partition_name,
+)
+from services.producer.history import TickHistoryMaintenance
+from services.producer.ingestion import TickerIngestor, tick_history_row, ticker_to_row
+from tests.test_ingestion import make_ticker
+
+
+def test_tick_history_row_converts_time_and_numbers():
+    row = dict(zip(TICK_COLUMNS, tick_history_row(ticker_to_row(make_ticker()))))
+
+    assert row["time"] == datetime(2025, 5, 23, 11, 33, 20, tzinfo=timezone.utc)
+    assert row["symbol"] == "C-BTC-90000-310525"
+    assert row["contract_type"] == "call_options"
+    assert row["mark_price"] == 1500.5 and isinstance(row["mark_price"], float)
+    assert row["delta"] == 0.45
+    assert row["gamma"] is None
+
+
+def test_ingestor_records_every_tick_not_only_the_latest():
+    ingestor = TickerIngestor()
+    for price in ("1", "2", "3"):
+        ingestor.coalesce(ticker_to_row(make_ticker(mark_price=Decimal(price))))
+
+    assert len(ingestor.pending) == 1
+    mark_price = TICK_COLUMNS.index("mark_price")
+    prices = [tick_history_row(row)[mark_price] for row in ingestor.history]
+    assert prices == [1.0, 2.0, 3.0]
+
+
+def test_parse_columns_reads_copy_csv():
+    csv = b"1748000000000000,C-BTC-90000-310525,1500.5,\n1748000001000000,BTCUSD,,0.5\n"
+
+    columns = parse_columns(io.BytesIO(csv), ["time", "symbol", "mark_price", "delta"])
+
+    np.testing.assert_array_equal(
+        columns["time"],
+        np.array(["2025-05-23T11:33:20", "2025-05-23T11:33:21"], "datetime64[us]"),
+    )
+    assert columns["symbol"].tolist() == ["C-BTC-90000-310525", "BTCUSD"]
+    assert columns["mark_price"][0] == 1500.5 and np.isnan(columns["mark_price"][1])
+    assert columns["delta"].dtype == np.float64
+
+
+def test_parse_columns_of_an_empty_range():
+    columns = parse_columns(io.BytesIO(), ["time", "symbol", "mark_iv"])
+
+    assert columns["time"].dtype == "datetime64[us]" and columns["time"].size == 0
+    assert columns["mark_iv"].dtype == np.float64
+
+
+def test_partition_names_round_trip():
+    assert partition_name(date(2025, 5, 31)) == "options_ticks_20250531"
+    assert partition_day("options_ticks_20250531") == date(2025, 5, 31)
+    assert partition_day("options_ticks_default") is None
+
+
+def test_downsampling_upserts_minute_bars():
+    sql = str(DOWNSAMPLE_TICKS.compile(dialect=postgresql.dialect()))
+
+    assert "date_trunc('minute', time)" in sql
+    assert "ON CONFLICT (symbol, time) DO UPDATE" in sql
+    assert "close = EXCLUDED.close" in sql
+
+
+def test_rollup_window_covers_closed_minutes_with_overlap():
+    maintenance = TickHistoryMaintenance()
+    now = datetime(2025, 5, 31, 12, 10, 42, tzinfo=timezone.utc)
+
+    start, end = maintenance.rollup_window(now)
+    assert end == datetime(2025, 5, 31, 12, 10, tzinfo=timezone.utc)
+    assert start == datetime(2025, 5, 31, 12, 8, tzinfo=timezone.utc)
+
+    maintenance.rolled_until = end
+    start, _ = maintenance.rollup_window(
+        datetime(2025, 5, 31, 12, 11, 5, tzinfo=timezone.utc)
+    )
+    assert start == datetime(2025, 5, 31, 12, 8, tzinfo=timezone.utc)
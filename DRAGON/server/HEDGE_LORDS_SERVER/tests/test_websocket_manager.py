@@ -0,0 +1,159 @@
+import asyncio
+import json
+
+from services.consumer.websocket_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0, fail: bool = False) -> None:
+        self.delay = delay
+        self.fail = fail
+        self.messages: list[dict] = []
+        self.closed = False
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        if self.fail:
+            raise ConnectionResetError("gone")
+        await asyncio.sleep(self.delay)
+        self.messages.append(json.loads(text))
+
+    async def send_bytes(self, data: bytes) -> None:
+        await asyncio.sleep(self.delay)
+        self.messages.append(data)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def test_broadcast_reaches_every_subscriber():
+    async def scenario():
+        manager = ConnectionManager()
+        sockets = [FakeWebSocket() for _ in range(3)]
+        for socket in sockets:
+            await manager.connect(socket, "premiums")
+        await manager.broadcast({"n": 1}, "premiums")
+        await asyncio.sleep(0.01)
+        await manager.stop()
+        return sockets
+
+    sockets = asyncio.run(scenario())
+
+    assert all(socket.messages == [{"n": 1}] for socket in sockets)
+
+
+def test_slow_subscriber_drops_oldest_without_stalling_others():
+    async def scenario():
+        manager = ConnectionManager(max_queued=2)
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=0.1)
+        await manager.connect(fast, "trading")
+        await manager.connect(slow, "trading")
+        for n in range(10):
+            await manager.broadcast({"n": n}, "trading")
+            await asyncio.sleep(0.001)
+        # One message in flight plus two queued
+        await asyncio.sleep(0.5)
+        await manager.stop()
+        return fast, slow
+
+    fast, slow = asyncio.run(scenario())
+
+    assert [message["n"] for message in fast.messages] == list(range(10))
+    assert len(slow.messages) < 10
+    assert slow.messages[-1] == {"n": 9}
+
+
+def test_overflow_handler_replaces_default_policy():
+    overflowed = []
+
+    async def scenario():
+        manager = ConnectionManager(max_queued=1)
+        manager.set_overflow_handler(
+            "premiums", lambda subscriber, text: overflowed.append(json.loads(text))
+        )
+        subscriber = await manager.connect(FakeWebSocket(delay=0.1), "premiums")
+        for n in range(3):
+            await manager.broadcast({"n": n}, "premiums")
+        await manager.disconnect(subscriber)
+
+    asyncio.run(scenario())
+
+    # The first message fills the queue, the sender has not taken it yet
+    assert overflowed == [{"n": 1}, {"n": 2}]
+
+
+def test_failed_send_reaps_subscriber():
+    async def scenario():
+        manager = ConnectionManager()
+        socket = FakeWebSocket(fail=True)
+        await manager.connect(socket, "premiums")
+        await manager.broadcast({"n": 1}, "premiums")
+        await asyncio.sleep(0.01)
+        return manager, socket
+
+    manager, socket = asyncio.run(scenario())
+
+    assert not manager.has_subscribers("premiums")
+    assert socket.closed
+
+
+def test_binary_frames_keep_their_order():
+    async def scenario():
+        manager = ConnectionManager()
+        socket = FakeWebSocket()
+        subscriber = await manager.connect(socket, "trading")
+        manager.send(subscriber, {"n": 1})
+        manager.send_bytes(subscriber, b"\x00\x01")
+        manager.send(subscriber, {"n": 2})
+        await asyncio.sleep(0.01)
+        await manager.stop()
+        return socket
+
+    socket = asyncio.run(scenario())
+
+    assert socket.messages == [{"n": 1}, b"\x00\x01", {"n": 2}]
+
+
+def test_throttled_broadcast_merges_per_client():
+    def merge(pending: dict, message: dict) -> dict:
+        return {"n": pending["n"] + message["n"]}
+
+    async def scenario():
+        manager = ConnectionManager()
+        fast, slow = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(fast, "premiums")
+        await manager.connect(slow, "premiums", min_interval=0.2)
+        for n in range(1, 5):
+            manager.broadcast_throttled({"n": n}, "premiums", merge)
+            await asyncio.sleep(0.01)
+        # The slow client got the first message, the rest waits for its interval
+        assert slow.messages == [{"n": 1}]
+        await asyncio.sleep(0.25)
+        await manager.stop()
+        return fast, slow
+
+    fast, slow = asyncio.run(scenario())
+
+    assert fast.messages == [{"n": n} for n in range(1, 5)]
+    assert slow.messages == [{"n": 1}, {"n": 2 + 3 + 4}]
+
+
+def test_clear_drops_the_pending_throttled_message():
+    async def scenario():
+        manager = ConnectionManager()
+        socket = FakeWebSocket()
+        subscriber = await manager.connect(socket, "premiums", min_interval=0.05)
+        for n in range(2):
+            manager.send_throttled(subscriber, {"n": n}, lambda old, new: new)
+            await asyncio.sleep(0.01)
+        # A snapshot would replace the pending message
+        subscriber.clear()
+        await asyncio.sleep(0.1)
+        await manager.stop()
+        return socket
+
+    socket = asyncio.run(scenario())
+
+    assert socket.messages == [{"n": 0}]
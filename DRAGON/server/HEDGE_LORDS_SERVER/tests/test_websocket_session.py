@@ -0,0 +1,134 @@
+import asyncio
+import json
+import time
+
+from websockets.asyncio.server import serve
+
+from services.common.exchanges.stream import WebsocketSession, message_lag
+
+SYMBOLS = ["C-BTC-90000-310525", "BTCUSD"]
+
+
+def ticker(symbol: str, age_seconds: float = 0.0) -> str:
+    timestamp = int((time.time() - age_seconds) * 1e6)
+    return json.dumps({"type": "v2/ticker", "symbol": symbol, "timestamp": timestamp})
+
+
+async def wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+class FlakyFeed:
+    """Drops the first connection after a few messages, keeps the second"""
+
+    def __init__(self) -> None:
+        self.received: list[list[dict]] = []
+
+    async def handler(self, connection) -> None:
+        messages: list[dict] = []
+        self.received.append(messages)
+        async for raw in connection:
+            message = json.loads(raw)
+            messages.append(message)
+            if message["type"] != "subscribe":
+                continue
+            if len(self.received) == 1:
+                await connection.send(ticker("BTCUSD"))
+                await connection.send(ticker("C-BTC-90000-310525", age_seconds=30))
+                await connection.send('{"type":"heartbeat"}')
+                await connection.send(ticker("bad"))
+                connection.transport.abort()
+                return
+            await connection.send(ticker("BTCUSD"))
+
+
+def test_message_lag_reads_the_exchange_timestamp():
+    lag = message_lag(ticker("BTCUSD", age_seconds=3), time.time())
+
+    assert 2.9 < lag < 3.5
+    assert message_lag('{"type":"heartbeat"}', time.time()) is None
+
+
+def test_session_reconnects_and_resubscribes():
+    feed = FlakyFeed()
+    delivered = []
+
+    async def on_message(message: str) -> None:
+        if '"bad"' in message:
+            raise ValueError("cannot decode")
+        delivered.append(json.loads(message)["symbol"])
+
+    async def scenario():
+        async with serve(feed.handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            session = WebsocketSession(
+                f"ws://127.0.0.1:{port}", on_message, initial_delay=0.01
+            )
+            assert await session.start()
+            await session.subscribe(SYMBOLS)
+            await wait_until(lambda: len(delivered) == 3)
+            snapshot = session.metrics.snapshot()
+            await session.stop()
+            return snapshot
+
+    metrics = asyncio.run(scenario())
+
+    assert delivered == ["BTCUSD", "C-BTC-90000-310525", "BTCUSD"]
+    assert len(feed.received) == 2
+    for messages in feed.received:
+        assert messages[0] == {"type": "enable_heartbeat"}
+        assert messages[1]["payload"]["channels"][0]["symbols"] == SYMBOLS
+    assert metrics["connections"] == 2 and metrics["reconnects"] == 1
+    assert metrics["disconnects"] == 1
+    assert metrics["messages_received"] == 5
+    assert metrics["messages_dropped"] == 1
+    assert metrics["messages_late"] == 1
+    assert metrics["heartbeats"] == 1
+    assert metrics["connected"]
+
+
+def test_silent_connection_is_replaced():
+    connections = []
+
+    async def silent(connection) -> None:
+        connections.append(connection)
+        await connection.wait_closed()
+
+    async def on_message(message: str) -> None:
+        pass
+
+    async def scenario():
+        async with serve(silent, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            session = WebsocketSession(
+                f"ws://127.0.0.1:{port}",
+                on_message,
+                initial_delay=0.01,
+                idle_timeout=0.2,
+            )
+            await session.start()
+            await wait_until(lambda: session.metrics.connections >= 2)
+            await session.stop()
+
+    asyncio.run(scenario())
+
+    assert len(connections) >= 2
+
+
+def test_unsubscribe_forgets_the_symbols():
+    async def on_message(message: str) -> None:
+        pass
+
+    async def scenario():
+        session = WebsocketSession("ws://127.0.0.1:9", on_message)
+        await session.subscribe(SYMBOLS)
+        await session.unsubscribe()
+        return session
+
+    session = asyncio.run(scenario())
+
+    assert session.symbols == []
+    assert session.subscribe_message()["payload"]["channels"][0]["symbols"] == []